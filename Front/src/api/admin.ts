@@ -7,7 +7,7 @@ todas las inscripciones.
 Alumno Puede ver la oferta acadé
 */
 import { Carrera } from './catalogo';
-import { apiFetch , apiPost, apiPatch, apiDelete } from './http';
+import { apiFetch , apiPost, apiPatch, apiDelete, ensureCsrf } from './http';
 
 export type Materia = {
   id: number;
@@ -39,13 +39,69 @@ export type Docente = {
 export async function fetchAdminStats() {
     return apiFetch<{ totalUsuarios: number; totalCarreras: number; totalMaterias: number; totalAlumnos: number }>('/admin/stats/');
 }
+export type MateriaEstadisticas = Omit<Materia, 'docente'> & {
+    inscriptos_activos: number;
+    notas: number;
+    aprobadas: number;
+    promedio: string | null;
+    porcentaje_aprobadas: number | null;
+    // Cantidad de notas en [1, 2), [2, 3) ... [9, 10) y 10
+    histograma: number[];
+}
+// Estadísticas de notas e inscriptos por materia (opcionalmente de una carrera)
+export async function fetchEstadisticasMaterias(carreraId?: number) {
+    return apiFetch<MateriaEstadisticas[]>(`/admin/materias/estadisticas/${carreraId ? `?carrera=${carreraId}` : ''}`);
+}
+export type AnaliticaGrupo = {
+    notas: number;
+    promedio: number;
+    aprobadas: number;
+    porcentaje_aprobadas: number;
+    percentiles: Record<string, number>;
+    histograma: number[];
+    cohorte?: number;
+    [agrupacion: string]: unknown;
+}
+// Distribución, percentiles y aprobación desde el snapshot de notas (por materia, carrera, alumno o cohorte)
+export async function fetchAnaliticaNotas(params: { por?: string; materia?: number; carrera?: number; cohortes?: boolean } = {}) {
+    const query = new URLSearchParams();
+    if (params.por) query.set('por', params.por);
+    if (params.materia) query.set('materia', String(params.materia));
+    if (params.carrera) query.set('carrera', String(params.carrera));
+    if (params.cohortes) query.set('cohortes', '1');
+    return apiFetch<{ actualizado: string; notas: number; por: string; grupos: AnaliticaGrupo[] }>(
+        `/admin/analitica/notas/${query.toString() ? `?${query}` : ''}`
+    );
+}
+export type InformeImportacion = {
+    tipo: 'carreras' | 'materias' | 'alumnos';
+    filas: number;
+    creadas: number;
+    con_errores: number;
+    errores: { fila: number; errores: string[] }[];
+    simulado: boolean;
+}
+// Importación masiva desde CSV/XLSX; con simular=true sólo valida
+export async function importarArchivo(tipo: InformeImportacion['tipo'], archivo: File, simular = false) {
+    const csrf = await ensureCsrf();
+    const datos = new FormData();
+    datos.append('archivo', archivo);
+    if (simular) datos.append('simular', '1');
+    // Sin Content-Type: el navegador arma el multipart con su boundary
+    return apiFetch<InformeImportacion>(`/admin/importar/${tipo}/`, {
+        method: 'POST',
+        headers: { 'X-CSRFToken': csrf },
+        body: datos,
+    });
+}
 // Obtener todas las materias
 export async function fetchAllMaterias() {
     return apiFetch<Materia[]>('/admin/materias/');
 }
 //Obtener todas las materias de una carrera
 export async function fetchMateriasByCarrera(carreraId: number) {
-    return apiFetch<Materia[]>(`carreras/${carreraId}/materias/`);
+    // El catálogo público no trae el cupo: se usa el listado del admin filtrado por carrera
+    return apiFetch<Materia[]>(`/admin/materias/?carrera=${carreraId}`);
 }
 
 //Obtener todos los alumnos
@@ -84,6 +140,19 @@ export async function approvePendingUser(userId: number) {
     return apiPatch<any>(`/admin/usuarios/pendientes/${userId}/aprobar/`, {});
 }
 
+//Aprobar pendientes por lotes (ids de registro, o todos los de un rol/carrera)
+export type InformeAprobacion = {
+    aprobados: number;
+    alumnos_creados: number;
+    personal_creado: number;
+    errores: { registro: number; dni: string; detalle: string }[];
+};
+export async function approvePendingUsers(
+    seleccion: { ids: number[] } | { todos: true; rol?: 'ALUMNO' | 'PERSONAL'; carrera?: number }
+) {
+    return apiPost<InformeAprobacion>('/admin/usuarios/pendientes/aprobar/', seleccion);
+}
+
 //Rechazar usuario pendiente
 export async function rejectPendingUser(userId: number) {
     return apiPatch<any>(`/admin/usuarios/pendientes/${userId}/rechazar/`, {});
@@ -69,6 +69,29 @@ export async function upsertNota(payload: { alumno: number; materia: number; not
   return apiPost('/docente/notas/', payload);
 }
 
+export type NotaBulkResultado = {
+  alumno: number;
+  estado: 'creada' | 'actualizada' | 'error';
+  nota?: string;
+  errores?: Record<string, string[]>;
+};
+
+export type NotaBulkRespuesta = {
+  materia: number;
+  creadas: number;
+  actualizadas: number;
+  errores: number;
+  resultados: NotaBulkResultado[];
+};
+
+// Carga masiva: todas las notas de una materia en un solo request
+export async function upsertNotasBulk(
+  materiaId: number,
+  notas: { alumno: number; nota: number; observaciones?: string }[]
+) {
+  return apiPost<NotaBulkRespuesta>('/docente/notas/bulk/', { materia: materiaId, notas });
+}
+
 export type AlumnoMateriaNota = {
   alumno: Alumno;
   materia: Materia;
@@ -84,8 +107,46 @@ export async function fetchAlumnoNotas() {
   return apiFetch<NotaAlumno[]>(`/alumnos/me/notas/`);
 }
 
+type ResumenNotas = {
+  total_notas: number;
+  notas_aprobadas: number;
+  notas_desaprobadas: number;
+  promedio: string | null;
+};
+export type ResumenAcademico = ResumenNotas & {
+  por_carrera: (ResumenNotas & { carrera_id: number; carrera: string })[];
+};
+
+// Alumno: totales, aprobadas y promedio calculados en el servidor (sin traer todas las notas)
+export async function fetchResumenAcademico() {
+  return apiFetch<ResumenAcademico>(`/alumnos/me/resumen/`);
+}
+
+// Sin cupo, la respuesta es el ticket de lista de espera (estado EN_ESPERA y posición)
+export type SolicitudInscripcion = {
+  id: number;
+  materia: number;
+  estado: 'PENDIENTE' | 'EN_ESPERA' | 'ASIGNADA' | 'RECHAZADA';
+  motivo: string;
+  posicion: number | null;
+};
+
 export async function inscribirAlumnoAMateria(materiaId: number) {
-  return apiPost('/alumnos/inscribir', { materia_id: materiaId });
+  return apiPost<Partial<SolicitudInscripcion>>('/alumnos/inscribir', { materia_id: materiaId });
+}
+
+export type InscripcionMultipleResultado = {
+  materia: number;
+  estado: 'inscripta' | 'ya_inscripta' | 'sin_cupo' | 'no_encontrada' | 'cancelada' | 'conflicto';
+  detalle: string;
+};
+
+// Inscripción a varias materias en un solo request
+export async function inscribirAlumnoAMaterias(materiaIds: number[], modo: 'parcial' | 'todo_o_nada' = 'parcial') {
+  return apiPost<{ modo: string; inscriptas: number; resultados: InscripcionMultipleResultado[] }>(
+    '/alumnos/inscribir/multiple',
+    { materias: materiaIds, modo }
+  );
 }
 
 export async function darBajaAlumnoDeMateria(materiaId: number) {
@@ -93,8 +154,13 @@ export async function darBajaAlumnoDeMateria(materiaId: number) {
 }
 
 //Obtener todas las materias de una carrera
+// El catálogo (con ETag) viene sin cupo; el cupo actual se pide aparte y se combina
 export async function fetchMateriasByCarrera(carreraId: number) {
-  return apiFetch<Materia[]>(`/carreras/${carreraId}/materias/`);
+  const [materias, cupos] = await Promise.all([
+    apiFetch<Omit<Materia, 'cupo'>[]>(`/carreras/${carreraId}/materias/`),
+    apiFetch<Record<string, number>>(`/carreras/${carreraId}/materias/cupos/`),
+  ]);
+  return materias.map((m) => ({ ...m, cupo: cupos[m.id] ?? 0 }));
 }
 
 export async function fetchDocentesByMateria(materiaId: number) {
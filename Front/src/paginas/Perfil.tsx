@@ -60,8 +60,12 @@ const Perfil = () => {
 
   const inscribirMutation = useMutation({
     mutationFn: (mid: number) => inscribirAlumnoAMateria(mid),
-    onSuccess: () => {
-      toast({ title: "Inscripción exitosa" });
+    onSuccess: (data) => {
+      if (data?.estado === "EN_ESPERA") {
+        toast({ title: "Sin cupo: quedaste en lista de espera", description: `Posición ${data.posicion}` });
+      } else {
+        toast({ title: "Inscripción exitosa" });
+      }
       refetch(); // refrescar perfil/data si es necesario
       refetchInscripciones();
       setShowForm(false);
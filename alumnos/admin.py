@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Alumno
+from .models import Alumno, SolicitudInscripcion
 
 @admin.register(Alumno)
 class AlumnoAdmin(admin.ModelAdmin):
@@ -8,3 +8,11 @@ class AlumnoAdmin(admin.ModelAdmin):
     search_fields = ['apellido', 'nombre', 'dni', 'email']
     ordering = ['apellido', 'nombre']
     date_hierarchy = 'fecha_nacimiento'
+
+
+@admin.register(SolicitudInscripcion)
+class SolicitudInscripcionAdmin(admin.ModelAdmin):
+    list_display = ['alumno', 'materia', 'estado', 'motivo', 'creado_en', 'procesado_en']
+    list_filter = ['estado', 'materia__carrera']
+    search_fields = ['alumno__apellido', 'alumno__dni', 'materia__nombre']
+    raw_id_fields = ['alumno', 'materia']
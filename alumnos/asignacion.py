@@ -0,0 +1,496 @@
+"""
+Asignación de cupos de materias.
+
+Inscripción directa: el cupo se descuenta con un único UPDATE condicional
+(cupo = cupo - 1 WHERE cupo > 0) en la misma transacción que crea la
+inscripción, sin bloquear la fila de la materia durante el request.
+
+Lista de espera: si la materia no tiene cupo, el alumno queda anotado con una
+SolicitudInscripcion en estado EN_ESPERA. dar_de_baja entrega el cupo liberado al
+primero de la lista en la misma transacción, y lo mismo hace Materia.save si se
+amplía el cupo, así el cupo nunca vuelve a quedar libre mientras haya alumnos
+esperando. Mientras haya lista de espera la inscripción directa se rechaza como
+sin cupo: nadie se saltea a los que esperan.
+
+Inscripción múltiple: inscribir_varias valida todas las materias con una sola consulta
+y da de alta las inscripciones con bulk_create en una transacción, en modo
+"todo o nada" o "parcial".
+
+El cupo no forma parte del catálogo cacheado (ver api.views.catalogo_condicional):
+inscribir y dar de baja no cambian la versión del catálogo.
+
+Horarios: ningún camino inscribe a un alumno en una materia cuyo horario se superpone
+con otra en la que ya está inscripto (ver materias.horarios). El chequeo usa una sola
+consulta por pedido (o por lote en el modo cola) y una búsqueda binaria por franja, y
+se hace dentro de la transacción que toma el cupo, con el alumno bloqueado: dos pedidos
+simultáneos del mismo alumno no pasan los dos el chequeo.
+
+Modo cola: en lugar de bloquear la materia en cada request, AlumnoInscribirMateriaView sólo
+encola una SolicitudInscripcion y responde con el ticket. El comando
+`procesar_inscripciones` toma las pendientes de cada materia y las resuelve en una
+única transacción por materia, ordenándolas según la política configurada:
+
+- "orden":  orden de llegada.
+- "sorteo": orden aleatorio entre las solicitudes de una misma ventana de tiempo
+            (settings.INSCRIPCIONES_VENTANA_SORTEO segundos). Sólo se procesan
+            ventanas ya cerradas y siempre completas (se mezcla la ventana entera
+            antes de recortar al lote), para que todas compitan en igualdad.
+"""
+import random
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+
+from estadisticas.utils import aplicar_deltas, aplicar_deltas_materia
+from materias import horarios
+from materias.models import Materia
+from .models import Alumno, InscripcionAlumno, SolicitudInscripcion
+
+LOTE_DEFAULT = 500
+
+
+class InscripcionRechazada(Exception):
+    """La inscripción no procede (sin cupo, ya inscripto); el mensaje es para el alumno"""
+
+
+class SinCupo(InscripcionRechazada):
+    pass
+
+
+class HorarioSuperpuesto(InscripcionRechazada):
+    pass
+
+
+def _motivo_superposicion(materia):
+    return f"El horario se superpone con {materia}"[:120]
+
+
+def _bloquear_alumnos(alumno_ids):
+    """
+    SELECT ... FOR UPDATE de los alumnos, dentro de la transacción y después de tomar el cupo
+    (siempre materia -> alumno, para no cruzar locks con procesar_materia). En SQLite no hace
+    falta: BEGIN IMMEDIATE ya serializa las transacciones que escriben.
+    """
+    if connection.features.has_select_for_update:
+        list(Alumno.objects.select_for_update().filter(pk__in=alumno_ids).order_by("pk").values_list("pk", flat=True))
+
+
+def verificar_horario(alumno_id, materia_id):
+    """Lanza HorarioSuperpuesto si la materia choca con el horario de las materias del alumno"""
+    agenda, pedidas = horarios.agenda_alumno(alumno_id, [materia_id])
+    choque = agenda.choque(pedidas.get(int(materia_id), ()))
+    if choque is not None:
+        raise HorarioSuperpuesto(_motivo_superposicion(choque))
+
+
+def tomar_cupo(materia_id, respetar_lista_espera=False):
+    """
+    Descuenta un cupo si queda alguno. Retorna False si la materia no tiene cupo (o, con
+    respetar_lista_espera, si hay alumnos en lista de espera: esos cupos son de ellos).
+    Lanza Materia.DoesNotExist si la materia no existe.
+    """
+    materia = Materia.objects.filter(pk=materia_id, cupo__gt=0)
+    if respetar_lista_espera:
+        # En el mismo UPDATE condicional, sin una consulta más
+        materia = materia.filter(
+            ~Exists(SolicitudInscripcion.objects.filter(materia=OuterRef("pk"), estado="EN_ESPERA"))
+        )
+    if materia.update(cupo=F("cupo") - 1):
+        return True
+    if not Materia.objects.filter(pk=materia_id).exists():
+        raise Materia.DoesNotExist("Materia no encontrada")
+    return False
+
+
+def liberar_cupo(materia_id):
+    Materia.objects.filter(pk=materia_id).update(cupo=F("cupo") + 1)
+
+
+def inscribir(alumno, materia_id):
+    """
+    Inscripción directa. El UPDATE condicional es la primera escritura de la transacción,
+    así el descuento del cupo y el alta de la inscripción se confirman o se deshacen juntos
+    sin un SELECT ... FOR UPDATE previo. Una inscripción inactiva previa se reactiva.
+    """
+    # Misma consulta que el chequeo de "ya inscripto": trae la fila si existe, activa o no
+    inscripcion = InscripcionAlumno.objects.filter(alumno=alumno, materia_id=materia_id).first()
+    if inscripcion is not None and inscripcion.activa:
+        raise InscripcionRechazada("Ya estás inscrito en esta materia")
+    try:
+        with transaction.atomic():
+            # Mientras haya lista de espera los cupos son de ella (ver promover_lista_espera)
+            if not tomar_cupo(materia_id, respetar_lista_espera=True):
+                # Un choque de horario se informa antes que la falta de cupo (no va a la lista de espera)
+                verificar_horario(alumno.pk, materia_id)
+                raise SinCupo("No hay cupo disponible en esta materia")
+            # Si choca, el rollback devuelve el cupo
+            _bloquear_alumnos([alumno.pk])
+            verificar_horario(alumno.pk, materia_id)
+            if inscripcion is None:
+                inscripcion = InscripcionAlumno.objects.create(alumno=alumno, materia_id=materia_id, activa=True)
+            else:
+                _reactivar(inscripcion)
+    except IntegrityError:
+        # Otro request del mismo alumno ganó la carrera: unique_together (alumno, materia)
+        raise InscripcionRechazada("Ya estás inscrito en esta materia")
+    return inscripcion
+
+
+def _reactivar(inscripcion):
+    # UPDATE condicional, como el del cupo: si otro request la reactivó primero, IntegrityError
+    ahora = timezone.now()
+    if not InscripcionAlumno.objects.filter(pk=inscripcion.pk, activa=False).update(
+        activa=True, fecha_inscripcion=ahora
+    ):
+        raise IntegrityError("inscripción reactivada por otro pedido")
+    inscripcion.activa, inscripcion.fecha_inscripcion = True, ahora
+    # update() no dispara señales
+    aplicar_deltas(inscripciones_activas=1)
+    aplicar_deltas_materia(inscripcion.materia_id, inscriptos_activos=1)
+
+
+def dar_de_baja(alumno, materia_id):
+    """
+    Elimina la inscripción activa y devuelve el cupo en la misma transacción, entregándolo
+    al primero de la lista de espera si la hay. Retorna la solicitud promovida o None.
+    Lanza InscripcionAlumno.DoesNotExist si no estaba inscripto.
+    """
+    with transaction.atomic():
+        # Se escribe primero (como en inscribir): si la inscripción no existe, el rollback deshace el +1
+        liberar_cupo(materia_id)
+        InscripcionAlumno.objects.get(alumno=alumno, materia_id=materia_id, activa=True).delete()
+        promovidas = promover_lista_espera(materia_id, maximo=1)
+    return promovidas[0] if promovidas else None
+
+
+def anotar_en_espera(alumno, materia_id):
+    """
+    Anota al alumno en la lista de espera de la materia. Retorna (solicitud, creada).
+    Si entre el rechazo y el alta se liberó un cupo, se asigna en el acto.
+    """
+    solicitud, creada = encolar(alumno, materia_id, estado="EN_ESPERA")
+    if creada and Materia.objects.filter(pk=materia_id, cupo__gt=0).exists():
+        with transaction.atomic():
+            promovidas = promover_lista_espera(materia_id)
+        if promovidas:
+            solicitud.refresh_from_db()
+    return solicitud, creada
+
+
+def promover_lista_espera(materia_id, maximo=None):
+    """
+    Asigna cupos libres de la materia a la lista de espera, en orden de llegada.
+    Debe llamarse dentro de una transacción. Retorna las solicitudes asignadas.
+    """
+    promovidas = []
+    en_espera = SolicitudInscripcion.objects.filter(materia_id=materia_id, estado="EN_ESPERA").order_by("creado_en", "id")
+    with transaction.atomic():
+        while maximo is None or len(promovidas) < maximo:
+            solicitud = en_espera.first()
+            if solicitud is None or not tomar_cupo(materia_id):
+                break
+            ahora = timezone.now()
+            # Se reclama el ticket con un UPDATE condicional: si otra baja concurrente lo tomó, se sigue con el próximo
+            if not SolicitudInscripcion.objects.filter(pk=solicitud.pk, estado="EN_ESPERA").update(
+                estado="ASIGNADA", motivo="", procesado_en=ahora
+            ):
+                liberar_cupo(materia_id)
+                continue
+            inscripcion = InscripcionAlumno.objects.filter(alumno_id=solicitud.alumno_id, materia_id=materia_id).first()
+            if inscripcion is not None and inscripcion.activa:
+                # Se inscribió por otro camino mientras esperaba
+                liberar_cupo(materia_id)
+                SolicitudInscripcion.objects.filter(pk=solicitud.pk).update(
+                    estado="RECHAZADA", motivo="Ya estás inscrito en esta materia"
+                )
+                continue
+            try:
+                # Mientras esperaba pudo inscribirse en otra materia del mismo horario
+                _bloquear_alumnos([solicitud.alumno_id])
+                verificar_horario(solicitud.alumno_id, materia_id)
+            except HorarioSuperpuesto as e:
+                liberar_cupo(materia_id)
+                SolicitudInscripcion.objects.filter(pk=solicitud.pk).update(estado="RECHAZADA", motivo=str(e))
+                continue
+            if inscripcion is None:
+                InscripcionAlumno.objects.create(alumno_id=solicitud.alumno_id, materia_id=materia_id, activa=True)
+            else:
+                inscripcion.activa = True
+                inscripcion.save(update_fields=["activa"])
+            solicitud.estado, solicitud.procesado_en = "ASIGNADA", ahora
+            promovidas.append(solicitud)
+    return promovidas
+
+
+# Resultado por materia de inscribir_varias: estado -> detalle para el alumno
+RESULTADOS_INSCRIPCION = {
+    "inscripta": "Inscripción exitosa",
+    "ya_inscripta": "Ya estás inscrito en esta materia",
+    "sin_cupo": "No hay cupo disponible en esta materia",
+    "no_encontrada": "Materia no encontrada",
+    "superpuesta": "El horario se superpone con otra de tus materias",
+    "cancelada": "No se inscribió porque otra materia del pedido fue rechazada",
+    "conflicto": "Otra inscripción simultánea del alumno interfirió, reintentá",
+}
+
+
+class _Cancelada(Exception):
+    pass
+
+
+def inscribir_varias(alumno, materia_ids, todo_o_nada=False):
+    """
+    Inscribe al alumno en varias materias en una sola transacción.
+    Con todo_o_nada=True, si alguna materia se rechaza no se inscribe ninguna.
+    Retorna una lista [{"materia", "estado", "detalle"}] en el orden recibido (sin repetidos).
+    """
+    ids = list(dict.fromkeys(materia_ids))
+    inscripcion = InscripcionAlumno.objects.filter(alumno=alumno, materia=OuterRef("pk"))
+    # Una sola consulta: cupo, lista de espera y situación del alumno en cada materia pedida
+    filas = {
+        f["id"]: f
+        for f in Materia.objects.filter(pk__in=ids).annotate(
+            inscripta=Exists(inscripcion.filter(activa=True)),
+            inactiva=Exists(inscripcion.filter(activa=False)),
+            en_espera=Exists(SolicitudInscripcion.objects.filter(materia=OuterRef("pk"), estado="EN_ESPERA")),
+        ).values("id", "cupo", "inscripta", "inactiva", "en_espera")
+    }
+    estados = {}
+    for materia_id in ids:
+        fila = filas.get(materia_id)
+        if fila is None:
+            estados[materia_id] = "no_encontrada"
+        elif fila["inscripta"]:
+            estados[materia_id] = "ya_inscripta"
+        elif (fila["cupo"] or 0) <= 0 or fila["en_espera"]:
+            estados[materia_id] = "sin_cupo"
+    candidatas = [m for m in ids if m not in estados]
+
+    if candidatas and todo_o_nada and estados:
+        estados.update((m, "cancelada") for m in candidatas)
+        candidatas = []
+    if candidatas:
+        try:
+            with transaction.atomic():
+                # El UPDATE condicional es el que garantiza el cupo; el chequeo previo puede estar desactualizado
+                tomadas = [m for m in candidatas if tomar_cupo(m, respetar_lista_espera=True)]
+                estados.update((m, "sin_cupo") for m in candidatas if m not in tomadas)
+                if tomadas:
+                    # Horarios con el alumno bloqueado, en una sola consulta para sus franjas y las
+                    # pedidas; cada materia aceptada se suma a la agenda, así también se rechazan
+                    # los choques dentro del mismo pedido. La que choca devuelve su cupo
+                    _bloquear_alumnos([alumno.pk])
+                    agenda, pedidas = horarios.agenda_alumno(alumno.pk, tomadas)
+                    for materia_id in list(tomadas):
+                        franjas = pedidas.get(materia_id, ())
+                        if agenda.choque(franjas) is not None:
+                            estados[materia_id] = "superpuesta"
+                            tomadas.remove(materia_id)
+                            liberar_cupo(materia_id)
+                        else:
+                            agenda.agregar(franjas, materia_id)
+                if todo_o_nada and len(tomadas) < len(candidatas):
+                    raise _Cancelada
+                # Una inscripción inactiva previa se reactiva (unique_together alumno/materia)
+                reactivar = [m for m in tomadas if filas[m]["inactiva"]]
+                if reactivar and InscripcionAlumno.objects.filter(
+                    alumno=alumno, materia_id__in=reactivar, activa=False
+                ).update(activa=True, fecha_inscripcion=timezone.now()) != len(reactivar):
+                    raise IntegrityError("inscripción modificada durante el pedido")
+                InscripcionAlumno.objects.bulk_create([
+                    InscripcionAlumno(alumno=alumno, materia_id=m, activa=True)
+                    for m in tomadas if not filas[m]["inactiva"]
+                ])
+            estados.update((m, "inscripta") for m in tomadas)
+        except _Cancelada:
+            estados.update((m, "cancelada") for m in tomadas)
+            tomadas = []
+        except IntegrityError:
+            estados.update((m, "conflicto") for m in candidatas)
+            tomadas = []
+        if tomadas:
+            # bulk_create/update no disparan señales
+            aplicar_deltas(inscripciones_activas=len(tomadas))
+            for materia_id in tomadas:
+                aplicar_deltas_materia(materia_id, inscriptos_activos=1)
+
+    return [
+        {"materia": m, "estado": estados[m], "detalle": RESULTADOS_INSCRIPCION[estados[m]]}
+        for m in ids
+    ]
+
+
+def _politica_orden(solicitudes, ventana, rng):
+    return sorted(solicitudes, key=lambda s: (s.creado_en, s.id))
+
+
+def _politica_sorteo(solicitudes, ventana, rng):
+    return sorted(solicitudes, key=lambda s: (int(s.creado_en.timestamp() // ventana), rng.random()))
+
+
+POLITICAS = {
+    "orden": _politica_orden,
+    "sorteo": _politica_sorteo,
+}
+
+
+def _configuracion(politica, ventana):
+    politica = politica or getattr(settings, "INSCRIPCIONES_POLITICA", "orden")
+    if politica not in POLITICAS:
+        raise ValueError(f"Política de asignación desconocida: {politica}")
+    ventana = int(ventana or getattr(settings, "INSCRIPCIONES_VENTANA_SORTEO", 60))
+    return politica, max(ventana, 1)
+
+
+def _inicio_ventana(instante, ventana):
+    marca = instante.timestamp()
+    return datetime.fromtimestamp(marca - marca % ventana, tz=dt_timezone.utc)
+
+
+def _ventanas_cerradas(pendientes, ventana, lote):
+    """
+    Solicitudes de las ventanas de sorteo ya cerradas, de la más antigua en adelante y
+    siempre ventanas completas: recortar una ventana por orden de llegada antes de mezclarla
+    dejaría afuera del sorteo a los últimos de esa ventana. Se agregan ventanas hasta
+    juntar `lote` solicitudes (al menos una ventana, aunque tenga más).
+    """
+    # Inicio de la ventana en curso: sólo se sortean las ventanas anteriores
+    restantes = pendientes.filter(creado_en__lt=_inicio_ventana(timezone.now(), ventana))
+    solicitudes = []
+    while len(solicitudes) < lote:
+        primera = restantes.order_by("creado_en").values_list("creado_en", flat=True).first()
+        if primera is None:
+            break
+        fin = _inicio_ventana(primera, ventana) + timedelta(seconds=ventana)
+        solicitudes += restantes.filter(creado_en__lt=fin)
+        restantes = restantes.filter(creado_en__gte=fin)
+    return solicitudes
+
+
+def encolar(alumno, materia_id, estado="PENDIENTE"):
+    """
+    Registra la solicitud sin tomar locks. Retorna (solicitud, creada); si el alumno ya
+    tenía una solicitud abierta (pendiente o en espera, en cualquiera de los dos estados)
+    para la materia se devuelve esa misma.
+    """
+    existente = SolicitudInscripcion.objects.filter(
+        alumno=alumno, materia_id=materia_id, estado__in=["PENDIENTE", "EN_ESPERA"]
+    )
+    abierta = existente.first()
+    if abierta is not None:
+        return abierta, False
+    try:
+        with transaction.atomic():
+            return SolicitudInscripcion.objects.create(alumno=alumno, materia_id=materia_id, estado=estado), True
+    except IntegrityError:
+        # Dos pedidos simultáneos del alumno: la restricción solicitud_abierta_unica deja uno solo
+        return existente.get(), False
+
+
+def posicion_en_cola(solicitud):
+    """
+    Cantidad de solicitudes de la misma materia y estado (pendientes o en espera) que
+    llegaron antes, contando la propia (1 = primera). None si ya fue procesada.
+    """
+    if solicitud.estado not in ("PENDIENTE", "EN_ESPERA"):
+        return None
+    return SolicitudInscripcion.objects.filter(
+        Q(creado_en__lt=solicitud.creado_en) | Q(creado_en=solicitud.creado_en, id__lte=solicitud.id),
+        materia_id=solicitud.materia_id,
+        estado=solicitud.estado,
+    ).count()
+
+
+def procesar_materia(materia_id, politica=None, ventana=None, lote=LOTE_DEFAULT, rng=None):
+    """
+    Resuelve hasta `lote` solicitudes pendientes de una materia en una sola transacción.
+    Retorna {"asignadas": n, "rechazadas": m}.
+    """
+    politica, ventana = _configuracion(politica, ventana)
+    rng = rng or random.Random()
+    with transaction.atomic():
+        materia = Materia.objects.select_for_update().filter(pk=materia_id).first()
+        if materia is None:
+            return {"asignadas": 0, "rechazadas": 0}
+
+        pendientes = SolicitudInscripcion.objects.filter(materia_id=materia_id, estado="PENDIENTE")
+        if politica == "sorteo":
+            solicitudes = _ventanas_cerradas(pendientes, ventana, lote)
+        else:
+            solicitudes = list(pendientes.order_by("creado_en", "id")[:lote])
+        # Se ordena (o sortea) todo lo leído y recién después se recorta al lote
+        solicitudes = POLITICAS[politica](solicitudes, ventana, rng)[:lote]
+        if not solicitudes:
+            return {"asignadas": 0, "rechazadas": 0}
+
+        ya_inscriptos = set(
+            InscripcionAlumno.objects.filter(
+                materia_id=materia_id, activa=True, alumno_id__in={s.alumno_id for s in solicitudes}
+            ).values_list("alumno_id", flat=True)
+        )
+        franjas = list(materia.horarios.values_list("dia", "inicio", "fin"))
+        agendas = {}
+        if franjas:
+            _bloquear_alumnos({s.alumno_id for s in solicitudes})
+            # Agenda de todos los alumnos del lote en una consulta, sólo de los días de la materia
+            agendas = horarios.agendas_alumnos(
+                {s.alumno_id for s in solicitudes}, {dia for dia, _, _ in franjas}
+            )
+
+        cupo = materia.cupo or 0
+        asignadas = []
+        rechazadas: dict[str, list[int]] = {}
+        for solicitud in solicitudes:
+            choque = agendas[solicitud.alumno_id].choque(franjas) if agendas else None
+            if solicitud.alumno_id in ya_inscriptos:
+                rechazadas.setdefault("Ya estás inscrito en esta materia", []).append(solicitud.id)
+            elif choque is not None:
+                rechazadas.setdefault(_motivo_superposicion(choque), []).append(solicitud.id)
+            elif cupo <= 0:
+                rechazadas.setdefault("No hay cupo disponible en esta materia", []).append(solicitud.id)
+            else:
+                asignadas.append(solicitud)
+                ya_inscriptos.add(solicitud.alumno_id)
+                cupo -= 1
+
+        ahora = timezone.now()
+        if asignadas:
+            # update_conflicts reactiva una inscripción inactiva previa en lugar de fallar por unique_together
+            InscripcionAlumno.objects.bulk_create(
+                [InscripcionAlumno(alumno_id=s.alumno_id, materia_id=materia_id, activa=True) for s in asignadas],
+                update_conflicts=True,
+                unique_fields=["alumno", "materia"],
+                update_fields=["activa", "fecha_inscripcion"],
+            )
+            SolicitudInscripcion.objects.filter(id__in=[s.id for s in asignadas]).update(
+                estado="ASIGNADA", motivo="", procesado_en=ahora
+            )
+            Materia.objects.filter(pk=materia_id).update(cupo=F("cupo") - len(asignadas))
+            # bulk_create/update no disparan señales
+            aplicar_deltas(inscripciones_activas=len(asignadas))
+            aplicar_deltas_materia(materia_id, inscriptos_activos=len(asignadas))
+        for motivo, ids in rechazadas.items():
+            SolicitudInscripcion.objects.filter(id__in=ids).update(
+                estado="RECHAZADA", motivo=motivo, procesado_en=ahora
+            )
+
+    return {"asignadas": len(asignadas), "rechazadas": sum(len(ids) for ids in rechazadas.values())}
+
+
+def procesar_pendientes(politica=None, ventana=None, lote=LOTE_DEFAULT, rng=None):
+    """Procesa un lote por cada materia con solicitudes pendientes. Retorna los totales."""
+    totales = {"materias": 0, "asignadas": 0, "rechazadas": 0}
+    materias = (
+        SolicitudInscripcion.objects.filter(estado="PENDIENTE")
+        .order_by().values_list("materia_id", flat=True).distinct()
+    )
+    for materia_id in list(materias):
+        resultado = procesar_materia(materia_id, politica=politica, ventana=ventana, lote=lote, rng=rng)
+        if resultado["asignadas"] or resultado["rechazadas"]:
+            totales["materias"] += 1
+        totales["asignadas"] += resultado["asignadas"]
+        totales["rechazadas"] += resultado["rechazadas"]
+    return totales
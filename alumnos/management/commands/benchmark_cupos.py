@@ -0,0 +1,158 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from alumnos import asignacion
+from alumnos.models import Alumno, InscripcionAlumno
+from carreras.models import Carrera
+from gestion_educativa.basedatos import base_de_prueba
+from materias.models import Materia
+
+
+def _inscribir_con_bloqueo(alumno, materia_id):
+    # Implementación anterior: cupo leído bajo lock, modificado en Python y guardado con save()
+    with transaction.atomic():
+        materia = Materia.objects.select_for_update().get(id=materia_id)  # type: ignore[attr-defined]
+        if materia.cupo <= 0:
+            raise asignacion.InscripcionRechazada("No hay cupo disponible en esta materia")
+        if InscripcionAlumno.objects.filter(alumno=alumno, materia=materia, activa=True).exists():
+            raise asignacion.InscripcionRechazada("Ya estás inscrito en esta materia")
+        InscripcionAlumno.objects.create(activa=True, alumno=alumno, materia=materia)
+        materia.cupo = (materia.cupo or 0) - 1
+        materia.save()
+
+
+def _baja_con_bloqueo(alumno, materia_id):
+    with transaction.atomic():
+        materia = Materia.objects.select_for_update().get(id=materia_id)  # type: ignore[attr-defined]
+        InscripcionAlumno.objects.get(alumno=alumno, materia_id=materia_id, activa=True).delete()
+        materia.cupo = (materia.cupo or 0) + 1
+        materia.save()
+
+
+IMPLEMENTACIONES = {
+    "bloqueo": (_inscribir_con_bloqueo, _baja_con_bloqueo),
+    "condicional": (asignacion.inscribir, asignacion.dar_de_baja),
+}
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+def _martillar(funcion, alumnos, materia_id, hilos):
+    """Reparte los alumnos entre los hilos y llama funcion(alumno, materia_id) para cada uno"""
+    pendientes = list(alumnos)
+    candado = threading.Lock()
+    resultado = {"ok": [], "rechazadas": 0, "errores": 0, "tiempos": [], "mensajes": set()}
+
+    def trabajar():
+        try:
+            while True:
+                with candado:
+                    if not pendientes:
+                        return
+                    alumno = pendientes.pop()
+                inicio = time.perf_counter()
+                try:
+                    funcion(alumno, materia_id)
+                    clave = "ok"
+                except asignacion.InscripcionRechazada:
+                    clave = "rechazadas"
+                except Exception as e:
+                    clave = "errores"
+                    with candado:
+                        resultado["mensajes"].add(f"{type(e).__name__}: {e}")
+                transcurrido = time.perf_counter() - inicio
+                with candado:
+                    resultado["tiempos"].append(transcurrido)
+                    if clave == "ok":
+                        resultado["ok"].append(alumno)
+                    else:
+                        resultado[clave] += 1
+        finally:
+            # Cada hilo abre su propia conexión
+            connection.close()
+
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=trabajar) for _ in range(hilos)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    resultado["segundos"] = time.perf_counter() - inicio
+    return resultado
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara bajo concurrencia la inscripción a materia con lock + save() contra el UPDATE "
+        "condicional del cupo. Corre sobre una base de prueba temporal: no toca la base configurada"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hilos", type=int, default=8)
+        parser.add_argument("--alumnos", type=int, default=400, help="Alumnos que intentan inscribirse")
+        parser.add_argument("--cupo", type=int, default=100, help="Cupo inicial de la materia")
+        parser.add_argument("--modo", choices=["ambos", *sorted(IMPLEMENTACIONES)], default="ambos")
+
+    def handle(self, *args, **options):
+        if options["hilos"] < 1 or not 1 <= options["alumnos"] <= 99999 or options["cupo"] < 0:
+            raise CommandError("--hilos debe ser positivo, --alumnos entre 1 y 99999 y --cupo no negativo")
+        modos = sorted(IMPLEMENTACIONES) if options["modo"] == "ambos" else [options["modo"]]
+
+        # Base de prueba temporal (ver base_de_prueba): los datos sintéticos y las escrituras
+        # concurrentes nunca llegan a la base configurada
+        with base_de_prueba():
+            carrera = Carrera.objects.create(nombre="Benchmark cupos", duracion_anios=1)
+            alumnos = Alumno.objects.bulk_create([
+                Alumno(nombre="Bench", apellido=str(i), dni=f"b{i:05d}", email=f"bench{i}@example.com")
+                for i in range(options["alumnos"])
+            ])
+            for modo in modos:
+                self._correr(modo, carrera, alumnos, options)
+
+    def _correr(self, modo, carrera, alumnos, options):
+        inscribir, dar_de_baja = IMPLEMENTACIONES[modo]
+        cupo = options["cupo"]
+        materia = Materia.objects.create(nombre=f"Benchmark {modo}", carrera=carrera, cupo=cupo)
+
+        alta = _martillar(inscribir, alumnos, materia.id, options["hilos"])
+        cupo_tras_alta = Materia.objects.get(pk=materia.pk).cupo
+        inscriptos = InscripcionAlumno.objects.filter(materia=materia, activa=True).count()
+        baja = _martillar(dar_de_baja, alta["ok"], materia.id, options["hilos"])
+        cupo_final = Materia.objects.get(pk=materia.pk).cupo
+        restantes = InscripcionAlumno.objects.filter(materia=materia).count()
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"== {modo} ({options['hilos']} hilos, cupo {cupo}) =="))
+        for nombre, r in (("inscribir", alta), ("dar de baja", baja)):
+            intentos = len(r["tiempos"])
+            segundos = r["segundos"] or 1e-9
+            self.stdout.write(
+                f"  {nombre:<12} {intentos} intentos en {r['segundos']:.2f}s "
+                f"({intentos / segundos:.1f} ops/s, {len(r['ok']) / segundos:.1f} ok/s) | ok {len(r['ok'])} "
+                f"rechazadas {r['rechazadas']} errores {r['errores']} | "
+                f"p50 {_percentil(r['tiempos'], 50) * 1000:.1f}ms p95 {_percentil(r['tiempos'], 95) * 1000:.1f}ms"
+            )
+            for mensaje in sorted(r["mensajes"])[:3]:
+                self.stdout.write(f"    {mensaje}")
+
+        problemas = []
+        if inscriptos > cupo:
+            problemas.append(f"sobreventa: {inscriptos} inscriptos con cupo {cupo}")
+        if cupo_tras_alta != cupo - inscriptos:
+            problemas.append(f"cupo tras inscribir {cupo_tras_alta}, esperado {cupo - inscriptos}")
+        if cupo_final != cupo + len(baja["ok"]) - inscriptos:
+            problemas.append(f"cupo final {cupo_final}, esperado {cupo + len(baja['ok']) - inscriptos}")
+        if restantes != inscriptos - len(baja["ok"]):
+            problemas.append(f"quedaron {restantes} inscripciones, esperadas {inscriptos - len(baja['ok'])}")
+        if problemas:
+            for p in problemas:
+                self.stdout.write(self.style.ERROR(f"  {p}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"  consistente: {inscriptos} inscriptos, cupo final {cupo_final}"))
@@ -0,0 +1,33 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from alumnos.asignacion import LOTE_DEFAULT, POLITICAS, procesar_pendientes
+
+
+class Command(BaseCommand):
+    help = "Asigna los cupos de las solicitudes de inscripción encoladas (modo cola)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--politica", choices=sorted(POLITICAS), help="Por defecto settings.INSCRIPCIONES_POLITICA")
+        parser.add_argument("--ventana", type=int, help="Segundos por ventana de sorteo (política sorteo)")
+        parser.add_argument("--lote", type=int, default=LOTE_DEFAULT, help="Máximo de solicitudes por materia y pasada")
+        parser.add_argument("--intervalo", type=float, default=0,
+                            help="Si es > 0, queda procesando en bucle cada N segundos")
+        parser.add_argument("--semilla", type=int, help="Semilla del sorteo (para reproducir una asignación)")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["semilla"])
+        while True:
+            totales = procesar_pendientes(
+                politica=options["politica"], ventana=options["ventana"], lote=options["lote"], rng=rng
+            )
+            if totales["asignadas"] or totales["rechazadas"] or not options["intervalo"]:
+                self.stdout.write(self.style.SUCCESS(
+                    f"{totales['asignadas']} asignadas, {totales['rechazadas']} rechazadas "
+                    f"en {totales['materias']} materia(s)"
+                ))
+            if not options["intervalo"]:
+                return
+            time.sleep(options["intervalo"])
@@ -13,6 +13,10 @@ class Alumno(Persona):
     )
     fecha_nacimiento = models.DateField(null=True, blank=True)
 
+    class Meta(Persona.Meta):
+        # Soporta el orden por defecto y la paginación keyset del listado de alumnos
+        indexes = [models.Index(fields=["apellido", "nombre"], name="alumno_apellido_nombre_idx")]
+
 class InscripcionAlumno(models.Model):
     """Inscripción de alumno a una materia"""
     alumno = models.ForeignKey(Alumno, on_delete=models.CASCADE, related_name="inscripciones")
@@ -23,8 +27,53 @@ class InscripcionAlumno(models.Model):
     class Meta:
         unique_together = ("alumno", "materia")
         ordering = ["-fecha_inscripcion"]
+        # Alumnos de una materia (planilla del docente, filtro de admin) ya en el orden por defecto;
+        # lo sugirió `python manage.py analizar_indices`
+        indexes = [
+            models.Index(fields=["materia", "fecha_inscripcion"], name="insc_alumno_materia_fecha_idx"),
+        ]
         verbose_name = "Inscripción de Alumno"
         verbose_name_plural = "Inscripciones de Alumnos"
 
     def __str__(self):
-        return f"{self.alumno} → {self.materia}"
\ No newline at end of file
+        return f"{self.alumno} → {self.materia}"
+
+class SolicitudInscripcion(models.Model):
+    """
+    Ticket de inscripción a materia en modo cola (settings.INSCRIPCIONES_EN_COLA).
+    El alumno recibe el ticket al instante y el comando procesar_inscripciones
+    asigna los cupos por lotes según la política configurada.
+    También representa la lista de espera de una materia sin cupo (estado EN_ESPERA):
+    al liberarse un cupo se asigna al primero de la lista.
+    """
+    ESTADO_CHOICES = [
+        ("PENDIENTE", "Pendiente"),
+        ("EN_ESPERA", "En lista de espera"),
+        ("ASIGNADA", "Asignada"),
+        ("RECHAZADA", "Rechazada"),
+    ]
+    alumno = models.ForeignKey(Alumno, on_delete=models.CASCADE, related_name="solicitudes_inscripcion")
+    materia = models.ForeignKey("materias.Materia", on_delete=models.CASCADE, related_name="solicitudes_inscripcion")
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default="PENDIENTE")
+    motivo = models.CharField(max_length=120, blank=True)
+    creado_en = models.DateTimeField(auto_now_add=True)
+    procesado_en = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["creado_en", "id"]
+        # El worker toma las pendientes de cada materia en orden de llegada; la lista de espera
+        # usa el mismo índice para el primero en la fila y para calcular la posición
+        indexes = [models.Index(fields=["materia", "estado", "creado_en"], name="solicitud_materia_estado_idx")]
+        # Una sola solicitud abierta (pendiente o en espera) por alumno y materia, aun con pedidos simultáneos
+        constraints = [
+            models.UniqueConstraint(
+                fields=["alumno", "materia"],
+                condition=models.Q(estado__in=["PENDIENTE", "EN_ESPERA"]),
+                name="solicitud_abierta_unica",
+            ),
+        ]
+        verbose_name = "Solicitud de Inscripción"
+        verbose_name_plural = "Solicitudes de Inscripción"
+
+    def __str__(self):
+        return f"{self.alumno} → {self.materia} ({self.estado})"
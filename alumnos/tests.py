@@ -1,3 +1,319 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from carreras.models import Carrera
+from estadisticas.utils import obtener, reconstruir
+from materias.models import Materia
+
+from . import asignacion
+from .models import Alumno, InscripcionAlumno, SolicitudInscripcion
+
+
+class _Base(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.carrera = Carrera.objects.create(nombre="Sistemas", duracion_anios=3)
+        cls.alumnos = [
+            Alumno.objects.create(
+                user=User.objects.create_user(username=f"4000000{i}", password="alumno1234"),
+                nombre=f"A{i}", apellido="Alumno", dni=f"4000000{i}", email=f"a{i}@example.com",
+            )
+            for i in range(5)
+        ]
+
+    def _materia(self, cupo, nombre="Algebra"):
+        return Materia.objects.create(nombre=nombre, carrera=self.carrera, cupo=cupo)
+
+    def _inscriptos(self, materia):
+        return set(InscripcionAlumno.objects.filter(materia=materia, activa=True).values_list("alumno_id", flat=True))
+
+
+@override_settings(INSCRIPCIONES_EN_COLA=False, INSCRIPCIONES_LISTA_ESPERA=True)
+class ListaEsperaTests(_Base):
+    """Los cupos que se liberan o se agregan van a la lista de espera, en orden de llegada"""
+
+    def _pedir(self, alumno, materia):
+        self.client.force_login(alumno.user)
+        return self.client.post("/api/alumnos/inscribir", {"materia_id": materia.id})
+
+    def test_sin_cupo_anota_en_espera_y_la_baja_promueve(self):
+        materia = self._materia(cupo=1)
+        primero, segundo, tercero = self.alumnos[:3]
+        self.assertEqual(self._pedir(primero, materia).status_code, 201)
+        response = self._pedir(segundo, materia)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual((response.json()["estado"], response.json()["posicion"]), ("EN_ESPERA", 1))
+        self.assertEqual(self._pedir(tercero, materia).json()["posicion"], 2)
+
+        promovida = asignacion.dar_de_baja(primero, materia.id)
+        self.assertEqual(promovida.alumno_id, segundo.id)
+        self.assertEqual(self._inscriptos(materia), {segundo.id})
+        materia.refresh_from_db()
+        self.assertEqual(materia.cupo, 0)
+
+    def test_ampliar_cupo_promueve_y_nadie_se_saltea_la_lista(self):
+        materia = self._materia(cupo=1)
+        primero, segundo, tercero, cuarto = self.alumnos[:4]
+        asignacion.inscribir(primero, materia.id)
+        asignacion.anotar_en_espera(segundo, materia.id)
+        asignacion.anotar_en_espera(tercero, materia.id)
+
+        # El admin amplía el cupo en uno: el lugar es del primero de la lista
+        self.client.force_login(User.objects.create_superuser(username="admin", password="admin1234"))
+        response = self.client.patch(
+            f"/api/admin/materia/{materia.id}", {"cupo": 1}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["cupo"], 0)
+        self.assertEqual(self._inscriptos(materia), {primero.id, segundo.id})
+
+        # Con el tercero todavía esperando, una inscripción directa no puede tomar un cupo nuevo
+        Materia.objects.filter(pk=materia.pk).update(cupo=1)
+        with self.assertRaises(asignacion.SinCupo):
+            asignacion.inscribir(cuarto, materia.id)
+        resultados = asignacion.inscribir_varias(cuarto, [materia.id])
+        self.assertEqual(resultados[0]["estado"], "sin_cupo")
+        # El pedido lo anota detrás del tercero, que es quien recibe el cupo
+        response = self._pedir(cuarto, materia)
+        self.assertEqual((response.status_code, response.json()["estado"]), (202, "EN_ESPERA"))
+        self.assertEqual(
+            SolicitudInscripcion.objects.get(alumno=tercero, materia=materia).estado, "ASIGNADA"
+        )
+        self.assertEqual(self._inscriptos(materia), {primero.id, segundo.id, tercero.id})
+
+    def test_cancelar_ticket(self):
+        materia = self._materia(cupo=0)
+        alumno, otro = self.alumnos[:2]
+        solicitud, _ = asignacion.anotar_en_espera(alumno, materia.id)
+        url = f"/api/alumnos/inscribir/solicitudes/{solicitud.id}"
+
+        self.client.force_login(otro.user)
+        self.assertEqual(self.client.delete(url).status_code, 404)
+        self.client.force_login(alumno.user)
+        self.assertEqual(self.client.delete(url).status_code, 200)
+        self.assertEqual(self.client.delete(url).status_code, 404)
+        solicitud.refresh_from_db()
+        self.assertEqual((solicitud.estado, solicitud.motivo), ("RECHAZADA", "Cancelada por el alumno"))
+
+        # Sin nadie esperando, el cupo nuevo se toma directo
+        Materia.objects.filter(pk=materia.pk).update(cupo=1)
+        asignacion.inscribir(otro, materia.id)
+        self.assertEqual(self._inscriptos(materia), {otro.id})
+
+
+class _AzarAlReves:
+    """rng de prueba: cada llamada devuelve un número menor, así el sorteo invierte el orden de llegada"""
+
+    def __init__(self):
+        self.valor = 1.0
+
+    def random(self):
+        self.valor -= 0.01
+        return self.valor
+
+
+class ColaTests(_Base):
+    """Modo cola: orden de llegada, sorteo por ventanas completas y el comando procesar_inscripciones"""
+
+    def _encolar(self, materia, alumnos, hace):
+        # creado_en es auto_now_add: se mueve al pasado para cerrar la ventana de sorteo
+        solicitudes = [asignacion.encolar(alumno, materia.id)[0] for alumno in alumnos]
+        for i, solicitud in enumerate(solicitudes):
+            SolicitudInscripcion.objects.filter(pk=solicitud.pk).update(creado_en=hace + timedelta(seconds=i))
+        return solicitudes
+
+    def _estados(self, solicitudes):
+        return [SolicitudInscripcion.objects.get(pk=s.pk).estado for s in solicitudes]
+
+    def test_orden_de_llegada(self):
+        materia = self._materia(cupo=2)
+        solicitudes = self._encolar(materia, self.alumnos[:3], timezone.now() - timedelta(minutes=5))
+        resultado = asignacion.procesar_materia(materia.id, politica="orden")
+        self.assertEqual(resultado, {"asignadas": 2, "rechazadas": 1})
+        self.assertEqual(self._estados(solicitudes), ["ASIGNADA", "ASIGNADA", "RECHAZADA"])
+        self.assertEqual(self._inscriptos(materia), {a.id for a in self.alumnos[:2]})
+        materia.refresh_from_db()
+        self.assertEqual(materia.cupo, 0)
+
+    def test_sorteo_mezcla_la_ventana_completa(self):
+        materia = self._materia(cupo=5)
+        # Cinco solicitudes en una ventana cerrada de una hora, con lote de 2
+        inicio = asignacion._inicio_ventana(timezone.now(), 3600) - timedelta(hours=2)
+        solicitudes = self._encolar(materia, self.alumnos, inicio)
+        resultado = asignacion.procesar_materia(materia.id, politica="sorteo", ventana=3600, lote=2, rng=_AzarAlReves())
+        # Recortar antes de sortear sólo podía elegir a los dos primeros en llegar
+        self.assertEqual(resultado, {"asignadas": 2, "rechazadas": 0})
+        self.assertEqual(self._inscriptos(materia), {self.alumnos[4].id, self.alumnos[3].id})
+        self.assertEqual(self._estados(solicitudes).count("PENDIENTE"), 3)
+
+    def test_sorteo_no_toca_la_ventana_abierta(self):
+        materia = self._materia(cupo=5)
+        solicitud = asignacion.encolar(self.alumnos[0], materia.id)[0]
+        resultado = asignacion.procesar_materia(materia.id, politica="sorteo", ventana=3600)
+        self.assertEqual(resultado, {"asignadas": 0, "rechazadas": 0})
+        self.assertEqual(self._estados([solicitud]), ["PENDIENTE"])
+
+    def test_una_solicitud_abierta_por_alumno(self):
+        materia = self._materia(cupo=1)
+        alumno = self.alumnos[0]
+        solicitud, creada = asignacion.encolar(alumno, materia.id)
+        self.assertTrue(creada)
+        self.assertEqual(asignacion.encolar(alumno, materia.id), (solicitud, False))
+        # Lo que el chequeo previo de encolar no ve en dos pedidos simultáneos lo ataja la base
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            SolicitudInscripcion.objects.create(alumno=alumno, materia=materia, estado="PENDIENTE")
+        # Una vez procesada, el alumno puede volver a pedir
+        asignacion.procesar_materia(materia.id, politica="orden")
+        self.assertTrue(asignacion.encolar(alumno, materia.id)[1])
+
+    def test_cola_y_lista_de_espera_comparten_el_ticket(self):
+        materia = self._materia(cupo=0)
+        alumno = self.alumnos[0]
+        solicitud, creada = asignacion.encolar(alumno, materia.id)
+        self.assertTrue(creada)
+        self.assertEqual(asignacion.anotar_en_espera(alumno, materia.id), (solicitud, False))
+        self.assertEqual(asignacion.encolar(alumno, materia.id, estado="EN_ESPERA"), (solicitud, False))
+        self.assertEqual(
+            list(SolicitudInscripcion.objects.filter(alumno=alumno, materia=materia).values_list("estado", flat=True)),
+            ["PENDIENTE"],
+        )
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            SolicitudInscripcion.objects.create(alumno=alumno, materia=materia, estado="EN_ESPERA")
+
+    def test_comando_procesar_inscripciones(self):
+        algebra, fisica = self._materia(cupo=1), self._materia(cupo=3, nombre="Fisica")
+        hace = timezone.now() - timedelta(hours=1)
+        self._encolar(algebra, self.alumnos[:2], hace)
+        self._encolar(fisica, self.alumnos[2:4], hace)
+        salida = StringIO()
+        call_command("procesar_inscripciones", politica="orden", stdout=salida)
+        self.assertIn("3 asignadas, 1 rechazadas en 2 materia(s)", salida.getvalue())
+        self.assertEqual(self._inscriptos(algebra), {self.alumnos[0].id})
+        self.assertEqual(self._inscriptos(fisica), {self.alumnos[2].id, self.alumnos[3].id})
+        self.assertFalse(SolicitudInscripcion.objects.filter(estado="PENDIENTE").exists())
+
+
+@override_settings(INSCRIPCIONES_EN_COLA=False)
+class InscripcionMultipleTests(_Base):
+    """inscribir_varias y POST /api/alumnos/inscribir/multiple en sus dos modos"""
+
+    URL = "/api/alumnos/inscribir/multiple"
+
+    def setUp(self):
+        self.alumno = self.alumnos[0]
+        self.client.force_login(self.alumno.user)
+        self.algebra = self._materia(cupo=2)
+        self.fisica = self._materia(cupo=2, nombre="Fisica")
+        self.llena = self._materia(cupo=0, nombre="Quimica")
+
+    def _pedir(self, materias, modo):
+        return self.client.post(self.URL, {"materias": materias, "modo": modo}, content_type="application/json")
+
+    def _cupos(self):
+        return list(Materia.objects.filter(pk__in=[self.algebra.pk, self.fisica.pk, self.llena.pk])
+                    .order_by("pk").values_list("cupo", flat=True))
+
+    def _estados(self, response):
+        return {r["materia"]: r["estado"] for r in response.json()["resultados"]}
+
+    def test_todo_o_nada_sin_cupo_cancela_el_resto(self):
+        response = self._pedir([self.algebra.id, self.llena.id, self.fisica.id], "todo_o_nada")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["inscriptas"], 0)
+        self.assertEqual(self._estados(response), {
+            self.algebra.id: "cancelada", self.llena.id: "sin_cupo", self.fisica.id: "cancelada",
+        })
+        self.assertFalse(InscripcionAlumno.objects.filter(alumno=self.alumno).exists())
+        self.assertEqual(self._cupos(), [2, 2, 0])
+
+    def test_todo_o_nada_deshace_los_cupos_ya_tomados(self):
+        # La validación previa ve cupo en las dos, pero otro alumno toma el último de Fisica
+        # entre la validación y el UPDATE condicional: el cupo ya descontado de Algebra se devuelve
+        tomar_cupo = asignacion.tomar_cupo
+
+        def sin_cupo_en_fisica(materia_id, **kwargs):
+            return materia_id != self.fisica.id and tomar_cupo(materia_id, **kwargs)
+
+        with mock.patch.object(asignacion, "tomar_cupo", side_effect=sin_cupo_en_fisica):
+            resultados = asignacion.inscribir_varias(self.alumno, [self.algebra.id, self.fisica.id], todo_o_nada=True)
+        self.assertEqual([r["estado"] for r in resultados], ["cancelada", "sin_cupo"])
+        self.assertFalse(InscripcionAlumno.objects.filter(alumno=self.alumno).exists())
+        self.assertEqual(self._cupos(), [2, 2, 0])
+
+    def test_parcial_inscribe_las_que_puede(self):
+        response = self._pedir([self.algebra.id, self.llena.id, self.fisica.id, 999999], "parcial")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["inscriptas"], 2)
+        self.assertEqual(self._estados(response), {
+            self.algebra.id: "inscripta", self.llena.id: "sin_cupo", self.fisica.id: "inscripta",
+            999999: "no_encontrada",
+        })
+        self.assertEqual(self._cupos(), [1, 1, 0])
+
+        # Repetir el pedido no inscribe dos veces
+        response = self._pedir([self.algebra.id, self.fisica.id], "parcial")
+        self.assertEqual((response.status_code, response.json()["inscriptas"]), (200, 0))
+        self.assertEqual(set(self._estados(response).values()), {"ya_inscripta"})
+        self.assertEqual(self._cupos(), [1, 1, 0])
+
+    def test_ids_repetidos_en_el_pedido(self):
+        response = self._pedir([self.algebra.id, self.algebra.id, self.fisica.id, self.algebra.id], "todo_o_nada")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([r["materia"] for r in response.json()["resultados"]], [self.algebra.id, self.fisica.id])
+        self.assertEqual(InscripcionAlumno.objects.filter(alumno=self.alumno, materia=self.algebra).count(), 1)
+        self.assertEqual(self._cupos(), [1, 1, 0])
+
+    def test_reactiva_una_inscripcion_dada_de_baja(self):
+        InscripcionAlumno.objects.create(alumno=self.alumno, materia=self.algebra, activa=False)
+        response = self._pedir([self.algebra.id], "parcial")
+        self.assertEqual(self._estados(response), {self.algebra.id: "inscripta"})
+        self.assertEqual(self._inscriptos(self.algebra), {self.alumno.id})
+        self.assertEqual(self._cupos(), [1, 2, 0])
+
+
+@override_settings(INSCRIPCIONES_EN_COLA=False)
+class InscripcionDirectaTests(_Base):
+    """inscribir: alta, reactivación de una inscripción inactiva y rechazo de la repetida"""
+
+    def test_reactiva_inscripcion_inactiva(self):
+        materia = self._materia(cupo=2)
+        alumno = self.alumnos[0]
+        anterior = InscripcionAlumno.objects.create(alumno=alumno, materia=materia, activa=False)
+        reconstruir()
+        with self.captureOnCommitCallbacks(execute=True):
+            inscripcion = asignacion.inscribir(alumno, materia.id)
+        self.assertEqual((inscripcion.pk, inscripcion.activa), (anterior.pk, True))
+        self.assertEqual(self._inscriptos(materia), {alumno.id})
+        materia.refresh_from_db()
+        self.assertEqual(materia.cupo, 1)
+        self.assertEqual(obtener().inscripciones_activas, reconstruir().inscripciones_activas)
+        self.assertEqual(materia.estadisticas.inscriptos_activos, 1)
+
+        with self.assertRaisesMessage(asignacion.InscripcionRechazada, "Ya estás inscrito"):
+            asignacion.inscribir(alumno, materia.id)
+        materia.refresh_from_db()
+        self.assertEqual(materia.cupo, 1)
+
+    def test_reactivacion_simultanea(self):
+        # Otro pedido del mismo alumno la reactiva entre la lectura y el UPDATE: se rechaza sin tomar cupo
+        materia = self._materia(cupo=2)
+        alumno = self.alumnos[0]
+        inscripcion = InscripcionAlumno.objects.create(alumno=alumno, materia=materia, activa=False)
+        tomar_cupo = asignacion.tomar_cupo
+
+        def con_reactivacion_concurrente(materia_id, **kwargs):
+            InscripcionAlumno.objects.filter(pk=inscripcion.pk).update(activa=True)
+            return tomar_cupo(materia_id, **kwargs)
+
+        with mock.patch.object(asignacion, "tomar_cupo", side_effect=con_reactivacion_concurrente), \
+                self.assertRaisesMessage(asignacion.InscripcionRechazada, "Ya estás inscrito"):
+            asignacion.inscribir(alumno, materia.id)
+        materia.refresh_from_db()
+        self.assertEqual(materia.cupo, 2)
@@ -0,0 +1,329 @@
+"""
+Importación masiva de carreras, materias y alumnos desde CSV o XLSX.
+
+El archivo se lee fila por fila (no se carga entero en memoria). Antes de
+empezar se precargan en memoria las claves únicas existentes (nombre de
+carrera, nombre de materia por carrera, DNI y email de alumno) y cada fila se
+valida contra ese conjunto y contra las filas anteriores del mismo archivo,
+así los duplicados se rechazan sin una consulta por fila. Las filas válidas
+se insertan con bulk_create en lotes, cada lote en su propia transacción: el
+lock de escritura (y la fila de contadores) se toma sólo mientras se escribe un
+lote, y si la importación se corta, lo ya confirmado queda. Si un lote falla en
+la base (ej. un alta concurrente con la misma clave, que la precarga no vio) se
+reintenta fila por fila para reportar cuál fue.
+
+bulk_create no dispara las señales de estadisticas ni pasa por Materia.save(): acá
+se aplican los deltas de los contadores, la versión del catálogo, las filas de
+EstadisticasMateria y las franjas de HorarioMateria.
+
+XLSX requiere openpyxl (dependencia opcional).
+"""
+import csv
+import io
+from datetime import date, datetime
+from pathlib import Path
+
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db import IntegrityError, transaction
+
+from alumnos.models import Alumno
+from carreras.models import Carrera
+from estadisticas.utils import aplicar_deltas, marcar_catalogo_modificado, reconstruir_materias
+from materias.horarios import parsear_horario
+from materias.models import HorarioMateria, Materia
+
+try:
+    import openpyxl
+except ImportError:  # pragma: no cover - depende del entorno
+    openpyxl = None
+
+LOTE = 1000
+# Errores que se devuelven en el informe; el resto sólo se cuenta
+MAX_ERRORES = 1000
+FORMATOS = (".csv", ".xlsx")
+
+
+# Lectura
+
+def _texto(valor):
+    # Celdas de Excel: 30123456.0 -> "30123456", fechas -> ISO
+    if valor is None:
+        return ""
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    if isinstance(valor, datetime):
+        return valor.date().isoformat()
+    if isinstance(valor, date):
+        return valor.isoformat()
+    return str(valor).strip()
+
+
+def _filas_csv(archivo):
+    texto = io.TextIOWrapper(archivo, encoding="utf-8-sig", newline="")
+    primera = texto.readline()
+    # Excel en español exporta con ";" como separador
+    separador = ";" if primera.count(";") > primera.count(",") else ","
+    yield from csv.reader(_encadenar(primera, texto), delimiter=separador)
+
+
+def _encadenar(primera, resto):
+    yield primera
+    yield from resto
+
+
+def _filas_xlsx(archivo):
+    if openpyxl is None:
+        raise ImproperlyConfigured("Importar XLSX requiere openpyxl (pip install openpyxl)")
+    libro = openpyxl.load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        yield from libro.active.iter_rows(values_only=True)
+    finally:
+        libro.close()
+
+
+def leer_filas(archivo, nombre):
+    """
+    Itera (número de fila en el archivo, {columna: texto}) de un CSV o XLSX abierto
+    en modo binario. La primera fila es el encabezado; las filas vacías se saltean.
+    """
+    extension = Path(nombre).suffix.lower()
+    if extension not in FORMATOS:
+        raise ValueError(f"Formato no soportado: {extension or nombre!r} (usar {', '.join(FORMATOS)})")
+    filas = _filas_xlsx(archivo) if extension == ".xlsx" else _filas_csv(archivo)
+    try:
+        encabezado = [_texto(c).lower() for c in next(filas, ())]
+        for numero, valores in enumerate(filas, start=2):
+            valores = [_texto(v) for v in valores]
+            if any(valores):
+                yield numero, dict(zip(encabezado, valores))
+    except UnicodeDecodeError:
+        raise ValueError("El CSV debe estar codificado en UTF-8")
+
+
+# Validación
+
+class _Importador:
+    modelo = None
+    contador = ""
+    # Columna del archivo -> campo del modelo (se valida con las reglas del campo)
+    campos = ()
+    requeridas = ()
+
+    def precargar(self):
+        """Carga en memoria las claves únicas que ya existen en la base"""
+
+    def validar(self, fila):
+        """Devuelve (datos, errores) de una fila; los datos ya están convertidos"""
+        errores = [f"Falta {columna}" for columna in self.requeridas if not fila.get(columna)]
+        datos = {}
+        for columna in self.campos:
+            campo = self.modelo._meta.get_field(columna)
+            valor = fila.get(columna, "")
+            if valor == "" and not campo.has_default() and campo.null:
+                valor = None
+            elif valor == "" and campo.has_default():
+                continue
+            try:
+                datos[columna] = campo.clean(valor, None)
+            except ValidationError as e:
+                if columna not in self.requeridas or fila.get(columna):
+                    errores.extend(f"{columna}: {m}" for m in e.messages)
+        return datos, errores
+
+    def registrar(self, objeto):
+        """Agrega las claves de una fila aceptada para detectar duplicados en el resto del archivo"""
+
+    def construir(self, datos):
+        return self.modelo(**datos)
+
+    def despues(self, creados):
+        """Mantiene contadores y estadísticas de un lote insertado (bulk_create no dispara señales)"""
+        aplicar_deltas(**{self.contador: len(creados)})
+
+
+class _CarrerasPorNombre:
+    """Resuelve la columna carrera por id o por nombre con un solo diccionario precargado"""
+
+    def precargar_carreras(self):
+        self.carreras = {}
+        for pk, nombre in Carrera.objects.order_by().values_list("pk", "nombre"):
+            self.carreras[str(pk)] = pk
+            self.carreras[nombre.casefold()] = pk
+
+    def carrera(self, fila, errores, requerida=True):
+        valor = fila.get("carrera", "")
+        if not valor:
+            if requerida:
+                errores.append("Falta carrera")
+            return None
+        pk = self.carreras.get(valor) or self.carreras.get(valor.casefold())
+        if pk is None:
+            errores.append(f"carrera: no existe {valor!r}")
+        return pk
+
+
+class ImportadorCarreras(_Importador):
+    modelo = Carrera
+    contador = "carreras"
+    campos = ("nombre", "duracion_anios", "descripcion")
+    requeridas = ("nombre", "duracion_anios")
+
+    def precargar(self):
+        self.nombres = {n.casefold() for n in Carrera.objects.values_list("nombre", flat=True)}
+
+    def validar(self, fila):
+        datos, errores = super().validar(fila)
+        if datos.get("nombre") and datos["nombre"].casefold() in self.nombres:
+            errores.append(f"Ya existe la carrera {datos['nombre']!r}")
+        return datos, errores
+
+    def registrar(self, objeto):
+        self.nombres.add(objeto.nombre.casefold())
+
+    def despues(self, creados):
+        super().despues(creados)
+        marcar_catalogo_modificado()
+
+
+class ImportadorMaterias(_CarrerasPorNombre, _Importador):
+    modelo = Materia
+    contador = "materias"
+    campos = ("nombre", "horario", "cupo")
+    requeridas = ("nombre",)
+
+    def precargar(self):
+        self.precargar_carreras()
+        self.claves = {
+            (carrera_id, nombre.casefold())
+            for carrera_id, nombre in Materia.objects.order_by().values_list("carrera_id", "nombre")
+        }
+
+    def validar(self, fila):
+        datos, errores = super().validar(fila)
+        datos["carrera_id"] = self.carrera(fila, errores)
+        if datos.get("nombre") and (datos["carrera_id"], datos["nombre"].casefold()) in self.claves:
+            errores.append(f"Ya existe la materia {datos['nombre']!r} en esa carrera")
+        return datos, errores
+
+    def registrar(self, objeto):
+        self.claves.add((objeto.carrera_id, objeto.nombre.casefold()))
+
+    def despues(self, creados):
+        super().despues(creados)
+        # bulk_create no pasa por Materia.save(): las franjas del horario se generan acá
+        HorarioMateria.objects.bulk_create([
+            HorarioMateria(materia_id=m.pk, dia=dia, inicio=inicio, fin=fin)
+            for m in creados for dia, inicio, fin in parsear_horario(m.horario)
+        ])
+        # Filas de EstadisticasMateria en cero para las materias nuevas
+        reconstruir_materias([m.pk for m in creados])
+        marcar_catalogo_modificado()
+
+
+class ImportadorAlumnos(_CarrerasPorNombre, _Importador):
+    modelo = Alumno
+    contador = "alumnos"
+    campos = ("nombre", "apellido", "dni", "email", "telefono", "direccion", "fecha_nacimiento")
+    requeridas = ("nombre", "apellido", "dni", "email")
+
+    def precargar(self):
+        self.precargar_carreras()
+        self.dnis = set()
+        self.emails = set()
+        for dni, email in Alumno.objects.order_by().values_list("dni", "email"):
+            self.dnis.add(dni)
+            self.emails.add(email.casefold())
+
+    def validar(self, fila):
+        datos, errores = super().validar(fila)
+        datos["carrera_principal_id"] = self.carrera(fila, errores, requerida=False)
+        if datos.get("dni") in self.dnis:
+            errores.append(f"Ya existe un alumno con DNI {datos['dni']}")
+        if datos.get("email") and datos["email"].casefold() in self.emails:
+            errores.append(f"Ya existe un alumno con email {datos['email']}")
+        return datos, errores
+
+    def registrar(self, objeto):
+        self.dnis.add(objeto.dni)
+        self.emails.add(objeto.email.casefold())
+
+
+IMPORTADORES = {
+    "carreras": ImportadorCarreras,
+    "materias": ImportadorMaterias,
+    "alumnos": ImportadorAlumnos,
+}
+
+
+# Inserción
+
+def _insertar(importador, pendientes, informe):
+    objetos = [objeto for _, objeto in pendientes]
+    try:
+        # El lote y sus contadores/franjas se confirman juntos
+        with transaction.atomic():
+            creados = importador.modelo.objects.bulk_create(objetos)
+            importador.despues(creados)
+    except IntegrityError:
+        # Algo cambió en la base desde la precarga: fila por fila para saber cuál choca
+        creados = []
+        for numero, objeto in pendientes:
+            try:
+                with transaction.atomic():
+                    objeto.save(force_insert=True)
+            except IntegrityError as e:
+                _error(informe, numero, [f"Rechazada por la base: {e}"])
+                continue
+            creados.append(objeto)
+        # save() disparó las señales de cada fila: los contadores ya están al día
+        informe["creadas"] += len(creados)
+        return
+    informe["creadas"] += len(creados)
+
+
+def _error(informe, numero, errores):
+    informe["con_errores"] += 1
+    if len(informe["errores"]) < MAX_ERRORES:
+        informe["errores"].append({"fila": numero, "errores": errores})
+
+
+def importar(tipo, filas, lote=LOTE, simular=False):
+    """
+    Importa las filas (ver leer_filas) de `tipo` ("carreras", "materias" o "alumnos").
+    Devuelve {"tipo", "filas", "creadas", "con_errores", "errores": [{"fila", "errores"}],
+    "simulado"}. Las filas con errores se saltean y el resto se inserta; con simular=True
+    sólo se valida. Cada lote se confirma por separado: si la lectura del archivo falla a
+    mitad de camino, el ValueError indica cuántas filas ya quedaron importadas.
+    """
+    if tipo not in IMPORTADORES:
+        raise ValueError(f"Tipo desconocido: {tipo!r} (usar {', '.join(IMPORTADORES)})")
+    if lote < 1:
+        raise ValueError("El lote debe ser mayor que cero")
+    importador = IMPORTADORES[tipo]()
+    informe = {"tipo": tipo, "filas": 0, "creadas": 0, "con_errores": 0, "errores": [], "simulado": simular}
+    pendientes = []
+    # Sin transacción alrededor: lo que cambie después de la precarga lo atajan las
+    # restricciones únicas de la base y el reintento fila por fila de _insertar
+    importador.precargar()
+    try:
+        for numero, fila in filas:
+            informe["filas"] += 1
+            datos, errores = importador.validar(fila)
+            if errores:
+                _error(informe, numero, errores)
+                continue
+            objeto = importador.construir(datos)
+            importador.registrar(objeto)
+            if simular:
+                continue
+            pendientes.append((numero, objeto))
+            if len(pendientes) >= lote:
+                _insertar(importador, pendientes, informe)
+                pendientes = []
+    except ValueError as e:
+        if informe["creadas"]:
+            raise ValueError(f"{e} (fila {informe['filas'] + 1}); ya se importaron {informe['creadas']} filas") from e
+        raise
+    if pendientes:
+        _insertar(importador, pendientes, informe)
+    return informe
@@ -0,0 +1,204 @@
+import json
+import re
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models.lookups import Lookup
+from django.db.models.sql.where import WhereNode
+
+from api.planes import CONSULTAS_REPRESENTATIVAS
+
+SNAPSHOT_DEFAULT = Path(settings.BASE_DIR) / "api" / "planes_consultas.json"
+
+SCAN = "scan"
+ORDEN_TEMPORAL = "orden_temporal"
+INDICE_PARCIAL = "indice_parcial"
+
+
+def _lineas_plan(queryset):
+    lineas = []
+    for linea in queryset.explain().splitlines():
+        if connection.vendor == "sqlite":
+            # "5 0 0 SEARCH ..." -> "SEARCH ...": los ids de nodo cambian sin que cambie el plan
+            linea = re.sub(r"^\d+ \d+ \d+ ", "", linea.strip())
+        else:
+            linea = re.sub(r"\s*\(cost=[^)]*\)", "", linea.rstrip())
+        if linea:
+            lineas.append(linea)
+    return lineas
+
+
+def _lookups(nodo):
+    for hijo in nodo.children:
+        if isinstance(hijo, WhereNode):
+            yield from _lookups(hijo)
+        elif isinstance(hijo, Lookup) and hasattr(hijo.lhs, "target"):
+            yield hijo
+
+
+def _filtros_por_tabla(query):
+    """tabla -> [(campo, es_igualdad)] según el WHERE del queryset"""
+    filtros = {}
+    for lookup in _lookups(query.where):
+        tabla = query.alias_map[lookup.lhs.alias].table_name
+        campo = lookup.lhs.target
+        if campo.get_internal_type() == "BooleanField":
+            # `activa=True` se compila como `WHERE "activa"`, que no sirve para buscar en un índice;
+            # además separa poco las filas
+            continue
+        par = (campo, lookup.lookup_name in ("exact", "isnull"))
+        if par not in filtros.setdefault(tabla, []):
+            filtros[tabla].append(par)
+    return filtros
+
+
+def _orden_base(query, modelo):
+    """Campos de orden que pertenecen a la tabla base; None si alguno es de otra tabla"""
+    orden = list(query.order_by) or (list(modelo._meta.ordering) if query.default_ordering else [])
+    campos = []
+    for item in orden:
+        if not isinstance(item, str):
+            return None
+        nombre = item.lstrip("-")
+        if "__" in nombre:
+            return None
+        if nombre == "pk":
+            continue
+        campos.append(("-" if item.startswith("-") else "") + modelo._meta.get_field(nombre).name)
+    return campos
+
+
+def _indices_existentes(modelo):
+    """Listas de columnas de los índices que ya tiene la tabla (incluye unique y FKs)"""
+    meta = modelo._meta
+    indices = [[meta.get_field(f.lstrip("-")).column for f in i.fields] for i in meta.indexes]
+    indices += [[meta.get_field(f).column for f in grupo] for grupo in meta.unique_together]
+    indices += [[f.column] for f in meta.concrete_fields if f.db_index or f.unique or f.primary_key]
+    return indices
+
+
+def _unicos(modelo):
+    meta = modelo._meta
+    grupos = [{meta.get_field(f).column for f in grupo} for grupo in meta.unique_together]
+    return grupos + [{f.column} for f in meta.concrete_fields if f.unique or f.primary_key]
+
+
+def _analizar(queryset, lineas):
+    query = queryset.query
+    modelo = queryset.model
+    tabla_base = modelo._meta.db_table
+    filtros = _filtros_por_tabla(query)
+    modelos = {m._meta.db_table: m for m in apps.get_models()}
+    hallazgos = []
+
+    for linea in lineas:
+        if connection.vendor == "sqlite":
+            scan = re.match(r"SCAN (\w+)(?: AS \w+)?$", linea)
+            search = re.match(r"SEARCH (\w+)(?: AS \w+)? USING (?:COVERING )?INDEX (\w+) \(([^)]*)\)", linea)
+            orden = "USE TEMP B-TREE" in linea
+        else:
+            scan = re.search(r"Seq Scan on (\w+)", linea)
+            search = None
+            orden = re.match(r"\s*(->\s*)?(Incremental )?Sort\b", linea) is not None
+        if scan:
+            hallazgos.append({"tipo": SCAN, "tabla": scan.group(1), "detalle": linea})
+        if search:
+            usadas = set(re.findall(r"(\w+)[=<>]", search.group(3)))
+            faltan = [c for c, igualdad in filtros.get(search.group(1), [])
+                      if igualdad and c.column not in usadas]
+            modelo_search = modelos.get(search.group(1))
+            # Si el índice fija una clave única, devuelve a lo sumo una fila: el resto del filtro no importa
+            unica = modelo_search is not None and any(u <= usadas for u in _unicos(modelo_search))
+            if faltan and not unica:
+                hallazgos.append({"tipo": INDICE_PARCIAL, "tabla": search.group(1), "detalle": linea})
+        if orden:
+            hallazgos.append({"tipo": ORDEN_TEMPORAL, "tabla": tabla_base, "detalle": linea})
+
+    sugerencias = []
+    for tabla in dict.fromkeys(h["tabla"] for h in hallazgos):
+        modelo_tabla = modelos.get(tabla)
+        if modelo_tabla is None:
+            continue
+        # Igualdades primero, después rangos y orden
+        campos = [c.name for c, igualdad in filtros.get(tabla, []) if igualdad]
+        campos += [c.name for c, igualdad in filtros.get(tabla, []) if not igualdad]
+        if tabla == tabla_base and any(h["tipo"] == ORDEN_TEMPORAL for h in hallazgos):
+            orden = _orden_base(query, modelo)
+            if orden is None:
+                sugerencias.append({"modelo": modelo_tabla._meta.label, "campos": None,
+                                    "motivo": "el orden usa columnas de otra tabla; no se resuelve con un índice"})
+                orden = []
+            campos += [c for c in orden if c.lstrip("-") not in campos]
+        columnas = [modelo_tabla._meta.get_field(c.lstrip("-")).column for c in campos]
+        cubierto = any(i[:len(columnas)] == columnas for i in _indices_existentes(modelo_tabla))
+        if campos and not cubierto:
+            sugerencias.append({"modelo": modelo_tabla._meta.label, "campos": campos, "motivo": "filtros y orden"})
+    return hallazgos, sugerencias
+
+
+class Command(BaseCommand):
+    help = (
+        "Pasa las consultas representativas de la API (api/planes.py) por EXPLAIN, marca scans completos, "
+        "órdenes con B-tree temporal e índices usados a medias, y sugiere índices. Compara contra el snapshot "
+        "de planes guardado y falla si alguna consulta empeoró"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("consultas", nargs="*", help="Nombres de api/planes.py (por defecto todas)")
+        parser.add_argument("--snapshot", default=str(SNAPSHOT_DEFAULT), help="Archivo JSON de planes")
+        parser.add_argument("--guardar", action="store_true", help="Actualiza el snapshot con los planes actuales")
+
+    def handle(self, *args, **options):
+        nombres = options["consultas"] or list(CONSULTAS_REPRESENTATIVAS)
+        desconocidas = set(nombres) - set(CONSULTAS_REPRESENTATIVAS)
+        if desconocidas:
+            raise CommandError(f"Consultas desconocidas: {', '.join(sorted(desconocidas))}")
+
+        snapshot_path = Path(options["snapshot"])
+        snapshot = json.loads(snapshot_path.read_text(encoding="utf-8")) if snapshot_path.exists() else {}
+        anteriores = snapshot.get("planes", {}) if snapshot.get("motor") == connection.vendor else {}
+
+        planes = {}
+        regresiones = []
+        for nombre in nombres:
+            queryset = CONSULTAS_REPRESENTATIVAS[nombre]()
+            lineas = _lineas_plan(queryset)
+            hallazgos, sugerencias = _analizar(queryset, lineas)
+            planes[nombre] = {"plan": lineas, "hallazgos": sorted({f"{h['tipo']}:{h['tabla']}" for h in hallazgos})}
+
+            estilo = self.style.WARNING if hallazgos else self.style.SUCCESS
+            self.stdout.write(estilo(f"{nombre}: {'OK' if not hallazgos else f'{len(hallazgos)} hallazgo(s)'}"))
+            for linea in lineas:
+                self.stdout.write(f"    {linea}")
+            for s in sugerencias:
+                if s["campos"]:
+                    self.stdout.write(f"    sugerencia: {s['modelo']} models.Index(fields={s['campos']!r})")
+                else:
+                    self.stdout.write(f"    nota: {s['modelo']}: {s['motivo']}")
+
+            anterior = anteriores.get(nombre)
+            if anterior is not None:
+                nuevos = set(planes[nombre]["hallazgos"]) - set(anterior["hallazgos"])
+                if nuevos:
+                    regresiones.append((nombre, sorted(nuevos)))
+                elif anterior["plan"] != lineas:
+                    self.stdout.write(f"    el plan cambió respecto del snapshot (sin hallazgos nuevos)")
+
+        if options["guardar"]:
+            if options["consultas"]:
+                planes = {**anteriores, **planes}
+            snapshot_path.write_text(
+                json.dumps({"motor": connection.vendor, "planes": planes}, indent=2, ensure_ascii=False) + "\n",
+                encoding="utf-8",
+            )
+            self.stdout.write(self.style.SUCCESS(f"Snapshot guardado en {snapshot_path}"))
+            return
+        if regresiones:
+            for nombre, nuevos in regresiones:
+                self.stdout.write(self.style.ERROR(f"{nombre}: empeoró respecto del snapshot: {', '.join(nuevos)}"))
+            raise CommandError(f"{len(regresiones)} consulta(s) empeoraron respecto del snapshot")
+        if not anteriores:
+            self.stdout.write("No hay snapshot para este motor; usar --guardar para crearlo")
@@ -0,0 +1,164 @@
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import F
+from django.test import Client
+from django.test.utils import override_settings
+
+from carreras.models import Carrera
+from estadisticas.utils import reconstruir
+from materias.models import Materia
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+_AUSENTE = object()
+
+
+@contextmanager
+def _ajustes_conexion(**cambios):
+    """Cambia claves de settings.DATABASES (y OPTIONS) de todos los alias para las conexiones que se abran adentro"""
+    anteriores = []
+    for ajustes in connections.settings.values():
+        for clave, valor in cambios.items():
+            # Las claves en minúscula (transaction_mode, pool) van en OPTIONS
+            destino = ajustes["OPTIONS"] if clave.islower() else ajustes
+            anteriores.append((destino, clave, destino.get(clave, _AUSENTE)))
+            destino[clave] = valor
+    connections.close_all()
+    try:
+        yield
+    finally:
+        for destino, clave, valor in reversed(anteriores):
+            if valor is _AUSENTE:
+                destino.pop(clave, None)
+            else:
+                destino[clave] = valor
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el perfil de base de datos activo (DB_MOTOR): costo de abrir una conexión, requests/s de "
+        "lectura con y sin conexiones persistentes, y escrituras concurrentes que leen antes de escribir"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--conexiones", type=int, default=50, help="Conexiones a abrir y cerrar")
+        parser.add_argument("--requests", type=int, default=300, help="GETs por variante")
+        parser.add_argument("--hilos", type=int, default=8, help="Hilos de escritura")
+        parser.add_argument("--transacciones", type=int, default=50, help="Transacciones por hilo")
+
+    def handle(self, *args, **options):
+        ajustes = connection.settings_dict
+        pool = ajustes["OPTIONS"].get("pool")
+        self.stdout.write(
+            f"Motor: {connection.vendor}  CONN_MAX_AGE: {ajustes['CONN_MAX_AGE']}  "
+            f"pool: {pool or '-'}  transaction_mode: {ajustes['OPTIONS'].get('transaction_mode', '-')}"
+        )
+
+        tag = uuid.uuid4().hex[:6]
+        carrera = Carrera.objects.create(nombre=f"Benchmark DB {tag}", duracion_anios=1)
+        materias = Materia.objects.bulk_create(  # type: ignore[attr-defined]
+            [Materia(nombre=f"Benchmark DB {tag} {i:02d}", carrera=carrera, cupo=10**6) for i in range(20)]
+        )
+        try:
+            self._conexiones(options["conexiones"])
+            self._requests(carrera, options["requests"], pool)
+            self._escrituras(materias, options["hilos"], options["transacciones"])
+        finally:
+            Materia.objects.filter(carrera=carrera).delete()  # type: ignore[attr-defined]
+            carrera.delete()
+            reconstruir()
+
+    def _conexiones(self, cantidad):
+        tiempos = []
+        for _ in range(cantidad):
+            connection.close()
+            inicio = time.perf_counter()
+            connection.ensure_connection()
+            tiempos.append(time.perf_counter() - inicio)
+        connection.close()
+        self.stdout.write(
+            f"Abrir conexión: p50 {_percentil(tiempos, 50) * 1000:.2f} ms, "
+            f"p95 {_percentil(tiempos, 95) * 1000:.2f} ms (lo paga cada request con CONN_MAX_AGE = 0)"
+        )
+
+    def _requests(self, carrera, cantidad, pool):
+        urls = ["/api/carreras/", f"/api/carreras/{carrera.id}/materias/"]
+        variantes = [("sin persistencia", {"CONN_MAX_AGE": 0, "pool": False} if pool else {"CONN_MAX_AGE": 0})]
+        if pool or connection.settings_dict["CONN_MAX_AGE"] != 0:
+            variantes.append(("pool" if pool else "persistentes", {}))
+
+        client = Client()
+        for nombre, cambios in variantes:
+            with _ajustes_conexion(**cambios), override_settings(ALLOWED_HOSTS=["*"]):
+                tiempos = []
+                inicio_total = time.perf_counter()
+                for i in range(cantidad):
+                    inicio = time.perf_counter()
+                    client.get(urls[i % len(urls)])
+                    tiempos.append(time.perf_counter() - inicio)
+                total = time.perf_counter() - inicio_total
+            self.stdout.write(
+                f"GET ({nombre}): {cantidad / total:.0f} req/s, p50 {_percentil(tiempos, 50) * 1000:.2f} ms, "
+                f"p95 {_percentil(tiempos, 95) * 1000:.2f} ms"
+            )
+
+    def _escrituras(self, materias, hilos, transacciones):
+        variantes = [("perfil activo", {})]
+        if connection.vendor == "sqlite" and connection.settings_dict["OPTIONS"].get("transaction_mode"):
+            variantes.insert(0, ("DEFERRED", {"transaction_mode": None}))
+
+        for nombre, cambios in variantes:
+            with _ajustes_conexion(**cambios):
+                ok, errores, tiempos = self._martillar(materias, hilos, transacciones)
+            total = sum(tiempos) / max(hilos, 1)
+            self.stdout.write(
+                f"Escrituras ({nombre}, {hilos} hilos): {ok} ok, {errores} errores, "
+                f"{ok / total if total else 0:.0f} tx/s, p95 {_percentil(tiempos, 95) * 1000:.2f} ms"
+            )
+
+    @staticmethod
+    def _martillar(materias, hilos, transacciones):
+        # Cada transacción lee la materia y después la modifica, como la carga de notas y el ABM de materias
+        candado = threading.Lock()
+        resultado = {"ok": 0, "errores": 0, "tiempos": []}
+
+        def trabajar(desplazamiento):
+            ok = errores = 0
+            tiempos = []
+            try:
+                for i in range(transacciones):
+                    materia = materias[(desplazamiento + i) % len(materias)]
+                    inicio = time.perf_counter()
+                    try:
+                        with transaction.atomic():
+                            Materia.objects.get(pk=materia.pk)  # type: ignore[attr-defined]
+                            Materia.objects.filter(pk=materia.pk).update(cupo=F("cupo") - 1)  # type: ignore[attr-defined]
+                        ok += 1
+                    except OperationalError:
+                        errores += 1
+                    tiempos.append(time.perf_counter() - inicio)
+            finally:
+                connection.close()
+                with candado:
+                    resultado["ok"] += ok
+                    resultado["errores"] += errores
+                    resultado["tiempos"] += tiempos
+
+        threads = [threading.Thread(target=trabajar, args=(n,)) for n in range(hilos)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return resultado["ok"], resultado["errores"], resultado["tiempos"]
@@ -0,0 +1,374 @@
+import http.cookiejar
+import json
+import random
+import secrets
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+
+from alumnos.models import Alumno
+from carreras.models import Carrera
+from estadisticas.utils import reconstruir
+from gestion_educativa.basedatos import base_de_prueba
+from materias.models import Materia
+from notas.models import Nota
+from personal.models import AsignacionDocente, Personal
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+class _ClienteLocal:
+    """Requests contra la app en el mismo proceso (django.test.Client, sin servidor, sobre la base de prueba)"""
+
+    def __init__(self):
+        self.client = Client()
+
+    def request(self, metodo, ruta, datos=None):
+        kwargs = {"content_type": "application/json"} if datos is not None else {}
+        if datos is not None:
+            kwargs["data"] = json.dumps(datos)
+        response = getattr(self.client, metodo.lower())(f"/api/{ruta}", **kwargs)
+        return response.status_code, response.content
+
+
+class _ClienteHTTP:
+    """Requests contra un servidor levantado (runserver, gunicorn), con sesión y CSRF"""
+
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies))
+
+    def _csrf(self):
+        return next((c.value for c in self.cookies if c.name == "csrftoken"), None)
+
+    def request(self, metodo, ruta, datos=None):
+        if metodo != "GET" and self._csrf() is None:
+            self.request("GET", "csrf/")
+        cuerpo = json.dumps(datos).encode() if datos is not None else None
+        req = urllib.request.Request(f"{self.url}/api/{ruta}", data=cuerpo, method=metodo)
+        req.add_header("Content-Type", "application/json")
+        if metodo != "GET":
+            req.add_header("X-CSRFToken", self._csrf() or "")
+            req.add_header("Referer", self.url)
+        try:
+            with self.opener.open(req, timeout=60) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+
+class _Metricas:
+    def __init__(self):
+        self.candado = threading.Lock()
+        self.por_endpoint = {}
+
+    def registrar(self, endpoint, segundos, codigo, contenido):
+        with self.candado:
+            fila = self.por_endpoint.setdefault(
+                endpoint, {"tiempos": [], "2xx": 0, "4xx": 0, "errores": 0, "ejemplo_error": None}
+            )
+            fila["tiempos"].append(segundos)
+            if codigo is None or codigo >= 500:
+                fila["errores"] += 1
+                fila["ejemplo_error"] = fila["ejemplo_error"] or contenido[:200].decode("utf-8", "replace")
+            elif codigo >= 400:
+                fila["4xx"] += 1
+            else:
+                fila["2xx"] += 1
+
+
+class _Usuario:
+    """Sesión de un usuario sintético: loguea por LoginView y ejecuta acciones de su rol"""
+
+    def __init__(self, rol, dni, cliente, metricas, rng, contexto):
+        self.rol, self.dni, self.cliente = rol, dni, cliente
+        self.password = contexto["password"]
+        self.metricas, self.rng, self.contexto = metricas, rng, contexto
+        self.inscriptas = set()
+        self.materias_docente = []
+
+    def llamar(self, endpoint, metodo, ruta, datos=None):
+        inicio = time.perf_counter()
+        try:
+            codigo, contenido = self.cliente.request(metodo, ruta, datos)
+        except Exception as e:
+            codigo, contenido = None, f"{type(e).__name__}: {e}".encode()
+        self.metricas.registrar(endpoint, time.perf_counter() - inicio, codigo, contenido)
+        return codigo, contenido
+
+    def login(self):
+        codigo, _ = self.llamar("POST login/", "POST", "login/", {"dni": self.dni, "password": self.password})
+        return codigo == 200
+
+    # Acciones por rol: (peso, método)
+    def acciones(self):
+        if self.rol == "alumno":
+            return [(4, self.catalogo), (3, self.inscribir), (2, self.dar_baja), (1, self.mis_materias)]
+        if self.rol == "docente":
+            return [(2, self.docente_materias), (3, self.docente_alumnos), (3, self.docente_nota)]
+        return [(1, self.admin_stats), (2, self.admin_alumnos), (2, self.admin_inscripciones),
+                (1, self.admin_materias), (1, self.admin_alumnos_notas)]
+
+    def paso(self):
+        pesos, metodos = zip(*self.acciones())
+        self.rng.choices(metodos, weights=pesos)[0]()
+
+    def catalogo(self):
+        self.llamar("GET carreras/", "GET", "carreras/")
+        self.llamar("GET carreras/<id>/materias/", "GET", f"carreras/{self.contexto['carrera']}/materias/")
+
+    def inscribir(self):
+        materia = self.rng.choice(self.contexto["materias"])
+        codigo, _ = self.llamar("POST alumnos/inscribir", "POST", "alumnos/inscribir", {"materia_id": materia})
+        if codigo == 201:
+            self.inscriptas.add(materia)
+
+    def dar_baja(self):
+        if not self.inscriptas:
+            return self.inscribir()
+        materia = self.rng.choice(sorted(self.inscriptas))
+        codigo, _ = self.llamar("DELETE alumnos/dar-baja/<id>", "DELETE", f"alumnos/dar-baja/{materia}")
+        if codigo in (200, 404):
+            self.inscriptas.discard(materia)
+
+    def mis_materias(self):
+        self.llamar("GET alumnos/me/materias/", "GET", "alumnos/me/materias/")
+
+    def docente_materias(self):
+        codigo, contenido = self.llamar("GET docente/materias/", "GET", "docente/materias/")
+        if codigo == 200:
+            self.materias_docente = [m["id"] for m in json.loads(contenido)]
+
+    def docente_alumnos(self):
+        if not self.materias_docente:
+            return self.docente_materias()
+        materia = self.rng.choice(self.materias_docente)
+        self.llamar("GET docente/materias/<id>/alumnos/", "GET", f"docente/materias/{materia}/alumnos/")
+
+    def docente_nota(self):
+        if not self.materias_docente:
+            return self.docente_materias()
+        materia = self.rng.choice(self.materias_docente)
+        codigo, contenido = self.llamar(
+            "GET docente/materias/<id>/alumnos/", "GET", f"docente/materias/{materia}/alumnos/?formato=compacto"
+        )
+        alumnos = json.loads(contenido) if codigo == 200 else []
+        if alumnos:
+            alumno = self.rng.choice(alumnos)["alumno_id"]
+            self.llamar("POST docente/notas/", "POST", "docente/notas/",
+                        {"alumno": alumno, "materia": materia, "nota": self.rng.randint(1, 10)})
+
+    def admin_stats(self):
+        self.llamar("GET admin/stats/", "GET", "admin/stats/")
+
+    def admin_alumnos(self):
+        self.llamar("GET admin/alumnos/", "GET", "admin/alumnos/?limit=50")
+
+    def admin_inscripciones(self):
+        self.llamar("GET admin/inscripciones/", "GET", "admin/inscripciones/?limit=50")
+
+    def admin_materias(self):
+        self.llamar("GET admin/materias/", "GET", "admin/materias/")
+
+    def admin_alumnos_notas(self):
+        self.llamar("GET admin/alumnos-notas/", "GET", "admin/alumnos-notas/?limit=50")
+
+
+class Command(BaseCommand):
+    help = (
+        "Generador de carga: crea usuarios sintéticos, los loguea por LoginView y ejecuta una mezcla de "
+        "catálogo, inscripciones, bajas, notas y listados de admin. Informa p50/p95/p99, throughput y "
+        "errores por endpoint. Sin --url usa un cliente WSGI en el mismo proceso sobre una base de prueba "
+        "temporal; con --url apunta a un servidor levantado que use la misma base de datos, con una "
+        "contraseña aleatoria por corrida, y los datos sintéticos se eliminan al terminar"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--alumnos", type=int, default=40)
+        parser.add_argument("--docentes", type=int, default=4)
+        parser.add_argument("--admins", type=int, default=2)
+        parser.add_argument("--materias", type=int, default=8)
+        parser.add_argument("--cupo", type=int, default=15, help="Cupo de cada materia sintética")
+        parser.add_argument("--duracion", type=float, default=10, help="Segundos de carga")
+        parser.add_argument("--url", help="Servidor destino, ej: http://127.0.0.1:8000")
+        parser.add_argument("--semilla", type=int, default=None)
+        parser.add_argument("--json", dest="salida_json", help="Guarda el resumen en este archivo")
+        parser.add_argument(
+            "--conservar", action="store_true",
+            help="Con --url: no elimina los datos sintéticos (sus usuarios quedan desactivados)",
+        )
+
+    def handle(self, *args, **options):
+        if options["alumnos"] < 1 or options["materias"] < 1 or options["duracion"] <= 0:
+            raise CommandError("--alumnos, --materias y --duracion deben ser positivos")
+        if options["alumnos"] + options["docentes"] + options["admins"] > 99999:
+            raise CommandError("Demasiados usuarios sintéticos (máximo 99999)")
+
+        if options["conservar"] and not options["url"]:
+            raise CommandError("--conservar sólo tiene sentido con --url (sin --url se usa una base de prueba)")
+
+        if options["url"]:
+            resumen = self._generar(options)
+        else:
+            # En proceso: base de prueba temporal, nada queda en la base configurada
+            with base_de_prueba():
+                resumen = self._generar(options)
+        self._informar(resumen)
+        if options["salida_json"]:
+            with open(options["salida_json"], "w", encoding="utf-8") as f:
+                json.dump(resumen, f, indent=2)
+
+    def _generar(self, options):
+        etiqueta = uuid.uuid4().hex[:4]
+        usuarios, contexto = self._sembrar(etiqueta, options)
+        try:
+            return self._correr(usuarios, contexto, options)
+        finally:
+            if options["conservar"]:
+                User.objects.filter(username__startswith=f"c{etiqueta}").update(is_active=False)
+            else:
+                self._limpiar(etiqueta)
+
+    def _sembrar(self, etiqueta, options):
+        # Contraseña aleatoria por corrida y un solo hash para todos: sembrar no paga PBKDF2 por usuario (el login sí)
+        clave = secrets.token_urlsafe(16)
+        password = make_password(clave)
+        carrera = Carrera.objects.create(nombre=f"Carga {etiqueta}", duracion_anios=1)
+        materias = Materia.objects.bulk_create([
+            Materia(nombre=f"Carga {etiqueta} {i}", carrera=carrera, cupo=options["cupo"])
+            for i in range(options["materias"])
+        ])
+        roles = (["alumno"] * options["alumnos"] + ["docente"] * options["docentes"]
+                 + ["admin"] * options["admins"])
+        dnis = [f"c{etiqueta}{i:05d}" for i in range(len(roles))]
+        # Sin is_staff/is_superuser: los "admin" son Personal ADMIN, que sólo habilita los endpoints de la API
+        User.objects.bulk_create([User(username=dni, password=password) for dni in dnis])
+        users = {u.username: u for u in User.objects.filter(username__in=dnis)}
+        datos = lambda dni: {"nombre": "Carga", "apellido": dni, "dni": dni, "email": f"{dni}@carga.example.com"}
+        Alumno.objects.bulk_create([
+            Alumno(user=users[dni], carrera_principal=carrera, **datos(dni))
+            for dni, rol in zip(dnis, roles) if rol == "alumno"
+        ])
+        personal = Personal.objects.bulk_create([
+            Personal(user=users[dni], cargo="DOCENTE" if rol == "docente" else "ADMIN", **datos(dni))
+            for dni, rol in zip(dnis, roles) if rol != "alumno"
+        ])
+        docentes = list(Personal.objects.filter(dni__in=[p.dni for p in personal if p.cargo == "DOCENTE"]))
+        if docentes:
+            AsignacionDocente.objects.bulk_create([
+                AsignacionDocente(docente=docentes[i % len(docentes)], materia=m) for i, m in enumerate(materias)
+            ])
+        # bulk_create no dispara las señales de los contadores
+        reconstruir()
+        contexto = {"carrera": carrera.id, "materias": [m.id for m in materias], "password": clave}
+        return list(zip(roles, dnis)), contexto
+
+    def _limpiar(self, etiqueta):
+        carrera = Carrera.objects.filter(nombre=f"Carga {etiqueta}")
+        # Nota protege a la materia y al docente; el resto cae en cascada con el usuario
+        Nota.objects.filter(materia__carrera__in=carrera).delete()
+        User.objects.filter(username__startswith=f"c{etiqueta}").delete()
+        Materia.objects.filter(carrera__in=carrera).delete()
+        carrera.delete()
+        reconstruir()
+
+    def _correr(self, usuarios, contexto, options):
+        metricas = _Metricas()
+        semilla = random.Random(options["semilla"])
+        sesiones = [
+            _Usuario(rol, dni, _ClienteHTTP(options["url"]) if options["url"] else _ClienteLocal(),
+                     metricas, random.Random(semilla.random()), contexto)
+            for rol, dni in usuarios
+        ]
+        fallidos = []
+        ventana = {}
+
+        def arrancar():
+            # La carga medida arranca cuando terminaron todos los logins
+            ventana["inicio"] = time.perf_counter()
+            ventana["fin"] = ventana["inicio"] + options["duracion"]
+
+        largada = threading.Barrier(len(sesiones), action=arrancar)
+
+        def trabajar(usuario):
+            try:
+                ok = usuario.login()
+                if not ok:
+                    fallidos.append(usuario.dni)
+                largada.wait()
+                while ok and time.perf_counter() < ventana["fin"]:
+                    usuario.paso()
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=trabajar, args=(s,)) for s in sesiones]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+        duracion = time.perf_counter() - ventana["inicio"]
+
+        endpoints = {}
+        for endpoint, fila in sorted(metricas.por_endpoint.items()):
+            total = len(fila["tiempos"])
+            endpoints[endpoint] = {
+                "requests": total,
+                # Los logins ocurren antes de la ventana medida: su req/s no es comparable
+                "rps": round(total / duracion, 2) if endpoint != "POST login/" else None,
+                "2xx": fila["2xx"],
+                "4xx": fila["4xx"],
+                "errores": fila["errores"],
+                "tasa_error": round(fila["errores"] / total, 4) if total else 0,
+                "p50_ms": round(_percentil(fila["tiempos"], 50) * 1000, 2),
+                "p95_ms": round(_percentil(fila["tiempos"], 95) * 1000, 2),
+                "p99_ms": round(_percentil(fila["tiempos"], 99) * 1000, 2),
+                "ejemplo_error": fila["ejemplo_error"],
+            }
+        total = sum(e["requests"] for n, e in endpoints.items() if n != "POST login/")
+        return {
+            "destino": options["url"] or "wsgi en proceso (base de prueba)",
+            "usuarios": len(sesiones),
+            "logins_fallidos": len(fallidos),
+            "duracion_s": round(duracion, 2),
+            "requests": total,  # sin contar los logins
+            "rps": round(total / duracion, 2),
+            "errores": sum(e["errores"] for e in endpoints.values()),
+            "endpoints": endpoints,
+        }
+
+    def _informar(self, resumen):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{resumen['usuarios']} usuarios contra {resumen['destino']} durante {resumen['duracion_s']}s "
+            f"(después de loguear a todos)"
+        ))
+        self.stdout.write(
+            f"{'endpoint':<38}{'reqs':>7}{'req/s':>9}{'2xx':>7}{'4xx':>7}{'5xx':>6}"
+            f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+        )
+        for endpoint, e in resumen["endpoints"].items():
+            linea = (
+                f"{endpoint:<38}{e['requests']:>7}{e['rps'] if e['rps'] is not None else '-':>9}{e['2xx']:>7}{e['4xx']:>7}{e['errores']:>6}"
+                f"{e['p50_ms']:>9.1f}{e['p95_ms']:>9.1f}{e['p99_ms']:>9.1f}"
+            )
+            self.stdout.write(self.style.ERROR(linea) if e["errores"] else linea)
+            if e["ejemplo_error"]:
+                self.stdout.write(f"    {e['ejemplo_error']}")
+        estilo = self.style.ERROR if resumen["errores"] or resumen["logins_fallidos"] else self.style.SUCCESS
+        self.stdout.write(estilo(
+            f"{resumen['requests']} requests, {resumen['rps']} req/s, {resumen['errores']} errores, "
+            f"{resumen['logins_fallidos']} logins fallidos"
+        ))
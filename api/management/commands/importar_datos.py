@@ -0,0 +1,50 @@
+import json
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from api import importacion
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa carreras, materias o alumnos desde un CSV o XLSX con bulk_create por lotes, "
+        "validando duplicados en memoria e informando los errores por fila"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("tipo", choices=list(importacion.IMPORTADORES))
+        parser.add_argument("archivo", help="Archivo .csv o .xlsx con encabezado en la primera fila")
+        parser.add_argument("--lote", type=int, default=importacion.LOTE, help="Filas por bulk_create")
+        parser.add_argument("--simular", action="store_true", help="Sólo valida, no inserta")
+        parser.add_argument("--json", action="store_true", help="Salida en JSON")
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        try:
+            with open(options["archivo"], "rb") as archivo:
+                informe = importacion.importar(
+                    options["tipo"],
+                    importacion.leer_filas(archivo, options["archivo"]),
+                    lote=options["lote"],
+                    simular=options["simular"],
+                )
+        except (OSError, ValueError, ImproperlyConfigured) as e:
+            raise CommandError(str(e))
+        segundos = time.perf_counter() - inicio
+
+        if options["json"]:
+            self.stdout.write(json.dumps(informe, ensure_ascii=False))
+            return
+        for error in informe["errores"]:
+            self.stdout.write(f"Fila {error['fila']}: {'; '.join(error['errores'])}")
+        if informe["con_errores"] > len(informe["errores"]):
+            self.stdout.write(f"... y {informe['con_errores'] - len(informe['errores'])} filas más con errores")
+        accion = "válidas (simulación)" if informe["simulado"] else "creadas"
+        validas = informe["filas"] - informe["con_errores"]
+        self.stdout.write(self.style.SUCCESS(
+            f"{informe['tipo']}: {informe['filas']} filas, "
+            f"{validas if informe['simulado'] else informe['creadas']} {accion}, "
+            f"{informe['con_errores']} con errores ({segundos:.1f} s)"
+        ))
@@ -0,0 +1,140 @@
+"""
+Paginación por cursor (keyset) para los listados de la API.
+
+En lugar de OFFSET, cada página se pide a partir de los valores de orden de la
+última fila entregada, así el costo de una página no depende de cuántas filas
+quedaron atrás y las páginas se mantienen estables aunque se inserten filas.
+La paginación es opcional: sólo se activa si el request trae ``limit`` o
+``cursor``; sin esos parámetros los listados responden como siempre.
+"""
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Sequence
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+PAGE_SIZE_DEFAULT = 50
+PAGE_SIZE_MAX = 500
+
+
+def _valor_cursor(valor: Any) -> Any:
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    return valor
+
+
+def _valor_de_objeto(obj: Any, campo: str) -> Any:
+    # Recorre caminos tipo "alumno__apellido" sobre la instancia ya cargada
+    valor = obj
+    for parte in campo.split("__"):
+        valor = getattr(valor, parte)
+    return valor
+
+
+def _campo_de_modelo(modelo: Any, camino: str) -> Any:
+    # Campo final de caminos tipo "alumno__apellido" (o la pk), para convertir los valores del cursor
+    campo = None
+    for parte in camino.split("__"):
+        if campo is not None:
+            modelo = campo.related_model
+        campo = modelo._meta.pk if parte == "pk" else modelo._meta.get_field(parte)
+    return campo
+
+
+class KeysetPagination:
+    """
+    Pagina un queryset según una lista de campos de orden (ej: ["apellido", "nombre"]).
+    Se agrega la pk como desempate para que el orden sea total. Los campos de orden
+    no deben ser nulos.
+    """
+
+    def __init__(self, ordering: Sequence[str]):
+        campos = list(ordering)
+        if not any(c.lstrip("-") in ("pk", "id") for c in campos):
+            campos.append("-pk" if campos and campos[0].startswith("-") else "pk")
+        self.ordering = campos
+
+    @staticmethod
+    def is_requested(request) -> bool:
+        return "limit" in request.query_params or "cursor" in request.query_params
+
+    def get_limit(self, request) -> int:
+        raw = request.query_params.get("limit")
+        if raw in (None, ""):
+            return PAGE_SIZE_DEFAULT
+        try:
+            limit = int(raw)
+        except (TypeError, ValueError):
+            raise ValidationError({"limit": ["Debe ser un número entero"]})
+        if limit <= 0:
+            raise ValidationError({"limit": ["Debe ser mayor a 0"]})
+        return min(limit, PAGE_SIZE_MAX)
+
+    def encode_cursor(self, obj: Any) -> str:
+        valores = [_valor_cursor(_valor_de_objeto(obj, c.lstrip("-"))) for c in self.ordering]
+        raw = json.dumps(valores, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def decode_cursor(self, cursor: str, modelo: Any = None) -> list[Any]:
+        """
+        Valores del cursor convertidos con to_python del campo de orden correspondiente de
+        `modelo`: un cursor manipulado (ej. texto donde va una fecha) es un 400, no un 500.
+        """
+        try:
+            padding = "=" * (-len(cursor) % 4)
+            valores = json.loads(base64.urlsafe_b64decode(cursor + padding))
+        except (ValueError, TypeError):
+            raise ValidationError({"cursor": ["Cursor inválido"]})
+        if not isinstance(valores, list) or len(valores) != len(self.ordering):
+            raise ValidationError({"cursor": ["Cursor inválido"]})
+        if modelo is None:
+            return valores
+        convertidos = []
+        for campo, valor in zip(self.ordering, valores):
+            # Los campos de orden no son nulos (ver docstring de la clase)
+            if valor is None or isinstance(valor, (list, dict)):
+                raise ValidationError({"cursor": ["Cursor inválido"]})
+            try:
+                convertidos.append(_campo_de_modelo(modelo, campo.lstrip("-")).to_python(valor))
+            except FieldDoesNotExist:
+                convertidos.append(valor)
+            except (DjangoValidationError, TypeError, ValueError):
+                raise ValidationError({"cursor": ["Cursor inválido"]})
+        return convertidos
+
+    def keyset_filter(self, valores: Sequence[Any]) -> Q:
+        # (a > va) OR (a = va AND b > vb) OR ... respetando la dirección de cada campo
+        condicion = Q()
+        for i, campo in enumerate(self.ordering):
+            nombre = campo.lstrip("-")
+            lookup = "lt" if campo.startswith("-") else "gt"
+            parcial = Q(**{f"{nombre}__{lookup}": valores[i]})
+            for previo, valor in zip(self.ordering[:i], valores[:i]):
+                parcial &= Q(**{previo.lstrip("-"): valor})
+            condicion |= parcial
+        return condicion
+
+    def paginate_queryset(self, queryset, request) -> tuple[list[Any], str | None]:
+        limit = self.get_limit(request)
+        queryset = queryset.order_by(*self.ordering)
+        cursor = request.query_params.get("cursor")
+        if cursor:
+            queryset = queryset.filter(self.keyset_filter(self.decode_cursor(cursor, queryset.model)))
+        # Se pide una fila extra para saber si hay página siguiente sin hacer COUNT(*)
+        filas = list(queryset[: limit + 1])
+        next_cursor = None
+        if len(filas) > limit:
+            filas = filas[:limit]
+            next_cursor = self.encode_cursor(filas[-1])
+        return filas, next_cursor
+
+    @staticmethod
+    def get_paginated_response(data: Any, next_cursor: str | None) -> Response:
+        return Response({"results": data, "next_cursor": next_cursor})
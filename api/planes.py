@@ -0,0 +1,47 @@
+"""
+Consultas representativas de las vistas de la API para el asesor de índices
+(`python manage.py analizar_indices`).
+
+Cada entrada reproduce el queryset principal de una vista con los filtros y el
+orden que usa en producción. Los valores de los filtros son irrelevantes para
+el plan, por eso se usa 1 en todos los ids.
+"""
+from alumnos.models import Alumno, InscripcionAlumno, SolicitudInscripcion
+from inscripciones.models import InscripcionCarrera
+from materias.models import Materia
+from notas.models import Nota
+from personal.models import AsignacionDocente
+from usuarios.models import RegistroUsuario
+
+LIMITE = 50
+
+CONSULTAS_REPRESENTATIVAS = {
+    # Catálogo
+    "materias_by_carrera": lambda: Materia.objects.filter(carrera_id=1).select_related("carrera"),
+    # Alumno
+    "alumno_mis_materias": lambda: InscripcionAlumno.objects.filter(alumno_id=1, activa=True)
+    .select_related("materia", "materia__carrera"),
+    "alumno_mis_notas": lambda: Nota.objects.filter(alumno_id=1).select_related("materia__carrera", "profesor"),
+    "inscripcion_existente": lambda: InscripcionAlumno.objects.filter(alumno_id=1, materia_id=1, activa=True)[:1],
+    "lista_espera_primero": lambda: SolicitudInscripcion.objects.filter(materia_id=1, estado="EN_ESPERA")
+    .order_by("creado_en", "id")[:1],
+    # Docente
+    "docente_asignado": lambda: AsignacionDocente.objects.filter(docente_id=1, materia_id=1)[:1],
+    "docente_materias": lambda: Materia.objects.filter(docentes__docente_id=1).select_related("carrera").distinct(),
+    "docente_alumnos_por_materia": lambda: InscripcionAlumno.objects.filter(materia_id=1, activa=True)
+    .select_related("alumno", "alumno__carrera_principal"),
+    "nota_alumno_materia": lambda: Nota.objects.filter(alumno_id=1, materia_id=1)[:1],
+    "notas_de_materia": lambda: Nota.objects.filter(materia_id=1).order_by(),
+    # Admin / preceptor (primera página de cada listado)
+    "admin_alumnos": lambda: Alumno.objects.select_related("carrera_principal").order_by("apellido", "nombre", "pk")[:LIMITE],
+    "admin_alumnos_por_materia": lambda: Alumno.objects.filter(
+        inscripciones__materia_id=1, inscripciones__activa=True
+    ).order_by("apellido", "nombre", "pk")[:LIMITE],
+    "admin_inscripciones": lambda: InscripcionCarrera.objects.select_related(
+        "alumno", "alumno__carrera_principal", "carrera", "responsable"
+    ).order_by("-fecha_inscripcion", "-pk")[:LIMITE],
+    "admin_usuarios_pendientes": lambda: RegistroUsuario.objects.filter(estado="PENDIENTE")
+    .order_by("-creado_en", "-pk")[:LIMITE],
+    "admin_alumnos_notas_por_materia": lambda: Nota.objects.filter(materia_id=1)
+    .select_related("alumno", "materia").order_by("alumno__apellido", "alumno__nombre", "materia__nombre", "pk")[:LIMITE],
+}
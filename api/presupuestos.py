@@ -0,0 +1,69 @@
+"""
+Presupuesto de consultas SQL por endpoint de la API.
+
+Cada nombre de URL de api/urls.py tiene un máximo de consultas por request. El
+test PresupuestoConsultasTests (api/tests.py) llama a cada endpoint con pocos
+datos y con muchos, y falla si la cantidad de consultas crece con los datos
+(un N+1) o si supera el presupuesto. Un endpoint nuevo debe agregarse acá o
+en SIN_PRESUPUESTO con el motivo.
+
+Los números incluyen las consultas de sesión y usuario de cada request autenticado,
+los SAVEPOINT de las transacciones y las actualizaciones de contadores (estadisticas,
+generales y por materia).
+"""
+
+PRESUPUESTO_CONSULTAS = {
+    # Sesión y catálogo
+    "csrf": 0,
+    "login": 9,
+    "me": 2,
+    "carreras_list": 2,
+    "carreras_detail": 1,
+    "materias_by_carrera": 2,
+    "materias_cupos": 1,
+    # Alumno
+    "alumno_me": 2,
+    "alumno_mis_notas": 3,
+    "alumno_resumen_academico": 3,
+    "alumno_mis_materias": 3,
+    "solicitud_inscripcion": 4,
+    "inscribir_materia": 17,
+    "dar_baja_materia": 17,
+    # Docente
+    "docente_materias": 3,
+    "docente_alumnos_por_materia": 5,
+    "docente_by_materia": 1,
+    "docente_nota_upsert": 21,
+    # Igual con 5 que con NOTAS_BULK_MAX filas: un INSERT ... ON CONFLICT para todas
+    "docente_nota_bulk_upsert": 12,
+    # Admin / preceptor
+    "admin_stats": 3,
+    "admin_alumnos": 3,
+    "admin_inscripciones": 3,
+    "admin_usuarios_pendientes": 3,
+    "admin_materias": 4,
+    "admin_materias_count": 3,
+    "admin_materias_estadisticas": 3,
+    "admin_docentes": 3,
+    "admin_alumnos_notas": 3,
+    "admin_alumnos_notas_export": 3,
+}
+
+# Endpoints que no se miden, con el motivo
+SIN_PRESUPUESTO = {
+    "logout": "no consulta datos de dominio",
+    "registro_usuario": "alta de un registro; el costo lo domina el hash de la contraseña",
+    "change_password": "actualiza un solo usuario",
+    "carreras_create": "alta de una fila",
+    "materia_create": "alta de una fila",
+    "admin_materia_detail": "modifica una sola materia",
+    "admin_alumnos_detail": "modifica un solo alumno",
+    "admin_usuarios_aprobar": "aprueba un solo registro",
+    "admin_usuarios_rechazar": "rechaza un solo registro",
+    "admin_usuarios_aprobar_lote": "acotado por la cantidad de lotes de registros, no por los datos",
+    "inscribir_materias": "acotado por la cantidad de materias del pedido, no por los datos",
+    "admin_analitica_notas": "lee el snapshot de NumPy; sólo consulta sesión y usuario",
+    "admin_importar": "acotado por la cantidad de lotes del archivo, no por los datos",
+    "docente_materia_create": "alta de una fila",
+    "docente_materia_update_delete": "modifica una sola materia",
+}
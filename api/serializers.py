@@ -1,14 +1,25 @@
 from rest_framework import serializers
 from carreras.models import Carrera
 from materias.models import Materia
-from alumnos.models import Alumno, InscripcionAlumno
-from notas.models import Nota
-from personal.models import Personal
+from alumnos.models import Alumno, InscripcionAlumno, SolicitudInscripcion
+from notas.models import Nota, NOTA_MINIMA, NOTA_MAXIMA
+from personal.models import Personal, AsignacionDocente
 from usuarios.models import RegistroUsuario
 from inscripciones.models import InscripcionCarrera
+from estadisticas.models import EstadisticasMateria
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Prefetch
+
+# Tope de filas por request en la carga masiva de notas
+NOTAS_BULK_MAX = 500
+# Tope de materias por request en la inscripción múltiple
+INSCRIPCION_MULTIPLE_MAX = 20
+# Topes por request de la aprobación por lotes: un lote de usuarios/aprobacion.py y pocos hashes
+# (cada usuario nuevo es un PBKDF2 de ~0.5 s en el worker web); lo más grande va por el comando
+APROBACION_LOTE_MAX = 500
+APROBACION_SIN_USUARIO_MAX = 20
 
 
 class CarreraSerializer(serializers.ModelSerializer):
@@ -25,6 +36,13 @@ class MateriaSerializer(serializers.ModelSerializer):
         fields = ["id", "nombre", "horario", "cupo", "carrera"]
 
 
+class MateriaCatalogoSerializer(MateriaSerializer):
+    # Sin cupo: el listado público se cachea por versión del catálogo y el cupo cambia
+    # con cada inscripción (se sirve aparte, ver MateriasCuposView)
+    class Meta(MateriaSerializer.Meta):
+        fields = ["id", "nombre", "horario", "carrera"]
+
+
 class PersonalSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -47,11 +65,23 @@ class MateriaWithDocenteSerializer(MateriaSerializer):
     class Meta(MateriaSerializer.Meta):
         fields = MateriaSerializer.Meta.fields + ["docente"]
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        # Trae carrera y docente asignado en consultas fijas, sin importar la cantidad de materias
+        return queryset.select_related("carrera").prefetch_related(
+            Prefetch("docentes", queryset=AsignacionDocente.objects.select_related("docente").order_by("pk"))
+        )
+
     def get_docente(self, obj):
         asignacion = getattr(obj, "docentes", None)
         if asignacion is None:
             return None
-        asignacion_obj = asignacion.select_related("docente").first()
+        if "docentes" in getattr(obj, "_prefetched_objects_cache", {}):
+            # Usar el prefetch de setup_eager_loading en lugar de consultar por cada materia
+            asignaciones = list(asignacion.all())
+            asignacion_obj = asignaciones[0] if asignaciones else None
+        else:
+            asignacion_obj = asignacion.select_related("docente").first()
         if not asignacion_obj:
             return None
         return PersonalSerializer(asignacion_obj.docente).data
@@ -65,6 +95,47 @@ class MateriaWithCountSerializer(MateriaSerializer):
         fields = MateriaSerializer.Meta.fields + ["total_alumnos"]
 
 
+class MateriaEstadisticasSerializer(MateriaSerializer):
+    # Lee la fila de EstadisticasMateria (select_related("estadisticas")); sin fila, todo en cero
+    inscriptos_activos = serializers.SerializerMethodField()
+    notas = serializers.SerializerMethodField()
+    aprobadas = serializers.SerializerMethodField()
+    promedio = serializers.SerializerMethodField()
+    porcentaje_aprobadas = serializers.SerializerMethodField()
+    histograma = serializers.SerializerMethodField()
+
+    class Meta(MateriaSerializer.Meta):
+        fields = MateriaSerializer.Meta.fields + [
+            "inscriptos_activos", "notas", "aprobadas", "promedio", "porcentaje_aprobadas", "histograma",
+        ]
+
+    @staticmethod
+    def _estadisticas(obj):
+        try:
+            return obj.estadisticas
+        except EstadisticasMateria.DoesNotExist:  # type: ignore[attr-defined]
+            return EstadisticasMateria(materia=obj)
+
+    def get_inscriptos_activos(self, obj):
+        return self._estadisticas(obj).inscriptos_activos
+
+    def get_notas(self, obj):
+        return self._estadisticas(obj).notas
+
+    def get_aprobadas(self, obj):
+        return self._estadisticas(obj).aprobadas
+
+    def get_promedio(self, obj):
+        promedio = self._estadisticas(obj).promedio
+        return str(promedio) if promedio is not None else None
+
+    def get_porcentaje_aprobadas(self, obj):
+        return self._estadisticas(obj).porcentaje_aprobadas
+
+    def get_histograma(self, obj):
+        return self._estadisticas(obj).histograma
+
+
 class AlumnoSerializer(serializers.ModelSerializer):
     carrera_principal = CarreraSerializer(read_only=True)
     class Meta:
@@ -146,6 +217,22 @@ class NotaUpsertSerializer(serializers.Serializer):
         
         return attrs
 
+
+class NotaBulkItemSerializer(serializers.Serializer):
+    alumno = serializers.IntegerField(required=True)
+    nota = serializers.DecimalField(
+        required=True, max_digits=4, decimal_places=2, min_value=NOTA_MINIMA, max_value=NOTA_MAXIMA
+    )
+    observaciones = serializers.CharField(required=False, allow_blank=True, default="")
+
+
+class NotaBulkUpsertSerializer(serializers.Serializer):
+    # Cada fila se valida por separado en la vista para poder informar resultados por fila
+    materia = serializers.IntegerField(required=True)
+    notas = serializers.ListField(
+        child=serializers.DictField(), allow_empty=False, max_length=NOTAS_BULK_MAX
+    )
+
 class RegistroUsuarioSerializer(serializers.ModelSerializer):
     password1 = serializers.CharField(
         write_only=True,
@@ -318,4 +405,40 @@ class InscripcionAlumnoSerializer(serializers.ModelSerializer):
             "materia",
             "fecha_inscripcion",
             "activa",
-        ]
\ No newline at end of file
+        ]
+
+
+class InscripcionMultipleSerializer(serializers.Serializer):
+    materias = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=INSCRIPCION_MULTIPLE_MAX
+    )
+    # todo_o_nada: si alguna materia se rechaza no se inscribe ninguna; parcial: se inscriben las que se pueda
+    modo = serializers.ChoiceField(choices=["parcial", "todo_o_nada"], default="parcial")
+
+
+class AprobacionLoteSerializer(serializers.Serializer):
+    # ids de RegistroUsuario, o todos=true para aprobar todos los pendientes (opcionalmente de un rol/carrera)
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, allow_empty=False, max_length=APROBACION_LOTE_MAX
+    )
+    todos = serializers.BooleanField(default=False)
+    rol = serializers.ChoiceField(choices=["ALUMNO", "PERSONAL"], required=False)
+    carrera = serializers.IntegerField(min_value=1, required=False)
+
+    def validate(self, attrs):
+        if bool(attrs.get("ids")) == attrs["todos"]:
+            raise serializers.ValidationError("Indicar ids o todos=true (uno de los dos)")
+        return attrs
+
+
+class SolicitudInscripcionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SolicitudInscripcion
+        fields = [
+            "id",
+            "materia",
+            "estado",
+            "motivo",
+            "creado_en",
+            "procesado_en",
+        ]
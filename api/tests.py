@@ -0,0 +1,1283 @@
+import base64
+import csv
+import io
+import json
+import logging
+import subprocess
+import sys
+import tempfile
+import unittest
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection, connections, transaction
+from django.db.models.signals import post_delete
+from django.http import StreamingHttpResponse
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from alumnos import asignacion
+from alumnos.models import Alumno, InscripcionAlumno, SolicitudInscripcion
+from api import importacion
+from api import urls as api_urls
+from api.presupuestos import PRESUPUESTO_CONSULTAS, SIN_PRESUPUESTO
+from carreras.models import Carrera
+from estadisticas import analitica
+from estadisticas.models import EstadisticasMateria
+from estadisticas.utils import obtener, reconstruir, reconstruir_materias
+from gestion_educativa.basedatos import databases_desde_entorno
+from gestion_educativa.routers import LecturaEscrituraRouter, solo_lectura
+from inscripciones.models import InscripcionCarrera
+from materias.models import Materia
+from notas.models import Nota
+from personal.models import Personal, AsignacionDocente
+from usuarios import aprobacion
+from usuarios.hasheo import hashear_passwords, pool_hasheo
+from usuarios.backends import buscar_usuario_por_identificador
+from usuarios.models import RegistroUsuario
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class LoginTests(TestCase):
+    """Login por username o DNI (Alumno, Personal o registro) con una sola búsqueda y un solo hash"""
+
+    URL = "/api/login/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username="admin", password="admin1234")
+        cls.alumno_user = User.objects.create_user(username="alumno1", password="alumno1234")
+        Alumno.objects.create(
+            nombre="Juan", apellido="Alumno", dni="40000000", email="juan@example.com", user=cls.alumno_user
+        )
+        cls.docente_user = User.objects.create_user(username="docente1", password="docente1234")
+        Personal.objects.create(
+            nombre="Ana", apellido="Docente", dni="25000000", email="ana@example.com",
+            cargo="DOCENTE", user=cls.docente_user,
+        )
+        # Un username igual al DNI de otro alumno: gana el username
+        cls.homonimo = User.objects.create_user(username="41000000", password="homonimo1234", is_staff=True)
+        cls.alumno_dni_ajeno = User.objects.create_user(username="alumno2", password="alumno2345")
+        Alumno.objects.create(
+            nombre="Eva", apellido="Alumna", dni="41000000", email="eva@example.com", user=cls.alumno_dni_ajeno
+        )
+        cls.pendiente = User.objects.create_user(username="registro1", password="registro1234", is_active=False)
+        RegistroUsuario.objects.create(
+            nombre="Leo", apellido="Pendiente", dni="60000000", email="leo@example.com",
+            rol_solicitado="ALUMNO", user=cls.pendiente,
+        )
+
+    def _login(self, identificador, password):
+        return self.client.post(self.URL, {"dni": identificador, "password": password}, content_type="application/json")
+
+    def _hashes(self):
+        # Cuenta las veces que corre el hasher (check_password o set_password)
+        hasher = hashers.MD5PasswordHasher
+        return mock.patch.object(hasher, "encode", autospec=True, side_effect=hasher.encode)
+
+    def _usuario_en_sesion(self):
+        return int(self.client.session["_auth_user_id"])
+
+    def test_login_por_username(self):
+        response = self._login("admin", "admin1234")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"ok": True, "rol": "ADMIN", "must_change_password": False})
+        self.assertEqual(self._usuario_en_sesion(), self.admin.pk)
+
+    def test_login_por_dni_de_alumno(self):
+        response = self._login("40000000", "alumno1234")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["rol"], "ALUMNO")
+        self.assertEqual(self._usuario_en_sesion(), self.alumno_user.pk)
+
+    def test_login_por_dni_de_personal(self):
+        response = self._login("25000000", "docente1234")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["rol"], "PERSONAL:DOCENTE")
+        self.assertEqual(self._usuario_en_sesion(), self.docente_user.pk)
+
+    def test_username_tiene_prioridad_sobre_dni(self):
+        self.assertEqual(buscar_usuario_por_identificador("41000000"), self.homonimo)
+        response = self._login("41000000", "homonimo1234")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._usuario_en_sesion(), self.homonimo.pk)
+        # La contraseña del alumno con ese DNI no sirve: el identificador resolvió al otro usuario
+        self.client.logout()
+        self.assertEqual(self._login("41000000", "alumno2345").status_code, 401)
+        self.assertEqual(self._login("alumno2", "alumno2345").status_code, 200)
+
+    def test_registro_pendiente_sin_segundo_hash(self):
+        with self._hashes() as encode:
+            response = self._login("60000000", "registro1234")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("pendiente de aprobación", response.json()["detail"])
+        self.assertEqual(encode.call_count, 1)
+        self.assertNotIn("_auth_user_id", self.client.session)
+        # Con la contraseña equivocada no se revela que la cuenta existe
+        self.assertEqual(self._login("60000000", "otra").status_code, 401)
+
+    def test_identificador_desconocido_corre_el_hasher(self):
+        with self._hashes() as encode, self.assertNumQueries(1):
+            response = self._login("99999999", "cualquiera")
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(encode.call_count, 1)
+
+
+class AdminMateriasQueryCountTests(TestCase):
+    """El listado de materias con docente no debe hacer una consulta por materia"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username="admin", password="admin1234")
+        carrera = Carrera.objects.create(nombre="Sistemas", duracion_anios=3)
+        docente = Personal.objects.create(
+            nombre="Ana", apellido="Docente", dni="20000000", email="ana@example.com", cargo="DOCENTE"
+        )
+        materias = Materia.objects.bulk_create(
+            [Materia(nombre=f"Materia {i:03d}", carrera=carrera) for i in range(500)]
+        )
+        AsignacionDocente.objects.bulk_create(
+            [AsignacionDocente(docente=docente, materia=m) for m in materias[::2]]
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_listado_con_docente_consultas_fijas(self):
+        # sesión + usuario + materias (con carrera) + prefetch de asignaciones
+        with self.assertNumQueries(4):
+            response = self.client.get("/api/admin/materias/")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data), 500)
+        con_docente = [m for m in data if m["docente"] is not None]
+        self.assertEqual(len(con_docente), 250)
+        self.assertEqual(con_docente[0]["docente"]["apellido"], "Docente")
+
+
+class CatalogoCondicionalTests(TestCase):
+    """Los listados del catálogo responden 304 mientras el catálogo no cambie"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.carrera = Carrera.objects.create(nombre="Sistemas", duracion_anios=3)
+        Materia.objects.create(nombre="Algebra", carrera=cls.carrera)
+
+    def test_etag_y_304(self):
+        response = self.client.get("/api/carreras/")
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.assertTrue(response.has_header("Last-Modified"))
+
+        response = self.client.get("/api/carreras/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Materia.objects.create(nombre="Fisica", carrera=self.carrera)
+        response = self.client.get(f"/api/carreras/{self.carrera.id}/materias/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(len(response.json()), 2)
+
+    def test_inscribir_no_invalida_el_catalogo(self):
+        materia = Materia.objects.get(nombre="Algebra")
+        alumno = Alumno.objects.create(nombre="A", apellido="B", dni="40000009", email="c@example.com")
+        url = f"/api/carreras/{self.carrera.id}/materias/"
+        response = self.client.get(url)
+        etag = response["ETag"]
+        self.assertNotIn("cupo", response.json()[0])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            asignacion.inscribir(alumno, materia.id)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        cupos = self.client.get(f"{url}cupos/").json()
+        self.assertEqual(cupos, {str(materia.id): 29})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            asignacion.dar_de_baja(alumno, materia.id)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(f"{url}cupos/").json(), {str(materia.id): 30})
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class PaginacionCursorTests(TestCase):
+    """Listados por cursor: páginas completas sin repetir filas, empates por pk, filtros y cursores inválidos"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username="admin", password="admin1234")
+        cls.sistemas = Carrera.objects.create(nombre="Sistemas", duracion_anios=3)
+        cls.quimica = Carrera.objects.create(nombre="Química", duracion_anios=4)
+        # Siete "Pérez Juan" empatados en el orden por apellido: los desempata la pk
+        cls.alumnos = Alumno.objects.bulk_create(
+            [Alumno(nombre="Juan", apellido="Pérez", dni=f"3{i:07d}", email=f"p{i}@example.com",
+                    carrera_principal=cls.sistemas) for i in range(7)]
+            + [Alumno(nombre="Ana", apellido=f"Gómez {i}", dni=f"4{i:07d}", email=f"g{i}@example.com",
+                      carrera_principal=cls.quimica) for i in range(3)]
+        )
+        cls.docente = Personal.objects.create(
+            nombre="Ana", apellido="Docente", dni="20000000", email="ana@example.com", cargo="DOCENTE"
+        )
+        cls.materia = Materia.objects.create(nombre="Álgebra", carrera=cls.sistemas)
+        Nota.objects.bulk_create([
+            Nota(alumno=a, materia=cls.materia, profesor=cls.docente, nota=7 if i % 2 else 4)
+            for i, a in enumerate(cls.alumnos)
+        ])
+        InscripcionCarrera.objects.bulk_create([
+            InscripcionCarrera(alumno=a, carrera=a.carrera_principal) for a in cls.alumnos
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def _recorrer(self, url, **params):
+        """Sigue next_cursor hasta el final; devuelve las filas y la cantidad de páginas"""
+        filas, paginas, cursor = [], 0, None
+        while True:
+            query = dict(params, limit=3, **({"cursor": cursor} if cursor else {}))
+            response = self.client.get(url, query)
+            self.assertEqual(response.status_code, 200, response.content)
+            data = response.json()
+            filas += data["results"]
+            paginas += 1
+            cursor = data["next_cursor"]
+            if cursor is None:
+                return filas, paginas
+
+    @staticmethod
+    def _cursor(valores):
+        return base64.urlsafe_b64encode(json.dumps(valores).encode()).decode().rstrip("=")
+
+    def test_paginas_con_empates_coinciden_con_el_listado_completo(self):
+        completo = self.client.get("/api/admin/alumnos/").json()
+        filas, paginas = self._recorrer("/api/admin/alumnos/")
+        self.assertEqual(paginas, 4)
+        self.assertEqual([a["id"] for a in filas], [a["id"] for a in completo])
+        perez = [a["id"] for a in filas if a["apellido"] == "Pérez"]
+        self.assertEqual(perez, sorted(perez))
+
+    def test_orden_descendente_con_empates(self):
+        filas, _ = self._recorrer("/api/admin/inscripciones/")
+        # Todas con la misma fecha: el orden lo da la pk descendente
+        ids = [i["id"] for i in filas]
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertEqual(len(ids), len(self.alumnos))
+
+    def test_cursor_con_filtros(self):
+        filas, _ = self._recorrer("/api/admin/alumnos/", carrera=self.quimica.id, orden="dni")
+        self.assertEqual([a["dni"] for a in filas], ["40000000", "40000001", "40000002"])
+        filas, _ = self._recorrer("/api/admin/inscripciones/", carrera=self.sistemas.id)
+        self.assertEqual(len(filas), 7)
+        filas, _ = self._recorrer("/api/admin/alumnos-notas/", estado="aprobado", orden="-nota")
+        self.assertEqual(len(filas), 5)
+        self.assertTrue(all(Decimal(f["nota"]["nota"]) >= 6 for f in filas))
+        filas, _ = self._recorrer("/api/admin/alumnos-notas/", materia=self.materia.id, orden="materia")
+        self.assertEqual(len({f["alumno"]["id"] for f in filas}), 10)
+
+    def test_cursor_con_tipos_invalidos_es_400(self):
+        casos = [
+            ("/api/admin/inscripciones/", ["no es fecha", 1]),
+            ("/api/admin/inscripciones/", ["2024-01-01", "uno"]),
+            ("/api/admin/alumnos-notas/?orden=-nota", ["siete", 1]),
+            ("/api/admin/alumnos/", ["Pérez", "Juan", [1]]),
+            ("/api/admin/alumnos/", [None, "Juan", 1]),
+            ("/api/admin/alumnos/", ["Pérez", "Juan"]),
+            ("/api/admin/alumnos/", {"apellido": "Pérez"}),
+        ]
+        for url, valores in casos:
+            with self.subTest(url=url, valores=valores):
+                separador = "&" if "?" in url else "?"
+                response = self.client.get(f"{url}{separador}cursor={self._cursor(valores)}")
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("cursor", response.json())
+        self.assertEqual(self.client.get("/api/admin/alumnos/?cursor=%%%").status_code, 400)
+
+
+class ExportNotasTests(TestCase):
+    """El export de notas en streaming: encabezado, una fila por nota y valores planos en NDJSON y CSV"""
+
+    URL = "/api/admin/alumnos-notas/export/"
+    COLUMNAS = [
+        "alumno_id", "alumno_dni", "alumno_apellido", "alumno_nombre", "carrera",
+        "materia_id", "materia", "nota", "observaciones", "fecha_modificacion",
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username="admin", password="admin1234")
+        carrera = Carrera.objects.create(nombre="Sistemas", duracion_anios=3)
+        cls.algebra = Materia.objects.create(nombre="Algebra", carrera=carrera)
+        fisica = Materia.objects.create(nombre="Fisica", carrera=carrera)
+        docente = Personal.objects.create(
+            nombre="Ana", apellido="Docente", dni="20000000", email="ana@example.com", cargo="DOCENTE"
+        )
+        cls.alumnos = Alumno.objects.bulk_create([
+            Alumno(nombre="Juan", apellido=apellido, dni=f"3000000{i}", email=f"a{i}@example.com")
+            for i, apellido in enumerate(["Zapata", "Núñez", "Acosta"])
+        ])
+        zapata, nunez, acosta = cls.alumnos
+        Nota.objects.bulk_create([
+            Nota(alumno=acosta, materia=cls.algebra, profesor=docente, nota=Decimal("7.50"),
+                 observaciones='Recuperatorio, "final"'),
+            Nota(alumno=acosta, materia=fisica, profesor=docente, nota=4),
+            Nota(alumno=nunez, materia=cls.algebra, profesor=docente, nota=9),
+            Nota(alumno=zapata, materia=fisica, profesor=docente, nota=6),
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def _contenido(self, **params):
+        response = self.client.get(self.URL, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content).decode("utf-8")
+
+    def test_ndjson(self):
+        response, contenido = self._contenido()
+        self.assertTrue(response["Content-Type"].startswith("application/x-ndjson"))
+        filas = [json.loads(linea) for linea in contenido.splitlines()]
+        self.assertEqual(len(filas), 4)
+        self.assertEqual(list(filas[0]), self.COLUMNAS)
+        # Orden por apellido del alumno y nombre de materia
+        self.assertEqual([(f["alumno_apellido"], f["materia"]) for f in filas], [
+            ("Acosta", "Algebra"), ("Acosta", "Fisica"), ("Núñez", "Algebra"), ("Zapata", "Fisica"),
+        ])
+        primera = filas[0]
+        self.assertEqual(primera["alumno_id"], self.alumnos[2].id)
+        self.assertEqual(primera["alumno_dni"], "30000002")
+        self.assertEqual(primera["carrera"], "Sistemas")
+        self.assertEqual(primera["materia_id"], self.algebra.id)
+        self.assertEqual(primera["nota"], "7.50")
+        self.assertEqual(primera["observaciones"], 'Recuperatorio, "final"')
+        self.assertTrue(primera["fecha_modificacion"])
+
+    def test_csv(self):
+        response, contenido = self._contenido(formato="csv")
+        self.assertTrue(response["Content-Type"].startswith("text/csv"))
+        self.assertIn('filename="notas.csv"', response["Content-Disposition"])
+        encabezado, *filas = list(csv.reader(io.StringIO(contenido)))
+        self.assertEqual(encabezado, self.COLUMNAS)
+        self.assertEqual(len(filas), 4)
+        primera = dict(zip(encabezado, filas[0]))
+        self.assertEqual(
+            {c: primera[c] for c in self.COLUMNAS[:-1]},
+            {
+                "alumno_id": str(self.alumnos[2].id), "alumno_dni": "30000002", "alumno_apellido": "Acosta",
+                "alumno_nombre": "Juan", "carrera": "Sistemas", "materia_id": str(self.algebra.id),
+                "materia": "Algebra", "nota": "7.50", "observaciones": 'Recuperatorio, "final"',
+            },
+        )
+
+    def test_filtros_y_formato_invalido(self):
+        _, contenido = self._contenido(formato="csv", estado="aprobado", materia=self.algebra.id)
+        self.assertEqual(len(contenido.splitlines()), 3)
+        self.assertEqual(self.client.get(self.URL, {"formato": "xlsx"}).status_code, 400)
+
+
+class PresupuestoConsultasTests(TestCase):
+    """
+    Cada endpoint de api/presupuestos.py se mide con pocos y con muchos datos:
+    la cantidad de consultas no debe crecer con los datos ni superar el presupuesto.
+    """
+
+    CHICO = 10
+    GRANDE = 1000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.carrera = Carrera.objects.create(nombre="Sistemas", duracion_anios=3)
+        cls.admin = User.objects.create_superuser(username="admin", password="admin1234")
+        cls.docente_user = User.objects.create_user(username="30000000", password="docente1234")
+        cls.docente = Personal.objects.create(
+            nombre="Ana", apellido="Docente", dni="30000000", email="ana@example.com",
+            cargo="DOCENTE", user=cls.docente_user,
+        )
+        cls.alumno_user = User.objects.create_user(username="40000000", password="alumno1234")
+        cls.alumno = Alumno.objects.create(
+            nombre="Juan", apellido="Alumno", dni="40000000", email="juan@example.com",
+            carrera_principal=cls.carrera, user=cls.alumno_user,
+        )
+        # Materia con cupo libre para medir inscribir / dar de baja
+        cls.materia_libre = Materia.objects.create(nombre="Libre", carrera=cls.carrera, cupo=5)
+        cls.solicitud = SolicitudInscripcion.objects.create(
+            alumno=cls.alumno, materia=Materia.objects.create(nombre="Cola", carrera=cls.carrera), estado="PENDIENTE"
+        )
+        cls.materias = []
+        cls.alumnos = []
+
+    def _sembrar(self, hasta):
+        """Agrega filas hasta tener `hasta` materias, alumnos, notas, inscripciones y registros"""
+        desde = len(self.materias)
+        nuevas = Materia.objects.bulk_create([
+            Materia(nombre=f"Materia {i:04d}", carrera=self.carrera, cupo=100) for i in range(desde, hasta)
+        ])
+        AsignacionDocente.objects.bulk_create([AsignacionDocente(docente=self.docente, materia=m) for m in nuevas])
+        alumnos = Alumno.objects.bulk_create([
+            Alumno(nombre="N", apellido=f"A{i:04d}", dni=f"5{i:07d}", email=f"a{i}@example.com",
+                   carrera_principal=self.carrera)
+            for i in range(desde, hasta)
+        ])
+        self.materias += nuevas
+        self.alumnos += alumnos
+        primera = self.materias[0]
+        InscripcionAlumno.objects.bulk_create(
+            [InscripcionAlumno(alumno=self.alumno, materia=m) for m in nuevas]
+            + [InscripcionAlumno(alumno=a, materia=primera) for a in alumnos]
+        )
+        Nota.objects.bulk_create(
+            [Nota(alumno=self.alumno, materia=m, profesor=self.docente, nota=7) for m in nuevas]
+            + [Nota(alumno=a, materia=primera, profesor=self.docente, nota=4) for a in alumnos
+               if a.pk != self.alumno.pk]
+        )
+        InscripcionCarrera.objects.bulk_create([InscripcionCarrera(alumno=a, carrera=self.carrera) for a in alumnos])
+        RegistroUsuario.objects.bulk_create([
+            RegistroUsuario(nombre="R", apellido=f"R{i}", dni=f"6{i:07d}", email=f"r{i}@example.com",
+                            rol_solicitado="ALUMNO")
+            for i in range(desde, hasta)
+        ])
+        reconstruir()
+        reconstruir_materias()
+
+    def _llamadas(self):
+        """nombre de URL -> (usuario, método, kwargs de la URL, datos)"""
+        primera = self.materias[0].id
+        libre = self.materia_libre.id
+        return {
+            "csrf": (None, "get", {}, None),
+            "login": (None, "post", {}, {"dni": "40000000", "password": "alumno1234"}),
+            "me": (self.alumno_user, "get", {}, None),
+            "carreras_list": (None, "get", {}, None),
+            "carreras_detail": (None, "get", {"carrera_id": self.carrera.id}, None),
+            "materias_by_carrera": (None, "get", {"carrera_id": self.carrera.id}, None),
+            "materias_cupos": (None, "get", {"carrera_id": self.carrera.id}, None),
+            "alumno_me": (self.alumno_user, "get", {}, None),
+            "alumno_mis_notas": (self.alumno_user, "get", {}, None),
+            "alumno_resumen_academico": (self.alumno_user, "get", {}, None),
+            "alumno_mis_materias": (self.alumno_user, "get", {}, None),
+            "solicitud_inscripcion": (self.alumno_user, "get", {"solicitud_id": self.solicitud.id}, None),
+            "inscribir_materia": (self.alumno_user, "post", {}, {"materia_id": libre}),
+            "dar_baja_materia": (self.alumno_user, "delete", {"materia_id": libre}, None),
+            "docente_materias": (self.docente_user, "get", {}, None),
+            "docente_alumnos_por_materia": (self.docente_user, "get", {"materia_id": primera}, None),
+            "docente_by_materia": (None, "get", {"materia_id": primera}, None),
+            "docente_nota_upsert": (
+                self.docente_user, "post", {}, {"alumno": self.alumnos[-1].id, "materia": primera, "nota": 8}
+            ),
+            "docente_nota_bulk_upsert": (
+                self.docente_user, "post", {},
+                {"materia": primera, "notas": [{"alumno": a.id, "nota": "8.50"} for a in self.alumnos[-5:]]},
+            ),
+            "admin_stats": (self.admin, "get", {}, None),
+            "admin_alumnos": (self.admin, "get", {}, None),
+            "admin_inscripciones": (self.admin, "get", {}, None),
+            "admin_usuarios_pendientes": (self.admin, "get", {}, None),
+            "admin_materias": (self.admin, "get", {}, None),
+            "admin_materias_count": (self.admin, "get", {}, None),
+            "admin_materias_estadisticas": (self.admin, "get", {}, None),
+            "admin_docentes": (self.admin, "get", {}, None),
+            "admin_alumnos_notas": (self.admin, "get", {}, None),
+            "admin_alumnos_notas_export": (self.admin, "get", {}, None),
+        }
+
+    def _medir(self):
+        consultas = {}
+        for nombre, (usuario, metodo, kwargs, datos) in self._llamadas().items():
+            self.client.logout()
+            if usuario is not None:
+                self.client.force_login(usuario)
+            extra = {"data": datos, "content_type": "application/json"} if datos is not None else {}
+            # Con los callbacks on_commit (contadores), que en producción corren en el mismo request
+            with CaptureQueriesContext(connection) as ctx, self.captureOnCommitCallbacks(execute=True):
+                # urlconf de la API: "login"/"logout" también existen en django.contrib.auth.urls
+                url = "/api" + reverse(nombre, urlconf=api_urls, kwargs=kwargs)
+                response = getattr(self.client, metodo)(url, **extra)
+                if isinstance(response, StreamingHttpResponse):
+                    contenido = b"".join(response.streaming_content)
+                else:
+                    contenido = response.content
+            self.assertLess(response.status_code, 300, f"{nombre}: {response.status_code} {contenido[:200]!r}")
+            consultas[nombre] = len(ctx)
+        return consultas
+
+    def test_registro_cubre_todas_las_urls(self):
+        nombres = {p.name for p in api_urls.urlpatterns}
+        self.assertEqual(nombres - set(PRESUPUESTO_CONSULTAS) - set(SIN_PRESUPUESTO), set())
+        self.assertEqual((set(PRESUPUESTO_CONSULTAS) | set(SIN_PRESUPUESTO)) - nombres, set())
+        self._sembrar(1)
+        self.assertEqual(set(self._llamadas()), set(PRESUPUESTO_CONSULTAS))
+
+    def test_consultas_constantes_y_dentro_del_presupuesto(self):
+        self._sembrar(self.CHICO)
+        chico = self._medir()
+        self._sembrar(self.GRANDE)
+        grande = self._medir()
+        for nombre, presupuesto in PRESUPUESTO_CONSULTAS.items():
+            with self.subTest(endpoint=nombre):
+                self.assertEqual(
+                    grande[nombre], chico[nombre],
+                    f"{nombre}: {chico[nombre]} consultas con {self.CHICO} filas y {grande[nombre]} con {self.GRANDE}",
+                )
+                self.assertLessEqual(grande[nombre], presupuesto, f"{nombre} supera su presupuesto")
+
+
+class InstrumentacionSQLTests(TestCase):
+    """El middleware de instrumentación informa las consultas del request y loguea las lentas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username="admin", password="admin1234")
+        Carrera.objects.create(nombre="Sistemas", duracion_anios=3)
+        # La fila de contadores se crea al confirmar, y TestCase nunca confirma
+        reconstruir()
+
+    def test_server_timing_detalle_y_log_lento(self):
+        with tempfile.TemporaryDirectory() as carpeta:
+            archivo = Path(carpeta) / "sql_lento.log"
+            with self.settings(SQL_INSTRUMENTACION=True, SQL_INSTRUMENTACION_DETALLE=True,
+                               SQL_LENTO_MS=0, SQL_LENTO_ARCHIVO=archivo):
+                self.client.force_login(self.admin)
+                response = self.client.get("/api/admin/stats/")
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('db;dur=', response["Server-Timing"])
+            detalle = response.json()["_sql"]
+            self.assertEqual(detalle["consultas"], 3)
+            self.assertTrue(detalle["mas_lentas"])
+            log = archivo.read_text(encoding="utf-8")
+            self.assertIn("api.views.AdminStatsView", log)
+            # Sin valores de los parámetros: la clave de sesión no debe quedar en el log
+            self.assertNotIn(self.client.session.session_key, log)
+            self.assertIn("parámetros)", log)
+            logger = logging.getLogger("gestion_educativa.sql_lento")
+            for handler in list(logger.handlers):
+                handler.close()
+                logger.removeHandler(handler)
+
+    def test_desactivado_por_defecto(self):
+        response = self.client.get("/api/carreras/")
+        self.assertFalse(response.has_header("Server-Timing"))
+
+
+class RuteoLecturaTests(TransactionTestCase):
+    """Los GET de la API leen de la conexión de sólo lectura y las escrituras quedan en default"""
+
+    # TestCase envuelve todo en una transacción de default, donde el router no desvía lecturas
+    databases = {"default", "lectura"}
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username="admin", password="admin1234")
+        carrera = Carrera.objects.create(nombre="Sistemas", duracion_anios=3)
+        materia = Materia.objects.create(nombre="Algebra", carrera=carrera)
+        alumno = Alumno.objects.create(nombre="Ana", apellido="Perez", dni="30000000", email="ana@example.com")
+        Nota.objects.create(alumno=alumno, materia=materia, nota=8)
+        self.client.force_login(self.admin)
+
+    def _consultas(self, llamada):
+        with CaptureQueriesContext(connections["default"]) as default, \
+                CaptureQueriesContext(connections["lectura"]) as lectura:
+            response = llamada()
+            if response.streaming:
+                b"".join(response.streaming_content)
+        return response, len(default), len(lectura)
+
+    def test_get_lee_de_lectura(self):
+        response, en_default, en_lectura = self._consultas(lambda: self.client.get("/api/admin/stats/"))
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(en_lectura, 0)
+        # Sólo sesión y usuario se leen de default
+        self.assertEqual(en_default, 2)
+
+    def test_export_en_streaming_lee_de_lectura(self):
+        response, _, en_lectura = self._consultas(lambda: self.client.get("/api/admin/alumnos-notas/export/"))
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(en_lectura, 0)
+
+    def test_post_usa_default(self):
+        response, en_default, en_lectura = self._consultas(
+            lambda: self.client.post("/api/admin/carreras", {"nombre": "Quimica", "duracion_anios": 4})
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertGreater(en_default, 0)
+        self.assertEqual(en_lectura, 0)
+
+    def test_transaccion_abierta_lee_de_default(self):
+        router = LecturaEscrituraRouter()
+        with solo_lectura():
+            self.assertEqual(router.db_for_read(Materia), "lectura")
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(Materia), "default")
+        self.assertEqual(router.db_for_read(Materia), "default")
+
+    def test_sesion_usuarios_y_registros_leen_de_default(self):
+        router = LecturaEscrituraRouter()
+        with solo_lectura():
+            for modelo in (Session, User, RegistroUsuario):
+                with self.subTest(modelo=modelo.__name__):
+                    self.assertEqual(router.db_for_read(modelo), "default")
+
+
+class GenerarCargaTests(SimpleTestCase):
+    """El generador de carga en proceso corre sobre una base de prueba propia y hace requests de verdad"""
+
+    def test_humo_en_proceso(self):
+        with tempfile.TemporaryDirectory() as carpeta:
+            salida = Path(carpeta) / "resumen.json"
+            # En otro proceso: como desde la consola, sin la base de prueba de esta corrida de tests
+            subprocess.run(
+                [sys.executable, "manage.py", "generar_carga", "--alumnos", "2", "--docentes", "1", "--admins", "1",
+                 "--materias", "2", "--duracion", "1", "--json", str(salida)],
+                cwd=settings.BASE_DIR, check=True, capture_output=True, timeout=300,
+            )
+            resumen = json.loads(salida.read_text(encoding="utf-8"))
+        self.assertEqual((resumen["logins_fallidos"], resumen["errores"]), (0, 0))
+        self.assertGreater(resumen["requests"], 0)
+
+
+class PerfilBaseDatosTests(SimpleTestCase):
+    """DATABASES se arma desde las variables DB_*"""
+
+    def test_sqlite_por_defecto(self):
+        databases = databases_desde_entorno(Path("/srv/app"), "lectura", {})
+        default = databases["default"]
+        self.assertEqual(default["OPTIONS"]["transaction_mode"], "IMMEDIATE")
+        self.assertIn("journal_mode=WAL", default["OPTIONS"]["init_command"])
+        self.assertTrue(default["CONN_HEALTH_CHECKS"])
+        self.assertEqual(databases["lectura"]["NAME"], "file:///srv/app/db.sqlite3?mode=ro")
+
+    def test_postgres_persistente_y_con_pool(self):
+        entorno = {"DB_MOTOR": "postgres", "DB_NOMBRE": "academica", "DB_CONN_MAX_AGE": "300"}
+        databases = databases_desde_entorno(Path("/srv/app"), "lectura", entorno)
+        self.assertEqual(databases["default"]["ENGINE"], "django.db.backends.postgresql")
+        self.assertEqual(databases["default"]["CONN_MAX_AGE"], 300)
+        self.assertNotIn("lectura", databases)
+
+        databases = databases_desde_entorno(
+            Path("/srv/app"), "lectura", {**entorno, "DB_POOL_MAX": "20", "DB_LECTURA_HOST": "replica"}
+        )
+        self.assertEqual(databases["default"]["OPTIONS"]["pool"], {"min_size": 2, "max_size": 20})
+        self.assertEqual(databases["default"]["CONN_MAX_AGE"], 0)
+        self.assertEqual(databases["lectura"]["HOST"], "replica")
+        self.assertEqual(databases["lectura"]["TEST"], {"MIRROR": "default"})
+
+    def test_motor_desconocido(self):
+        with self.assertRaises(ValueError):
+            databases_desde_entorno(Path("/srv/app"), "lectura", {"DB_MOTOR": "oracle"})
+
+
+class EstadisticasMateriaTests(TestCase):
+    """Los deltas de EstadisticasMateria coinciden con un recálculo desde cero"""
+
+    @classmethod
+    def setUpTestData(cls):
+        carrera = Carrera.objects.create(nombre="Sistemas", duracion_anios=3)
+        cls.admin = User.objects.create_superuser(username="admin", password="admin1234")
+        cls.docente_user = User.objects.create_user(username="30000000", password="docente1234")
+        cls.docente = Personal.objects.create(
+            nombre="Ana", apellido="Docente", dni="30000000", email="ana@example.com",
+            cargo="DOCENTE", user=cls.docente_user,
+        )
+        cls.algebra = Materia.objects.create(nombre="Algebra", carrera=carrera, cupo=10)
+        cls.fisica = Materia.objects.create(nombre="Fisica", carrera=carrera, cupo=10)
+        for materia in (cls.algebra, cls.fisica):
+            AsignacionDocente.objects.create(docente=cls.docente, materia=materia)
+        cls.alumnos = [
+            Alumno.objects.create(nombre="N", apellido=f"A{i}", dni=f"4000000{i}", email=f"a{i}@example.com")
+            for i in range(4)
+        ]
+
+    def _filas(self):
+        campos = ["materia_id", "notas", "suma_notas", "aprobadas", "inscriptos_activos"] + [
+            f"histograma_{n}" for n in range(1, 11)
+        ]
+        return list(EstadisticasMateria.objects.order_by("materia_id").values_list(*campos))
+
+    def test_deltas_igual_a_reconstruir(self):
+        a0, a1, a2, a3 = self.alumnos
+        asignacion.inscribir(a0, self.algebra.id)
+        asignacion.inscribir(a1, self.algebra.id)
+        asignacion.inscribir_varias(a2, [self.algebra.id, self.fisica.id])
+        asignacion.dar_de_baja(a1, self.algebra.id)
+
+        nota = Nota.objects.create(alumno=a0, materia=self.algebra, profesor=self.docente, nota=Decimal("5.50"))
+        Nota.objects.create(alumno=a2, materia=self.algebra, profesor=self.docente, nota=Decimal("10.00"))
+        nota.nota = Decimal("6.00")
+        nota.save()
+        nota.materia = self.fisica
+        nota.save()
+        Nota.objects.create(alumno=a3, materia=self.fisica, profesor=self.docente, nota=Decimal("2.00")).delete()
+
+        # La carga masiva sólo califica a inscriptos en la materia
+        asignacion.inscribir(a3, self.algebra.id)
+        self.client.force_login(self.docente_user)
+        response = self.client.post("/api/docente/notas/bulk/", {
+            "materia": self.algebra.id,
+            "notas": [{"alumno": a2.id, "nota": "7.25"}, {"alumno": a3.id, "nota": "9.00"}],
+        }, content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+
+        por_deltas = self._filas()
+        reconstruir_materias()
+        self.assertEqual(por_deltas, self._filas())
+
+        algebra = EstadisticasMateria.objects.get(materia=self.algebra)
+        self.assertEqual((algebra.notas, algebra.aprobadas, algebra.inscriptos_activos), (2, 2, 3))
+        self.assertEqual(algebra.promedio, Decimal("8.13"))
+        self.assertEqual(algebra.histograma, [0, 0, 0, 0, 0, 0, 1, 0, 1, 0])
+
+    def test_endpoint_y_baja_de_materia(self):
+        materia = Materia.objects.create(nombre="Optativa", carrera=self.algebra.carrera, cupo=5)
+        asignacion.inscribir(self.alumnos[0], materia.id)
+        Nota.objects.create(alumno=self.alumnos[0], materia=self.algebra, profesor=self.docente, nota=4)
+
+        self.client.force_login(self.admin)
+        response = self.client.get("/api/admin/materias/estadisticas/")
+        self.assertEqual(response.status_code, 200)
+        datos = {m["nombre"]: m for m in response.json()}
+        self.assertEqual(datos["Algebra"]["promedio"], "4.00")
+        self.assertEqual(datos["Algebra"]["porcentaje_aprobadas"], 0.0)
+        self.assertEqual(datos["Optativa"]["inscriptos_activos"], 1)
+        self.assertIsNone(datos["Fisica"]["promedio"])
+
+        # La baja en cascada de las inscripciones no recrea la fila de la materia borrada
+        materia.delete()
+        self.assertFalse(EstadisticasMateria.objects.filter(materia_id=materia.id).exists())
+
+    def test_baja_de_materia_fallida_no_corta_los_deltas(self):
+        materia = Materia.objects.create(nombre="Optativa", carrera=self.algebra.carrera, cupo=5)
+        AsignacionDocente.objects.create(docente=self.docente, materia=materia)
+        asignacion.inscribir(self.alumnos[0], materia.id)
+
+        def fallar(sender, instance, **kwargs):
+            raise IntegrityError("baja rechazada")
+
+        # El borrado falla a mitad de la cascada (después del pre_delete de la materia) y se revierte
+        post_delete.connect(fallar, sender=InscripcionAlumno, dispatch_uid="test_baja_fallida")
+        try:
+            with self.assertRaises(IntegrityError), transaction.atomic():
+                materia.delete()
+        finally:
+            post_delete.disconnect(dispatch_uid="test_baja_fallida", sender=InscripcionAlumno)
+
+        # La materia sigue en pie y sus inscripciones y notas siguen actualizando el resumen
+        asignacion.inscribir(self.alumnos[1], materia.id)
+        Nota.objects.create(alumno=self.alumnos[1], materia=materia, profesor=self.docente, nota=9)
+        resumen = EstadisticasMateria.objects.get(materia=materia)
+        self.assertEqual((resumen.inscriptos_activos, resumen.notas), (2, 1))
+
+
+class NotaBulkUpsertTests(TestCase):
+    """Carga masiva de notas: consultas fijas, errores por fila y actualización de notas existentes"""
+
+    URL = "/api/docente/notas/bulk/"
+
+    @classmethod
+    def setUpTestData(cls):
+        carrera = Carrera.objects.create(nombre="Sistemas", duracion_anios=3)
+        cls.materia = Materia.objects.create(nombre="Algebra", carrera=carrera, cupo=200)
+        cls.docente_user = User.objects.create_user(username="30000000", password="docente1234")
+        cls.docente = Personal.objects.create(
+            nombre="Ana", apellido="Docente", dni="30000000", email="ana@example.com",
+            cargo="DOCENTE", user=cls.docente_user,
+        )
+        AsignacionDocente.objects.create(docente=cls.docente, materia=cls.materia)
+        cls.alumnos = Alumno.objects.bulk_create([
+            Alumno(nombre="N", apellido=f"A{i:03d}", dni=f"5{i:07d}", email=f"a{i}@example.com")
+            for i in range(101)
+        ])
+        # El último no está inscripto
+        InscripcionAlumno.objects.bulk_create([InscripcionAlumno(alumno=a, materia=cls.materia) for a in cls.alumnos[:100]])
+        reconstruir()
+        reconstruir_materias()
+
+    def setUp(self):
+        self.client.force_login(self.docente_user)
+
+    def _cargar(self, notas):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(self.URL, {"materia": self.materia.id, "notas": notas}, content_type="application/json")
+
+    def test_consultas_constantes(self):
+        for filas in (5, 100):
+            with self.subTest(filas=filas), self.assertNumQueries(PRESUPUESTO_CONSULTAS["docente_nota_bulk_upsert"]):
+                response = self._cargar([{"alumno": a.id, "nota": "7.00"} for a in self.alumnos[:filas]])
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(Nota.objects.filter(materia=self.materia).count(), 100)
+
+    def test_errores_por_fila(self):
+        a0, a1 = self.alumnos[:2]
+        response = self._cargar([
+            {"alumno": a0.id, "nota": "11.00"},
+            {"alumno": a1.id, "nota": "0.50"},
+            {"alumno": self.alumnos[-1].id, "nota": "8.00"},
+            {"alumno": 999999, "nota": "8.00"},
+            {"alumno": a0.id, "nota": "6.00"},
+            {"alumno": a0.id, "nota": "7.00"},
+        ])
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data["creadas"], data["actualizadas"], data["errores"]), (1, 0, 5))
+        estados = [(r["estado"], list(r.get("errores", {}))) for r in data["resultados"]]
+        self.assertEqual(estados, [
+            ("error", ["nota"]), ("error", ["nota"]), ("error", ["alumno"]), ("error", ["alumno"]),
+            ("creada", []), ("error", ["alumno"]),
+        ])
+        self.assertEqual(data["resultados"][2]["errores"]["alumno"], ["El alumno no está inscripto en la materia"])
+        self.assertEqual(list(Nota.objects.values_list("alumno_id", "nota")), [(a0.id, Decimal("6.00"))])
+
+        # Docente no asignado a la materia
+        otra = Materia.objects.create(nombre="Fisica", carrera=self.materia.carrera)
+        response = self.client.post(
+            self.URL, {"materia": otra.id, "notas": [{"alumno": a0.id, "nota": "7"}]}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_actualiza_notas_existentes(self):
+        a0, a1, a2 = self.alumnos[:3]
+        with self.captureOnCommitCallbacks(execute=True):
+            Nota.objects.create(alumno=a0, materia=self.materia, profesor=self.docente, nota=Decimal("4.00"))
+            Nota.objects.create(alumno=a1, materia=self.materia, profesor=self.docente, nota=Decimal("9.00"))
+        response = self._cargar([
+            {"alumno": a0.id, "nota": "8.00", "observaciones": "Recuperatorio"},
+            {"alumno": a1.id, "nota": "5.00"},
+            {"alumno": a2.id, "nota": "6.00"},
+        ])
+        data = response.json()
+        self.assertEqual((data["creadas"], data["actualizadas"], data["errores"]), (1, 2, 0))
+        notas = dict(Nota.objects.values_list("alumno_id", "nota"))
+        self.assertEqual(notas, {a0.id: Decimal("8.00"), a1.id: Decimal("5.00"), a2.id: Decimal("6.00")})
+        self.assertEqual(Nota.objects.get(alumno=a0).observaciones, "Recuperatorio")
+        self.assertEqual(Nota.objects.count(), 3)
+
+        # Contadores generales y resumen de la materia iguales a un recálculo
+        estadisticas = obtener()
+        self.assertEqual((estadisticas.notas, estadisticas.notas_aprobadas), (3, 2))
+        self.assertEqual((reconstruir().notas, reconstruir().notas_aprobadas), (3, 2))
+        resumen = EstadisticasMateria.objects.get(materia=self.materia)
+        self.assertEqual((resumen.notas, resumen.aprobadas, resumen.suma_notas), (3, 2, Decimal("19.00")))
+
+    def test_nota_concurrente_antes_de_la_escritura(self):
+        a0, a1 = self.alumnos[:2]
+        atomic = transaction.atomic
+        concurrente = []
+
+        def atomic_con_nota_concurrente(*args, **kwargs):
+            # Otra carga guarda una nota de a0 después de validar las filas y antes de escribir
+            if not concurrente:
+                concurrente.append(True)
+                Nota.objects.create(alumno=a0, materia=self.materia, profesor=self.docente, nota=Decimal("4.00"))
+            return atomic(*args, **kwargs)
+
+        with mock.patch.object(transaction, "atomic", side_effect=atomic_con_nota_concurrente):
+            response = self._cargar([{"alumno": a0.id, "nota": "8.00"}, {"alumno": a1.id, "nota": "9.00"}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r["estado"] for r in response.json()["resultados"]], ["actualizada", "creada"])
+        estadisticas = obtener()
+        self.assertEqual((estadisticas.notas, estadisticas.notas_aprobadas), (2, 2))
+        resumen = EstadisticasMateria.objects.get(materia=self.materia)
+        self.assertEqual((resumen.notas, resumen.aprobadas, resumen.suma_notas), (2, 2, Decimal("17.00")))
+
+
+class DocenteAlumnosPorMateriaTests(TestCase):
+    """Alumnos de una materia del docente: formato completo y compacto con las mismas consultas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        carrera = Carrera.objects.create(nombre="Sistemas", duracion_anios=3)
+        cls.materia = Materia.objects.create(nombre="Algebra", carrera=carrera, cupo=100)
+        cls.docente_user = User.objects.create_user(username="30000000", password="docente1234")
+        cls.docente = Personal.objects.create(
+            nombre="Ana", apellido="Docente", dni="30000000", email="ana@example.com",
+            cargo="DOCENTE", user=cls.docente_user,
+        )
+        AsignacionDocente.objects.create(docente=cls.docente, materia=cls.materia)
+        cls.alumnos = Alumno.objects.bulk_create([
+            Alumno(nombre="N", apellido=f"A{i:02d}", dni=f"5{i:07d}", email=f"a{i}@example.com",
+                   carrera_principal=carrera)
+            for i in range(20)
+        ])
+        InscripcionAlumno.objects.bulk_create([InscripcionAlumno(alumno=a, materia=cls.materia) for a in cls.alumnos])
+        # Los dos primeros calificados; el último dado de baja no aparece
+        Nota.objects.bulk_create([
+            Nota(alumno=cls.alumnos[0], materia=cls.materia, profesor=cls.docente, nota=Decimal("8.50"),
+                 observaciones="Muy bien"),
+            Nota(alumno=cls.alumnos[1], materia=cls.materia, profesor=cls.docente, nota=4),
+        ])
+        InscripcionAlumno.objects.filter(alumno=cls.alumnos[-1]).update(activa=False)
+        cls.url = f"/api/docente/materias/{cls.materia.id}/alumnos/"
+
+    def setUp(self):
+        self.client.force_login(self.docente_user)
+
+    def test_formato_compacto(self):
+        response = self.client.get(self.url, {"formato": "compacto"})
+        self.assertEqual(response.status_code, 200)
+        filas = {f["alumno_id"]: f for f in response.json()}
+        self.assertEqual(set(filas), {a.id for a in self.alumnos[:-1]})
+        calificado, sin_nota = self.alumnos[0], self.alumnos[2]
+        self.assertEqual(filas[calificado.id], {
+            "alumno_id": calificado.id, "dni": "50000000", "apellido": "A00", "nombre": "N",
+            "nota_id": Nota.objects.get(alumno=calificado).id, "nota": "8.50", "observaciones": "Muy bien",
+        })
+        self.assertEqual(filas[sin_nota.id], {
+            "alumno_id": sin_nota.id, "dni": "50000002", "apellido": "A02", "nombre": "N",
+            "nota_id": None, "nota": None, "observaciones": "",
+        })
+        # Mismos alumnos que el formato completo
+        completo = self.client.get(self.url).json()
+        self.assertEqual({f["alumno"]["id"] for f in completo}, set(filas))
+
+    def test_compacto_con_las_mismas_consultas(self):
+        with CaptureQueriesContext(connection) as completo:
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertLessEqual(len(completo), PRESUPUESTO_CONSULTAS["docente_alumnos_por_materia"])
+        with self.assertNumQueries(len(completo)):
+            self.assertEqual(self.client.get(self.url, {"formato": "compacto"}).status_code, 200)
+
+
+class ContadoresGeneralesTests(TestCase):
+    """Los deltas de EstadisticasGenerales se aplican al confirmar y coinciden con reconstruir()"""
+
+    CAMPOS = ["alumnos", "carreras", "materias", "notas", "notas_aprobadas", "registros_pendientes",
+              "inscripciones_activas"]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.carrera = Carrera.objects.create(nombre="Sistemas", duracion_anios=3)
+        cls.materia = Materia.objects.create(nombre="Algebra", carrera=cls.carrera)
+        cls.docente = Personal.objects.create(
+            nombre="Ana", apellido="Docente", dni="30000000", email="ana@example.com", cargo="DOCENTE",
+        )
+        AsignacionDocente.objects.create(docente=cls.docente, materia=cls.materia)
+        reconstruir()
+
+    def _contadores(self, estadisticas):
+        return {campo: getattr(estadisticas, campo) for campo in self.CAMPOS}
+
+    def assertIgualAReconstruir(self):
+        self.assertEqual(self._contadores(obtener()), self._contadores(reconstruir()))
+
+    def test_alta_cambio_y_baja(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            alumno = Alumno.objects.create(nombre="N", apellido="A", dni="40000000", email="a@example.com")
+            inscripcion = InscripcionAlumno.objects.create(alumno=alumno, materia=self.materia)
+            nota = Nota.objects.create(alumno=alumno, materia=self.materia, profesor=self.docente, nota=3)
+            registro = RegistroUsuario.objects.create(
+                nombre="R", apellido="R", dni="40000001", email="r@example.com", rol_solicitado="ALUMNO",
+            )
+        self.assertIgualAReconstruir()
+        self.assertEqual((obtener().alumnos, obtener().notas, obtener().registros_pendientes), (1, 1, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            nota.nota = 8
+            nota.save()
+            inscripcion.activa = False
+            inscripcion.save()
+            registro.estado = "RECHAZADO"
+            registro.save()
+        self.assertIgualAReconstruir()
+        self.assertEqual((obtener().notas_aprobadas, obtener().inscripciones_activas), (1, 0))
+
+        # Instancias cargadas de la base: el valor anterior viene de la carga
+        with self.captureOnCommitCallbacks(execute=True):
+            inscripcion = InscripcionAlumno.objects.get(pk=inscripcion.pk)
+            inscripcion.activa = True
+            inscripcion.save()
+            Nota.objects.get(pk=nota.pk).delete()
+            RegistroUsuario.objects.get(pk=registro.pk).delete()
+            alumno.delete()
+        self.assertIgualAReconstruir()
+        self.assertEqual(self._contadores(obtener())["alumnos"], 0)
+
+    def test_save_sin_select_previo(self):
+        alumno = Alumno.objects.create(nombre="N", apellido="A", dni="40000000", email="a@example.com")
+        inscripcion = InscripcionAlumno.objects.create(alumno=alumno, materia=self.materia)
+        inscripcion = InscripcionAlumno.objects.get(pk=inscripcion.pk)
+        inscripcion.activa = False
+        # Sólo el UPDATE de la fila y el de EstadisticasMateria: el general va al confirmar
+        with self.captureOnCommitCallbacks() as callbacks, self.assertNumQueries(2):
+            inscripcion.save()
+        self.assertEqual(len(callbacks), 1)
+
+    def test_rollback_descarta_los_deltas(self):
+        antes = self._contadores(obtener())
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                Alumno.objects.create(nombre="N", apellido="A", dni="40000000", email="a@example.com")
+                raise RuntimeError
+        self.assertEqual(self._contadores(obtener()), antes)
+        self.assertIgualAReconstruir()
+
+
+@unittest.skipIf(analitica.np is None, "NumPy no está instalado")
+class AnaliticaNotasTests(TestCase):
+    """El snapshot columnar se actualiza por fecha_modificacion y sus reportes coinciden con la base"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username="admin", password="admin1234")
+        docente = Personal.objects.create(
+            nombre="Ana", apellido="Docente", dni="30000000", email="ana@example.com", cargo="DOCENTE"
+        )
+        carrera = Carrera.objects.create(nombre="Sistemas", duracion_anios=3)
+        cls.materias = [Materia.objects.create(nombre=f"M{i}", carrera=carrera) for i in range(2)]
+        for materia in cls.materias:
+            AsignacionDocente.objects.create(docente=docente, materia=materia)
+        cls.docente = docente
+        cls.alumnos = [
+            Alumno.objects.create(nombre="N", apellido=f"A{i}", dni=f"4000000{i}", email=f"a{i}@example.com")
+            for i in range(5)
+        ]
+        for i, alumno in enumerate(cls.alumnos):
+            for j, materia in enumerate(cls.materias):
+                Nota.objects.create(alumno=alumno, materia=materia, profesor=docente, nota=Decimal(3 + i + j))
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+
+    def _comparar_con_base(self, snapshot):
+        reconstruir_materias()
+        for fila in snapshot.resumen(por="materia"):
+            estadisticas = EstadisticasMateria.objects.get(materia_id=fila["materia"])
+            self.assertEqual(fila["notas"], estadisticas.notas)
+            self.assertEqual(fila["aprobadas"], estadisticas.aprobadas)
+            self.assertEqual(Decimal(str(fila["promedio"])), estadisticas.promedio)
+            self.assertEqual(fila["histograma"], estadisticas.histograma)
+
+    def test_exportacion_incremental_y_reportes(self):
+        info = analitica.actualizar_snapshot(self.directorio.name)
+        self.assertEqual((info["filas"], info["completo"]), (10, True))
+        snapshot = analitica.cargar_snapshot(self.directorio.name)
+        self._comparar_con_base(snapshot)
+        # Notas de M0: 3, 4, 5, 6, 7
+        m0 = snapshot.resumen(filtro={"materia": self.materias[0].id})
+        self.assertEqual(m0[0]["percentiles"]["50"], 5.0)
+        self.assertEqual(m0[0]["percentiles"]["25"], 4.0)
+
+        nota = Nota.objects.get(alumno=self.alumnos[0], materia=self.materias[0])
+        nota.nota = Decimal("9.50")
+        nota.save()
+        Nota.objects.get(alumno=self.alumnos[1], materia=self.materias[1]).delete()
+        info = analitica.actualizar_snapshot(self.directorio.name)
+        self.assertEqual((info["filas"], info["descartadas"], info["completo"]), (9, 1, False))
+        self._comparar_con_base(analitica.cargar_snapshot(self.directorio.name))
+
+        cohortes = analitica.cargar_snapshot(self.directorio.name).comparar_cohortes(por="carrera")
+        self.assertEqual(sum(c["notas"] for filas in cohortes.values() for c in filas), 9)
+
+    def test_endpoint(self):
+        self.client.force_login(self.admin)
+        with override_settings(ANALITICA_DIR=self.directorio.name):
+            self.assertEqual(self.client.get("/api/admin/analitica/notas/").status_code, 503)
+            analitica.actualizar_snapshot()
+            with self.assertNumQueries(2):
+                response = self.client.get("/api/admin/analitica/notas/", {"por": "carrera"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["grupos"][0]["notas"], 10)
+
+
+class ImportacionTests(TestCase):
+    """Importación masiva: validación en memoria, lotes con bulk_create y contadores al día"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username="admin", password="admin1234")
+        cls.carrera = Carrera.objects.create(nombre="Sistemas", duracion_anios=3)
+        Alumno.objects.create(nombre="Ya", apellido="Existe", dni="40000000", email="existe@example.com")
+        reconstruir()
+
+    def _importar(self, tipo, contenido, **kwargs):
+        archivo = io.BytesIO(contenido.encode("utf-8"))
+        # Los contadores se actualizan al confirmar cada lote (on_commit)
+        with self.captureOnCommitCallbacks(execute=True):
+            return importacion.importar(tipo, importacion.leer_filas(archivo, f"{tipo}.csv"), **kwargs)
+
+    def test_alumnos_por_lotes_con_errores_por_fila(self):
+        informe = self._importar("alumnos", (
+            "nombre;apellido;dni;email;carrera;fecha_nacimiento\n"
+            "Ana;Uno;40000001;ana@example.com;sistemas;2001-02-03\n"
+            "Beto;Dos;40000000;beto@example.com;;\n"  # DNI ya en la base
+            "Caro;Tres;40000003;ANA@example.com;;\n"  # email repetido en el archivo
+            "Dani;;40000004;no-es-email;Medicina;\n"
+            "\n"
+            "Eva;Cinco;40000005;eva@example.com;{};\n"
+            "Fede;Seis;40000006;fede@example.com;;\n".format(self.carrera.id)
+        ), lote=2)
+        self.assertEqual((informe["filas"], informe["creadas"], informe["con_errores"]), (6, 3, 3))
+        self.assertEqual([e["fila"] for e in informe["errores"]], [3, 4, 5])
+        self.assertIn("Falta apellido", informe["errores"][2]["errores"])
+        self.assertEqual(len(informe["errores"][2]["errores"]), 3)
+        ana = Alumno.objects.get(dni="40000001")
+        self.assertEqual((ana.carrera_principal, str(ana.fecha_nacimiento)), (self.carrera, "2001-02-03"))
+        self.assertEqual(Alumno.objects.get(dni="40000005").carrera_principal, self.carrera)
+        self.assertEqual(obtener().alumnos, reconstruir().alumnos)
+
+    def test_alta_concurrente_se_reporta_por_fila(self):
+        filas = importacion.leer_filas(io.BytesIO(
+            b"nombre,apellido,dni,email\nAna,Uno,40000001,ana@example.com\nBeto,Dos,40000002,beto@example.com\n"
+        ), "alumnos.csv")
+
+        def con_alta_concurrente():
+            for numero, fila in filas:
+                if numero == 3:
+                    # Otro proceso da de alta el mismo DNI después de la precarga
+                    Alumno.objects.create(nombre="B", apellido="Otro", dni="40000002", email="otro@example.com")
+                yield numero, fila
+
+        with self.captureOnCommitCallbacks(execute=True):
+            informe = importacion.importar("alumnos", con_alta_concurrente())
+        self.assertEqual((informe["creadas"], informe["con_errores"]), (1, 1))
+        self.assertEqual(informe["errores"][0]["fila"], 3)
+        self.assertTrue(Alumno.objects.filter(dni="40000001").exists())
+        self.assertEqual(obtener().alumnos, reconstruir().alumnos)
+
+    def test_lotes_confirmados_sobreviven_a_un_corte(self):
+        def filas_con_corte():
+            for i in range(5):
+                yield i + 2, {"nombre": f"Carrera {i}", "duracion_anios": "3"}
+            raise ValueError("El CSV debe estar codificado en UTF-8")
+
+        with self.captureOnCommitCallbacks(execute=True), \
+                self.assertRaisesMessage(ValueError, "ya se importaron 4 filas"):
+            importacion.importar("carreras", filas_con_corte(), lote=2)
+        # Los dos lotes completos quedaron; el quinto registro (lote incompleto) no
+        self.assertEqual(Carrera.objects.filter(nombre__startswith="Carrera ").count(), 4)
+        self.assertEqual(obtener().carreras, reconstruir().carreras)
+
+    def test_endpoint_materias_y_simulacion(self):
+        self.client.force_login(self.admin)
+        version = obtener().catalogo_version
+        contenido = b"nombre,carrera,cupo,horario\nAlgebra,Sistemas,40,Lun 8-10\nFisica,Sistemas,,\nAlgebra,Sistemas,,\n"
+        url = "/api/admin/importar/materias/"
+
+        response = self.client.post(url, {"archivo": SimpleUploadedFile("plan.csv", contenido), "simular": "1"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()["creadas"], response.json()["con_errores"]), (0, 1))
+        self.assertFalse(Materia.objects.exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {"archivo": SimpleUploadedFile("plan.csv", contenido)})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["creadas"], 2)
+        self.assertEqual(Materia.objects.get(nombre="Fisica").cupo, 30)
+        self.assertEqual(EstadisticasMateria.objects.count(), 2)
+        self.assertEqual(obtener().materias, 2)
+        self.assertGreater(obtener().catalogo_version, version)
+
+        response = self.client.post(url, {"archivo": SimpleUploadedFile("plan.txt", contenido)})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.post("/api/admin/importar/notas/", {}).status_code, 404)
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class AprobacionLoteTests(TestCase):
+    """Aprobación por lotes: mismo resultado que aprobar de a uno, con errores por registro y contadores al día"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username="admin", password="admin1234")
+        cls.responsable = Personal.objects.create(
+            user=cls.admin, nombre="Ad", apellido="Min", dni="20000000", email="admin@example.com", cargo="ADMIN"
+        )
+        cls.carrera = Carrera.objects.create(nombre="Sistemas", duracion_anios=3)
+        con_user = User.objects.create_user(username="40000001", password="clave1234", is_active=False)
+        cls.registros = {
+            "con_user": cls._registro("40000001", user=con_user),
+            "sin_user": cls._registro("40000002"),
+            "docente": cls._registro("30000001", rol_solicitado="PERSONAL", cargo_solicitado="DOCENTE"),
+            "importado": cls._registro("40000003"),
+            "dni_usado": cls._registro("40000004"),
+            "email_usado": cls._registro("40000005", email="usado@example.com"),
+        }
+        # Alumno importado sin usuario (se vincula) y otro con usuario (choque de DNI)
+        Alumno.objects.create(nombre="Imp", apellido="Ortado", dni="40000003", email="importado@example.com")
+        Alumno.objects.create(
+            user=User.objects.create_user(username="otro"), nombre="Otro", apellido="Alumno",
+            dni="40000004", email="otro@example.com",
+        )
+        Alumno.objects.create(nombre="Con", apellido="Email", dni="49999999", email="usado@example.com")
+        reconstruir()
+
+    @classmethod
+    def _registro(cls, dni, **kwargs):
+        datos = {
+            "nombre": "N", "apellido": dni, "dni": dni, "email": f"{dni}@example.com",
+            "rol_solicitado": "ALUMNO", "carrera_solicitada": cls.carrera,
+        }
+        datos.update(kwargs)
+        return RegistroUsuario.objects.create(**datos)
+
+    def _contadores(self, estadisticas):
+        return (estadisticas.alumnos, estadisticas.registros_pendientes)
+
+    def test_aprobar_por_lotes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            informe = aprobacion.aprobar_registros(RegistroUsuario.objects.all(), self.admin, lote=2)
+        self.assertEqual((informe["aprobados"], informe["alumnos_creados"], informe["personal_creado"]), (4, 2, 1))
+        self.assertEqual(
+            sorted(e["dni"] for e in informe["errores"]), ["40000004", "40000005"]
+        )
+        estados = dict(RegistroUsuario.objects.values_list("dni", "estado"))
+        self.assertEqual(estados["40000004"], "PENDIENTE")
+        self.assertEqual(estados["40000001"], "APROBADO")
+
+        nuevo = User.objects.get(username="40000002")
+        self.assertTrue(nuevo.is_active and nuevo.check_password("40000002"))
+        self.assertTrue(User.objects.get(username="40000001").check_password("clave1234"))
+        self.assertTrue(User.objects.get(username="30000001").is_staff)
+        self.assertEqual(Personal.objects.get(dni="30000001").cargo, "DOCENTE")
+        importado = Alumno.objects.get(dni="40000003")
+        self.assertEqual(importado.user, RegistroUsuario.objects.get(dni="40000003").user)
+        self.assertEqual(importado.email, "importado@example.com")
+        self.assertEqual(
+            set(InscripcionCarrera.objects.values_list("alumno__dni", "responsable")),
+            {(dni, self.responsable.pk) for dni in ("40000001", "40000002", "40000003")},
+        )
+        self.assertEqual(self._contadores(obtener()), self._contadores(reconstruir()))
+
+        # Repetir no hace nada: los aprobados se ignoran y los que tienen errores siguen fallando
+        informe = aprobacion.aprobar_registros(RegistroUsuario.objects.all(), self.admin)
+        self.assertEqual((informe["aprobados"], len(informe["errores"])), (0, 2))
+
+    def test_endpoint_y_rechazo(self):
+        self.client.force_login(self.admin)
+        url = "/api/admin/usuarios/pendientes/aprobar/"
+        self.assertEqual(self.client.post(url, {}, content_type="application/json").status_code, 400)
+        ids = [self.registros["sin_user"].pk, self.registros["docente"].pk]
+        # Más registros sin usuario (hashes) que los que admite un request: se deriva al comando
+        with mock.patch("api.views.APROBACION_SIN_USUARIO_MAX", 1):
+            response = self.client.post(url, {"ids": ids}, content_type="application/json")
+        self.assertEqual((response.status_code, response.json()["sin_usuario"]), (400, 2))
+        self.assertIn("aprobar_registros", response.json()["detail"])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {"ids": ids}, content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["aprobados"], 2)
+        response = self.client.post(url, {"todos": True, "rol": "PERSONAL"}, content_type="application/json")
+        self.assertEqual(response.json()["aprobados"], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            rechazados = aprobacion.rechazar_registros(RegistroUsuario.objects.all(), self.admin)
+        self.assertEqual(rechazados, 4)
+        self.assertFalse(User.objects.get(username="40000001").is_active)
+        self.assertEqual(self._contadores(obtener()), self._contadores(reconstruir()))
+
+    def test_hash_en_pool_de_procesos(self):
+        passwords = [str(40000000 + i) for i in range(20)]
+        pool = pool_hasheo(2)
+        try:
+            hashes = hashear_passwords(passwords, pool)
+        finally:
+            pool.shutdown()
+        user = User()
+        for password, hash_ in zip(passwords, hashes):
+            user.password = hash_
+            self.assertTrue(user.check_password(password))
+        self.assertIsNone(pool_hasheo(1))
@@ -13,23 +13,28 @@ urlpatterns = [
     # Catálogo
     path('carreras/', views.CarrerasListView.as_view(), name='carreras_list'),
     path('carreras/<int:carrera_id>/materias/', views.MateriasByCarreraView.as_view(), name='materias_by_carrera'),
+    path('carreras/<int:carrera_id>/materias/cupos/', views.MateriasCuposView.as_view(), name='materias_cupos'),
     
     # Alumno
     path('alumnos/me/', views.AlumnoMeView.as_view(), name='alumno_me'),
     path('alumnos/me/notas/', views.AlumnoMisNotasView.as_view(), name='alumno_mis_notas'),
+    path('alumnos/me/resumen/', views.AlumnoResumenAcademicoView.as_view(), name='alumno_resumen_academico'),
     path('alumnos/me/materias/', views.AlumnoMisMateriasView.as_view(), name='alumno_mis_materias'),
     path("alumnos/inscribir", views.AlumnoInscribirMateriaView.as_view(), name="inscribir_materia"),
+    path("alumnos/inscribir/multiple", views.AlumnoInscribirMateriasView.as_view(), name="inscribir_materias"),
+    path("alumnos/inscribir/solicitudes/<int:solicitud_id>", views.AlumnoSolicitudInscripcionView.as_view(), name="solicitud_inscripcion"),
     path("alumnos/dar-baja/<int:materia_id>", views.AlumnoDesinscribirMateriaView.as_view(), name="dar_baja_materia"),
 
     # Admin
     path('admin/stats/', views.AdminStatsView.as_view(), name='admin_stats'),
     
     path('admin/alumnos/', views.AdminAlumnos.as_view(), name='admin_alumnos'),
-    path("admin/alumnos/<int:alumno_id>", views.AdminAlumnosDetailView.as_view(), name=""),
+    path("admin/alumnos/<int:alumno_id>", views.AdminAlumnosDetailView.as_view(), name="admin_alumnos_detail"),
     
     path('admin/inscripciones/', views.AdminInscripciones.as_view(), name='admin_inscripciones'),
     
     path('admin/usuarios/pendientes/', views.AdminUsuariosPendientesView.as_view(), name='admin_usuarios_pendientes'),
+    path('admin/usuarios/pendientes/aprobar/', views.AdminUsuariosAprobarLoteView.as_view(), name='admin_usuarios_aprobar_lote'),
     path('admin/usuarios/pendientes/<int:user_id>/aprobar/', views.AdminUsuariosAprobarView.as_view(), name='admin_usuarios_aprobar'),
     path('admin/usuarios/pendientes/<int:user_id>/rechazar/', views.AdminUsuariosRechazarView.as_view(), name='admin_usuarios_rechazar'),
     
@@ -38,17 +43,22 @@ urlpatterns = [
 
     path('admin/materias/', views.AdminMaterias.as_view(), name='admin_materias'),
     path("admin/materias/count/", views.AdminMateriasWithCountView.as_view(), name="admin_materias_count"),
+    path("admin/materias/estadisticas/", views.AdminMateriasEstadisticasView.as_view(), name="admin_materias_estadisticas"),
+    path("admin/analitica/notas/", views.AdminAnaliticaNotasView.as_view(), name="admin_analitica_notas"),
+    path("admin/importar/<str:tipo>/", views.AdminImportarView.as_view(), name="admin_importar"),
     path("admin/materia", views.AdminCreateMateria.as_view(), name="materia_create"),
     path("admin/materia/<int:materia_id>", views.AdminMateriaDetailView.as_view(), name="admin_materia_detail"),
     path("admin/docentes", views.AdminDocentes.as_view(), name="admin_docentes"),
 
     path('admin/alumnos-notas/', views.PreceptorAlumnosNotasView.as_view(), name='admin_alumnos_notas'),
+    path('admin/alumnos-notas/export/', views.PreceptorAlumnosNotasExportView.as_view(), name='admin_alumnos_notas_export'),
 
     # Docente
     path('docente/materias/', views.DocenteMateriasView.as_view(), name='docente_materias'),
     path('docente/materias/<int:materia_id>/alumnos/', views.DocenteAlumnosPorMateriaView.as_view(), name='docente_alumnos_por_materia'),
     path("docente/materia/<int:materia_id>", views.DocenteByMateria.as_view(), name="docente_by_materia"),
     path('docente/notas/', views.DocenteNotaUpsertView.as_view(), name='docente_nota_upsert'),
+    path('docente/notas/bulk/', views.DocenteNotaBulkUpsertView.as_view(), name='docente_nota_bulk_upsert'),
     path('docente/materias/create/', views.DocenteMateriaCreateView.as_view(), name='docente_materia_create'),
     path('docente/materias/<int:materia_id>/', views.DocenteMateriaUpdateDeleteView.as_view(), name='docente_materia_update_delete'),
 ]
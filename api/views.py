@@ -2,44 +2,121 @@ from django.contrib.auth import authenticate, login, logout, update_session_auth
 from django.middleware.csrf import get_token
 from django.views.decorators.csrf import ensure_csrf_cookie, csrf_exempt
 from django.utils.decorators import method_decorator
+from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.parsers import JSONParser
+from rest_framework.parsers import JSONParser, MultiPartParser
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 from typing import Any, Mapping, cast
-from django.core.exceptions import ObjectDoesNotExist
-from datetime import datetime
+from django.core.exceptions import ImproperlyConfigured, ObjectDoesNotExist
+import csv
+import json
 
 from carreras.models import Carrera
 from materias.models import Materia
-from alumnos.models import Alumno, InscripcionAlumno
-from notas.models import Nota
+from alumnos.models import Alumno, InscripcionAlumno, SolicitudInscripcion
+from alumnos import asignacion
+from notas.models import Nota, NOTA_APROBACION
+from notas.analitico import resumen_academico
 from personal.models import Personal, AsignacionDocente
 from inscripciones.models import InscripcionCarrera
 from usuarios.models import RegistroUsuario
+from estadisticas import analitica
+from estadisticas import utils as estadisticas_utils
+from usuarios.perfiles import obtener_perfiles
+from usuarios import aprobacion
 
 from django.contrib.auth.models import User
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 
 from .serializers import (
     CarreraSerializer,
     MateriaSerializer,
+    MateriaCatalogoSerializer,
     MateriaWithCountSerializer,
+    MateriaEstadisticasSerializer,
     MateriaWithDocenteSerializer,
     AlumnoSerializer,
     NotaSerializer,
     NotaLiteSerializer,
     NotaUpsertSerializer,
+    NotaBulkItemSerializer,
+    NotaBulkUpsertSerializer,
     PersonalSerializer,
     InscripcionCarreraSerializer,
     UsuariosPendientesSerializer,
     InscripcionAlumnoSerializer,
+    InscripcionMultipleSerializer,
+    SolicitudInscripcionSerializer,
+    AprobacionLoteSerializer,
+    APROBACION_LOTE_MAX,
+    APROBACION_SIN_USUARIO_MAX,
 )
 from .permissions import IsAlumno, IsAdminOrPreceptor, IsDocente
-from django.db.models import Count
+from .pagination import KeysetPagination
+from . import importacion
+from django.db.models import Count, Q
+from django.db.models.functions import Coalesce
 from django.db import transaction
+from rest_framework.exceptions import ValidationError as DRFValidationError
+
+
+def _param_int(request, nombre: str) -> int | None:
+    # Lee un filtro numérico del query string; None si no vino
+    raw = request.query_params.get(nombre)
+    if raw in (None, ""):
+        return None
+    try:
+        return int(raw)
+    except (TypeError, ValueError):
+        raise DRFValidationError({nombre: ["Debe ser un número entero"]})
+
+
+def _param_orden(request, ordenes: Mapping[str, list[str]]) -> list[str]:
+    # El primer orden declarado es el default (coincide con Meta.ordering del modelo)
+    orden = request.query_params.get("orden")
+    if not orden:
+        return next(iter(ordenes.values()))
+    if orden not in ordenes:
+        raise DRFValidationError({"orden": [f"Valores posibles: {', '.join(ordenes)}"]})
+    return ordenes[orden]
+
+
+def _listado(request, queryset, ordering: list[str], serializar) -> Response:
+    # Sin limit/cursor se responde la lista completa como antes; con ellos, por páginas keyset
+    paginacion = KeysetPagination(ordering)
+    if not paginacion.is_requested(request):
+        return Response(serializar(queryset.order_by(*ordering)))
+    filas, next_cursor = paginacion.paginate_queryset(queryset, request)
+    return paginacion.get_paginated_response(serializar(filas), next_cursor)
+
+
+def _filtrar_notas(request, qs):
+    # Filtros de carrera/materia/alumno y estado aprobado/desaprobado resueltos en SQL
+    carrera_id = _param_int(request, "carrera")
+    if carrera_id is not None:
+        qs = qs.filter(materia__carrera_id=carrera_id)
+    materia_id = _param_int(request, "materia")
+    if materia_id is not None:
+        qs = qs.filter(materia_id=materia_id)
+    alumno_id = _param_int(request, "alumno")
+    if alumno_id is not None:
+        qs = qs.filter(alumno_id=alumno_id)
+    estado = request.query_params.get("estado")
+    if estado == "aprobado":
+        qs = qs.filter(nota__gte=NOTA_APROBACION)
+    elif estado == "desaprobado":
+        qs = qs.filter(nota__lt=NOTA_APROBACION)
+    elif estado:
+        raise DRFValidationError({"estado": ["Valores posibles: aprobado, desaprobado"]})
+    return qs
 
 
 @method_decorator(ensure_csrf_cookie, name='dispatch')
@@ -78,52 +155,15 @@ class LoginView(APIView):
         # 2. Contraseña incorrecta
         # 3. Usuario inactivo (is_active=False)
         if user is None:
-            # Verificar si el usuario existe pero está inactivo
-            from django.contrib.auth.models import User
-            user_check = None
-            try:
-                # Intentar buscar por username directo
-                user_check = User.objects.get(username=username)  # type: ignore[attr-defined]
-            except ObjectDoesNotExist:
-                # Intentar buscar por DNI a través de Alumno/Personal
-                try:
-                    from alumnos.models import Alumno
-                    alumno = Alumno.objects.get(dni=username)  # type: ignore[attr-defined]
-                    user_check = alumno.user
-                except:
-                    try:
-                        from personal.models import Personal
-                        personal = Personal.objects.get(dni=username)  # type: ignore[attr-defined]
-                        user_check = personal.user
-                    except:
-                        pass
-            
-            if user_check and user_check.check_password(password):
-                # Verificar si el usuario está inactivo
-                if not user_check.is_active:
-                    # La contraseña es correcta pero el usuario está inactivo
-                    return Response({
-                        "detail": "Tu cuenta está pendiente de aprobación. Un administrador debe aprobar tu registro antes de poder iniciar sesión."
-                    }, status=status.HTTP_400_BAD_REQUEST)
-                # Si el usuario está activo y la contraseña es correcta, pero authenticate() falló,
-                # intentar hacer login manualmente (puede ser un problema con el backend)
-                if user_check.is_active:
-                    login(request, user_check)
-                    # Responder con datos mínimos del perfil
-                    rol = None
-                    if user_check.is_superuser or user_check.is_staff:
-                        rol = "ADMIN"
-                    elif hasattr(user_check, "alumno"):
-                        rol = "ALUMNO"
-                    elif hasattr(user_check, "personal"):
-                        cargo = getattr(user_check.personal, "cargo", None)  # type: ignore[attr-defined]
-                        rol = f"PERSONAL:{cargo}" if cargo else "PERSONAL"
-                    else:
-                        rol = "INVITADO"
-
-                    must_change = user_check.check_password(user_check.username)
-                    return Response({"ok": True, "rol": rol, "must_change_password": must_change})
-            
+            # DNIBackend deja en el request el usuario que resolvió y si la contraseña coincidió,
+            # así no se repite la búsqueda por DNI ni el hash de la contraseña
+            user_check, password_ok = getattr(request, "_login_identidad", (None, False))
+            if user_check is not None and password_ok and not user_check.is_active:
+                # La contraseña es correcta pero el usuario está inactivo
+                return Response({
+                    "detail": "Tu cuenta está pendiente de aprobación. Un administrador debe aprobar tu registro antes de poder iniciar sesión."
+                }, status=status.HTTP_400_BAD_REQUEST)
+
             # Si llegamos aquí, las credenciales son inválidas
             return Response({"detail": "Credenciales inválidas"}, status=status.HTTP_401_UNAUTHORIZED)
         
@@ -186,12 +226,13 @@ class MeView(APIView):
             "is_staff": user.is_staff,
             "is_superuser": user.is_superuser,
         }
-        if hasattr(user, "alumno") and user.alumno:
+        alumno, personal = obtener_perfiles(user)
+        if alumno is not None:
             data["rol"] = "ALUMNO"
-            data["perfil"] = AlumnoSerializer(user.alumno).data
-        elif hasattr(user, "personal") and user.personal:
-            data["rol"] = f"PERSONAL:{user.personal.cargo}"
-            data["perfil"] = PersonalSerializer(user.personal).data
+            data["perfil"] = AlumnoSerializer(alumno).data
+        elif personal is not None:
+            data["rol"] = f"PERSONAL:{personal.cargo}"
+            data["perfil"] = PersonalSerializer(personal).data
         else:
             data["rol"] = None
         return Response(data)
@@ -254,6 +295,21 @@ class RegistroUsuarioView(APIView):
 
 
 # Catálogo
+# GET condicional: responde 304 si el cliente ya tiene la versión actual del catálogo.
+# no-cache obliga al navegador a revalidar siempre en lugar de usar una copia vencida.
+catalogo_condicional = method_decorator(
+    [
+        cache_control(no_cache=True),
+        condition(
+            etag_func=estadisticas_utils.etag_catalogo,
+            last_modified_func=estadisticas_utils.ultima_modificacion_catalogo,
+        ),
+    ],
+    name="get",
+)
+
+
+@catalogo_condicional
 class CarrerasListView(APIView):
     permission_classes = [permissions.AllowAny]
 
@@ -302,12 +358,23 @@ class CarreraCreateView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
 
+@catalogo_condicional
 class MateriasByCarreraView(APIView):
     permission_classes = [permissions.AllowAny]
 
     def get(self, request, carrera_id: int):
-        materias = Materia.objects.filter(carrera_id=carrera_id)  # type: ignore[attr-defined]
-        return Response(MateriaSerializer(materias, many=True).data)
+        materias = Materia.objects.filter(carrera_id=carrera_id).select_related("carrera")  # type: ignore[attr-defined]
+        return Response(MateriaCatalogoSerializer(materias, many=True).data)
+
+
+# El cupo cambia con cada inscripción: va sin ETag para no invalidar el catálogo
+@method_decorator(cache_control(no_cache=True), name="get")
+class MateriasCuposView(APIView):
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, carrera_id: int):
+        cupos = Materia.objects.filter(carrera_id=carrera_id).order_by().values_list("id", "cupo")  # type: ignore[attr-defined]
+        return Response({str(materia_id): cupo for materia_id, cupo in cupos})
 
 
 # Alumno (solo su propia info)
@@ -322,9 +389,20 @@ class AlumnoMisNotasView(APIView):
     permission_classes = [IsAlumno]
 
     def get(self, request):
-        notas = Nota.objects.filter(alumno=request.user.alumno).select_related("materia", "profesor")  # type: ignore[attr-defined]
+        notas = Nota.objects.filter(alumno=request.user.alumno).select_related("materia__carrera", "profesor")  # type: ignore[attr-defined]
         return Response(NotaSerializer(notas, many=True).data)
 
+
+class AlumnoResumenAcademicoView(APIView):
+    permission_classes = [IsAlumno]
+
+    def get(self, request):
+        # Total, aprobadas, desaprobadas y promedio (en total y por carrera) con una consulta agrupada
+        resumen = resumen_academico(request.user.alumno)
+        for fila in [resumen, *resumen["por_carrera"]]:
+            fila["promedio"] = str(fila["promedio"]) if fila["promedio"] is not None else None
+        return Response(resumen)
+
 class AlumnoInscribirMateriaView(APIView):
     permission_classes = [IsAlumno]
 
@@ -333,28 +411,28 @@ class AlumnoInscribirMateriaView(APIView):
         if not materia_id:
             return Response({"detail": "materia_id es requerido"}, status=status.HTTP_400_BAD_REQUEST)
 
+        if getattr(settings, "INSCRIPCIONES_EN_COLA", False):
+            # Modo cola: sin locks en el request, se devuelve un ticket para consultar el resultado
+            if not Materia.objects.filter(id=materia_id).exists():  # type: ignore[attr-defined]
+                return Response({"detail": "Materia no encontrada"}, status=status.HTTP_404_NOT_FOUND)
+            solicitud, _ = asignacion.encolar(request.user.alumno, materia_id)
+            data = dict(SolicitudInscripcionSerializer(solicitud).data)
+            data["posicion"] = asignacion.posicion_en_cola(solicitud)
+            return Response(data, status=status.HTTP_202_ACCEPTED)
 
         try:
-            with transaction.atomic():
-                # Lockear la fila de materia para evitar race conditions en cupo
-                materia = Materia.objects.select_for_update().get(id=materia_id)  # type: ignore[attr-defined]
-                if materia.cupo <= 0:
-                    return Response({"detail": "No hay cupo disponible en esta materia"}, status=status.HTTP_400_BAD_REQUEST)
-
-                alumno = request.user.alumno
-                # Verificar si ya está inscrito activamente
-                if InscripcionAlumno.objects.filter(alumno=alumno, materia=materia, activa=True).exists():
-                    return Response({"detail": "Ya estás inscrito en esta materia"}, status=status.HTTP_400_BAD_REQUEST)
-
-                inscripcion = InscripcionAlumno.objects.create(
-                    fecha_inscripcion=datetime.now(),
-                    activa=True,
-                    alumno=alumno,
-                    materia=materia,
-                )
-                materia.cupo = (materia.cupo or 0) - 1
-                materia.save()
-
+            # Descuento atómico del cupo (UPDATE ... WHERE cupo > 0), sin lockear la materia
+            inscripcion = asignacion.inscribir(request.user.alumno, materia_id)
+        except asignacion.SinCupo as e:
+            if not getattr(settings, "INSCRIPCIONES_LISTA_ESPERA", False):
+                return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            # Lista de espera: el alumno recibe el próximo cupo que se libere, sin reintentar
+            solicitud, _ = asignacion.anotar_en_espera(request.user.alumno, materia_id)
+            data = dict(SolicitudInscripcionSerializer(solicitud).data)
+            data["posicion"] = asignacion.posicion_en_cola(solicitud)
+            return Response(data, status=status.HTTP_202_ACCEPTED)
+        except asignacion.InscripcionRechazada as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Materia.DoesNotExist:
             return Response({"detail": "Materia no encontrada"}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
@@ -362,6 +440,39 @@ class AlumnoInscribirMateriaView(APIView):
 
         return Response(InscripcionAlumnoSerializer(inscripcion, many=False).data, status=status.HTTP_201_CREATED)
 
+class AlumnoInscribirMateriasView(APIView):
+    permission_classes = [IsAlumno]
+
+    def post(self, request):
+        serializer = InscripcionMultipleSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        materia_ids = serializer.validated_data["materias"]
+        modo = serializer.validated_data["modo"]
+        alumno = request.user.alumno
+
+        if getattr(settings, "INSCRIPCIONES_EN_COLA", False):
+            # Modo cola: un ticket por materia, la asignación la hace procesar_inscripciones
+            existentes = set(Materia.objects.filter(id__in=materia_ids).values_list("id", flat=True))  # type: ignore[attr-defined]
+            resultados = []
+            for materia_id in dict.fromkeys(materia_ids):
+                if materia_id not in existentes:
+                    resultados.append({"materia": materia_id, "estado": "no_encontrada", "detalle": "Materia no encontrada"})
+                    continue
+                solicitud, _ = asignacion.encolar(alumno, materia_id)
+                data = dict(SolicitudInscripcionSerializer(solicitud).data)
+                data["posicion"] = asignacion.posicion_en_cola(solicitud)
+                resultados.append({"materia": materia_id, "estado": "encolada", "solicitud": data})
+            return Response({"modo": "cola", "resultados": resultados}, status=status.HTTP_202_ACCEPTED)
+
+        resultados = asignacion.inscribir_varias(alumno, materia_ids, todo_o_nada=(modo == "todo_o_nada"))
+        inscriptas = sum(1 for r in resultados if r["estado"] == "inscripta")
+        if modo == "todo_o_nada" and inscriptas < len(resultados):
+            codigo = status.HTTP_400_BAD_REQUEST
+        else:
+            codigo = status.HTTP_201_CREATED if inscriptas else status.HTTP_200_OK
+        return Response({"modo": modo, "inscriptas": inscriptas, "resultados": resultados}, status=codigo)
+
+
 class AlumnoDesinscribirMateriaView(APIView):
     permission_classes = [IsAlumno]
 
@@ -370,21 +481,37 @@ class AlumnoDesinscribirMateriaView(APIView):
             return Response({"detail": "materia_id es requerido"}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            with transaction.atomic():
-                materia = Materia.objects.select_for_update().get(id=materia_id)  # type: ignore[attr-defined]
-                alumno = request.user.alumno    
-                inscripcion = InscripcionAlumno.objects.get(alumno=alumno, materia_id=materia_id, activa=True)
-                # Marcar como inactiva en vez de borrar (historial)
-                inscripcion.delete()
-                materia.cupo = (materia.cupo or 0) + 1
-                materia.save()
-        except Materia.DoesNotExist:
-            return Response({"detail": "Materia no encontrada"}, status=status.HTTP_404_NOT_FOUND)
+            asignacion.dar_de_baja(request.user.alumno, materia_id)
         except InscripcionAlumno.DoesNotExist:
             return Response({"detail": "Inscripción no encontrada"}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             return Response({"detail": f"Error al desinscribir: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         return Response({"ok": True, "mensaje": "Desinscripción exitosa"})
+
+
+class AlumnoSolicitudInscripcionView(APIView):
+    permission_classes = [IsAlumno]
+
+    def get(self, request, solicitud_id: int):
+        # Consulta del ticket devuelto por alumnos/inscribir (modo cola o lista de espera)
+        try:
+            solicitud = SolicitudInscripcion.objects.get(id=solicitud_id, alumno=request.user.alumno)  # type: ignore[attr-defined]
+        except SolicitudInscripcion.DoesNotExist:
+            return Response({"detail": "Solicitud no encontrada"}, status=status.HTTP_404_NOT_FOUND)
+        data = dict(SolicitudInscripcionSerializer(solicitud).data)
+        data["posicion"] = asignacion.posicion_en_cola(solicitud)
+        return Response(data)
+
+    def delete(self, request, solicitud_id: int):
+        # El alumno sale de la cola o de la lista de espera
+        cancelada = SolicitudInscripcion.objects.filter(  # type: ignore[attr-defined]
+            id=solicitud_id, alumno=request.user.alumno, estado__in=["PENDIENTE", "EN_ESPERA"]
+        ).update(estado="RECHAZADA", motivo="Cancelada por el alumno", procesado_en=timezone.now())
+        if not cancelada:
+            return Response({"detail": "Solicitud no encontrada o ya procesada"}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"ok": True, "mensaje": "Solicitud cancelada"})
+
+
 class AlumnoMisMateriasView(APIView):
     permission_classes = [IsAlumno]
 
@@ -406,11 +533,16 @@ class AdminStatsView(APIView):
     permission_classes = [IsAdminOrPreceptor]
 
     def get(self, request):
+        # Una sola fila de contadores mantenida por estadisticas.signals (sin COUNT(*) por request)
+        estadisticas = estadisticas_utils.obtener()
         return Response({
-            "alumnos": Alumno.objects.count(),  # type: ignore[attr-defined]
-            "carreras": Carrera.objects.count(),  # type: ignore[attr-defined]
-            "materias": Materia.objects.count(),  # type: ignore[attr-defined]
-            "notas": Nota.objects.count(),  # type: ignore[attr-defined]
+            "alumnos": estadisticas.alumnos,
+            "carreras": estadisticas.carreras,
+            "materias": estadisticas.materias,
+            "notas": estadisticas.notas,
+            "notas_aprobadas": estadisticas.notas_aprobadas,
+            "registros_pendientes": estadisticas.registros_pendientes,
+            "inscripciones_activas": estadisticas.inscripciones_activas,
         })
 
 
@@ -428,7 +560,7 @@ class DocenteMateriasView(APIView):
 
     def get(self, request):
         docente = request.user.personal
-        materias = Materia.objects.filter(docentes__docente=docente).distinct()  # type: ignore[attr-defined]
+        materias = Materia.objects.filter(docentes__docente=docente).select_related("carrera").distinct()  # type: ignore[attr-defined]
         return Response(MateriaSerializer(materias, many=True).data)
 
 
@@ -444,11 +576,33 @@ class DocenteAlumnosPorMateriaView(APIView):
         inscripciones = InscripcionAlumno.objects.filter(
             materia_id=materia_id,
             activa=True
-        ).select_related("alumno")
+        ).select_related("alumno", "alumno__carrera_principal")
+
+        # Una sola consulta para todas las notas de la materia, indexadas por alumno
+        notas = {
+            n.alumno_id: n
+            for n in Nota.objects.filter(materia_id=materia_id).order_by()  # type: ignore[attr-defined]
+        }
 
-        data=[]
+        if request.query_params.get("formato") == "compacto":
+            # Sólo las columnas que usa la grilla de calificación
+            data = []
+            for ins in inscripciones:
+                nota = notas.get(ins.alumno_id)
+                data.append({
+                    "alumno_id": ins.alumno_id,
+                    "dni": ins.alumno.dni,
+                    "apellido": ins.alumno.apellido,
+                    "nombre": ins.alumno.nombre,
+                    "nota_id": nota.id if nota else None,
+                    "nota": str(nota.nota) if nota else None,
+                    "observaciones": nota.observaciones if nota else "",
+                })
+            return Response(data)
+
+        data = []
         for ins in inscripciones:
-            nota = Nota.objects.filter(alumno=ins.alumno, materia_id=materia_id).first()  # type: ignore[attr-defined]
+            nota = notas.get(ins.alumno_id)
             data.append({
                 "alumno": AlumnoSerializer(ins.alumno).data,
                 "nota": NotaLiteSerializer(nota).data if nota else None,
@@ -510,6 +664,107 @@ class DocenteNotaUpsertView(APIView):
         return Response(NotaSerializer(nota_obj).data)
 
 
+class DocenteNotaBulkUpsertView(APIView):
+    permission_classes = [IsDocente]
+
+    def post(self, request):
+        # Carga masiva de notas de una materia: una sola verificación de asignación,
+        # validación en memoria y escritura con un único INSERT ... ON CONFLICT
+        docente = request.user.personal
+        serializer = NotaBulkUpsertSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        vd: dict[str, Any] = cast(dict[str, Any], serializer.validated_data)
+        materia_id = vd["materia"]
+
+        if not AsignacionDocente.objects.filter(docente=docente, materia_id=materia_id).exists():  # type: ignore[attr-defined]
+            return Response({"detail": "No asignado a la materia"}, status=status.HTTP_403_FORBIDDEN)
+
+        resultados: list[dict[str, Any]] = []
+        validas: dict[int, dict[str, Any]] = {}
+        for fila in vd["notas"]:
+            item = NotaBulkItemSerializer(data=fila)
+            if not item.is_valid():
+                resultados.append({"alumno": fila.get("alumno"), "estado": "error", "errores": item.errors})
+                continue
+            datos: dict[str, Any] = cast(dict[str, Any], item.validated_data)
+            if datos["alumno"] in validas:
+                resultados.append({"alumno": datos["alumno"], "estado": "error", "errores": {"alumno": ["Alumno repetido en la carga"]}})
+                continue
+            validas[datos["alumno"]] = datos
+            resultados.append({"alumno": datos["alumno"], "estado": None})
+
+        try:
+            # Inscripciones y notas actuales se leen dentro de la transacción: con IMMEDIATE el
+            # lock de escritura se toma en el BEGIN y otra carga no puede colarse entre la
+            # lectura y el upsert (los estados y los deltas quedarían mal)
+            with transaction.atomic():
+                # Sólo se califica a alumnos con inscripción activa en la materia (una consulta para todas las filas)
+                inscriptos = set(
+                    InscripcionAlumno.objects.filter(  # type: ignore[attr-defined]
+                        materia_id=materia_id, alumno_id__in=validas.keys(), activa=True
+                    ).values_list("alumno_id", flat=True)
+                )
+                # alumno_id -> nota actual, para informar creada/actualizada y ajustar las estadísticas
+                con_nota = dict(
+                    Nota.objects.filter(materia_id=materia_id, alumno_id__in=inscriptos)  # type: ignore[attr-defined]
+                    .order_by()
+                    .values_list("alumno_id", "nota")
+                )
+
+                notas_obj = []
+                for res in resultados:
+                    if res["estado"] is not None:
+                        continue
+                    alumno_id = res["alumno"]
+                    if alumno_id not in inscriptos:
+                        res["estado"] = "error"
+                        res["errores"] = {"alumno": ["El alumno no está inscripto en la materia"]}
+                        continue
+                    datos = validas[alumno_id]
+                    res["estado"] = "actualizada" if alumno_id in con_nota else "creada"
+                    res["nota"] = str(datos["nota"])
+                    notas_obj.append(Nota(
+                        alumno_id=alumno_id,
+                        materia_id=materia_id,
+                        profesor=docente,
+                        nota=datos["nota"],
+                        observaciones=datos["observaciones"],
+                    ))
+
+                if notas_obj:
+                    # bulk_create no pasa por Nota.save(): rango y asignación ya se validaron arriba
+                    Nota.objects.bulk_create(  # type: ignore[attr-defined]
+                        notas_obj,
+                        update_conflicts=True,
+                        unique_fields=["alumno", "materia"],
+                        update_fields=["profesor", "nota", "observaciones", "fecha_modificacion"],
+                    )
+                    estadisticas_utils.aplicar_deltas(
+                        notas=sum(1 for n in notas_obj if n.alumno_id not in con_nota),
+                        notas_aprobadas=sum(
+                            int(n.nota >= NOTA_APROBACION)
+                            - int(con_nota.get(n.alumno_id) is not None and con_nota[n.alumno_id] >= NOTA_APROBACION)
+                            for n in notas_obj
+                        ),
+                    )
+                    estadisticas_utils.aplicar_deltas_materia(materia_id, **estadisticas_utils.sumar_deltas(
+                        *(estadisticas_utils.deltas_nota(n.nota) for n in notas_obj),
+                        *(estadisticas_utils.deltas_nota(con_nota.get(n.alumno_id), -1) for n in notas_obj),
+                    ))
+        except Exception as e:
+            return Response({"detail": f"Error al guardar notas: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        return Response({
+            "materia": materia_id,
+            "creadas": sum(1 for r in resultados if r["estado"] == "creada"),
+            "actualizadas": sum(1 for r in resultados if r["estado"] == "actualizada"),
+            "errores": sum(1 for r in resultados if r["estado"] == "error"),
+            "resultados": resultados,
+        })
+
+
 class DocenteMateriaCreateView(APIView):
     permission_classes = [IsDocente]
 
@@ -569,12 +824,26 @@ class DocenteByMateria(APIView):
         docentes = [asig.docente for asig in asignaciones]
         return Response(PersonalSerializer(docentes, many=True).data)
     
+# Sin catalogo_condicional: el listado del admin muestra el cupo actual
 class AdminMaterias(APIView):
     permission_classes = [IsAdminOrPreceptor]
+    ordenes = {
+        "carrera": ["carrera__nombre", "nombre"],
+        "nombre": ["nombre"],
+    }
 
     def get(self, request):
-        materias = Materia.objects.all()
-        return Response(MateriaWithDocenteSerializer(materias, many=True).data)
+        materias = MateriaWithDocenteSerializer.setup_eager_loading(Materia.objects.all())
+        carrera_id = _param_int(request, "carrera")
+        if carrera_id is not None:
+            materias = materias.filter(carrera_id=carrera_id)
+        docente_id = _param_int(request, "docente")
+        if docente_id is not None:
+            materias = materias.filter(docentes__docente_id=docente_id)
+        return _listado(
+            request, materias, _param_orden(request, self.ordenes),
+            lambda filas: MateriaWithDocenteSerializer(filas, many=True).data,
+        )
 
 class AdminCreateMateria(APIView):
     permission_classes = [IsAdminOrPreceptor]
@@ -665,11 +934,24 @@ class AdminMateriaDetailView(APIView):
 # Admin Alumnos
 class AdminAlumnos(APIView):
     permission_classes = [IsAdminOrPreceptor]
+    ordenes = {
+        "apellido": ["apellido", "nombre"],
+        "dni": ["dni"],
+    }
 
     def get(self, request):
-        alumnos = Alumno.objects.all()
-
-        return Response(AlumnoSerializer(alumnos, many=True).data)
+        alumnos = Alumno.objects.select_related("carrera_principal")
+        carrera_id = _param_int(request, "carrera")
+        if carrera_id is not None:
+            alumnos = alumnos.filter(carrera_principal_id=carrera_id)
+        materia_id = _param_int(request, "materia")
+        if materia_id is not None:
+            # unique_together (alumno, materia) garantiza una fila por alumno
+            alumnos = alumnos.filter(inscripciones__materia_id=materia_id, inscripciones__activa=True)
+        return _listado(
+            request, alumnos, _param_orden(request, self.ordenes),
+            lambda filas: AlumnoSerializer(filas, many=True).data,
+        )
 
 class AdminAlumnosDetailView(APIView):
     permission_classes = [IsAdminOrPreceptor]
@@ -709,20 +991,46 @@ class AdminAlumnosDetailView(APIView):
     
 class AdminInscripciones(APIView):
     permission_classes = [IsAdminOrPreceptor]
+    ordenes = {
+        "-fecha_inscripcion": ["-fecha_inscripcion"],
+        "fecha_inscripcion": ["fecha_inscripcion"],
+    }
 
     def get(self, request):
-        inscripciones = InscripcionCarrera.objects.all()
+        inscripciones = InscripcionCarrera.objects.select_related(
+            "alumno", "alumno__carrera_principal", "carrera", "responsable"
+        )
+        carrera_id = _param_int(request, "carrera")
+        if carrera_id is not None:
+            inscripciones = inscripciones.filter(carrera_id=carrera_id)
+        alumno_id = _param_int(request, "alumno")
+        if alumno_id is not None:
+            inscripciones = inscripciones.filter(alumno_id=alumno_id)
+        return _listado(
+            request, inscripciones, _param_orden(request, self.ordenes),
+            lambda filas: InscripcionCarreraSerializer(filas, many=True).data,
+        )
 
-        if inscripciones:
-            return Response(InscripcionCarreraSerializer(inscripciones, many=True).data)
-        else :
-            return Response([], status=status.HTTP_200_OK)
 class AdminUsuariosPendientesView(APIView):
     permission_classes = [IsAdminOrPreceptor]
 
+    ordenes = {
+        "-creado_en": ["-creado_en"],
+        "creado_en": ["creado_en"],
+    }
+
     def get(self, request):
-        registros_pendientes = RegistroUsuario.objects.filter(estado='PENDIENTE')
-        return Response(UsuariosPendientesSerializer(registros_pendientes, many=True).data)
+        estado = request.query_params.get("estado") or "PENDIENTE"
+        if estado not in dict(RegistroUsuario.ESTADO_CHOICES):
+            raise DRFValidationError({"estado": ["Estado inválido"]})
+        registros = RegistroUsuario.objects.filter(estado=estado)
+        rol = request.query_params.get("rol")
+        if rol:
+            registros = registros.filter(rol_solicitado=rol)
+        return _listado(
+            request, registros, _param_orden(request, self.ordenes),
+            lambda filas: UsuariosPendientesSerializer(filas, many=True).data,
+        )
     
 
 class AdminUsuariosAprobarView(APIView):
@@ -765,6 +1073,36 @@ class AdminUsuariosAprobarView(APIView):
 
         return Response({"ok": True, "mensaje": "Usuario aprobado"}, status=status.HTTP_200_OK)
 
+class AdminUsuariosAprobarLoteView(APIView):
+    permission_classes = [IsAdminOrPreceptor]
+
+    def post(self, request):
+        # Aprobación por lotes; ver usuarios/aprobacion.py
+        serializer = AprobacionLoteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        datos = serializer.validated_data
+        registros = RegistroUsuario.objects.filter(estado="PENDIENTE")  # type: ignore[attr-defined]
+        if datos["todos"]:
+            if "rol" in datos:
+                registros = registros.filter(rol_solicitado=datos["rol"])
+            if "carrera" in datos:
+                registros = registros.filter(carrera_solicitada_id=datos["carrera"])
+        else:
+            registros = registros.filter(pk__in=datos["ids"])
+        # El request queda acotado: las cohortes grandes van por `manage.py aprobar_registros`
+        cantidades = registros.aggregate(total=Count("pk"), sin_usuario=Count("pk", filter=Q(user__isnull=True)))
+        if cantidades["total"] > APROBACION_LOTE_MAX or cantidades["sin_usuario"] > APROBACION_SIN_USUARIO_MAX:
+            return Response({
+                "detail": (
+                    f"Demasiados registros para un request (máximo {APROBACION_LOTE_MAX}, y "
+                    f"{APROBACION_SIN_USUARIO_MAX} sin usuario): usar python manage.py aprobar_registros"
+                ),
+                **cantidades,
+            }, status=status.HTTP_400_BAD_REQUEST)
+        # Sin pool de procesos en el worker web: los pocos hashes se calculan acá mismo
+        informe = aprobacion.aprobar_registros(registros, request.user, procesos=1)
+        return Response(informe, status=status.HTTP_200_OK)
+
 class AdminUsuariosRechazarView(APIView):
     permission_classes = [IsAdminOrPreceptor]
 
@@ -794,32 +1132,172 @@ class AdminMateriasWithCountView(APIView):
     permission_classes = [IsAdminOrPreceptor]
 
     def get(self, request):
-        # total_alumnos = cantidad de Notas por materia (alumnos con nota cargada)
+        # total_alumnos = cantidad de Notas por materia (alumnos con nota cargada), leída de EstadisticasMateria
         materias = (
             Materia.objects  # type: ignore[attr-defined]
-            .annotate(total_alumnos=Count("notas", distinct=True))
+            .annotate(total_alumnos=Coalesce("estadisticas__notas", 0))
             .select_related("carrera")
         )
         return Response(MateriaWithCountSerializer(materias, many=True).data)
 
 
+class AdminMateriasEstadisticasView(APIView):
+    permission_classes = [IsAdminOrPreceptor]
+
+    def get(self, request):
+        # Promedio, aprobación, histograma e inscriptos por materia: una consulta a la tabla de resúmenes
+        materias = Materia.objects.select_related("carrera", "estadisticas").order_by("nombre", "pk")  # type: ignore[attr-defined]
+        carrera_id = request.query_params.get("carrera")
+        if carrera_id:
+            if not carrera_id.isdigit():
+                return Response({"detail": "carrera inválida"}, status=status.HTTP_400_BAD_REQUEST)
+            materias = materias.filter(carrera_id=int(carrera_id))
+        return Response(MateriaEstadisticasSerializer(materias, many=True).data)
+
+
+class AdminAnaliticaNotasView(APIView):
+    permission_classes = [IsAdminOrPreceptor]
+
+    def get(self, request):
+        # Lee el snapshot de NumPy (manage.py analitica_notas --actualizar), no la base
+        por = request.query_params.get("por", "materia")
+        cohortes = request.query_params.get("cohortes") in ("1", "true")
+        if por not in analitica.AGRUPACIONES or (cohortes and por == "cohorte"):
+            return Response({"detail": "por inválido"}, status=status.HTTP_400_BAD_REQUEST)
+        filtro = {}
+        for campo in ("materia", "carrera"):
+            valor = request.query_params.get(campo)
+            if valor:
+                if not valor.isdigit():
+                    return Response({"detail": f"{campo} inválido"}, status=status.HTTP_400_BAD_REQUEST)
+                filtro[campo] = int(valor)
+        try:
+            snapshot = analitica.cargar_snapshot()
+        except ImproperlyConfigured as e:
+            return Response({"detail": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        if snapshot is None:
+            return Response(
+                {"detail": "Snapshot sin generar: ejecutar manage.py analitica_notas --actualizar"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+        if cohortes:
+            grupos = [
+                {por: grupo, "cohortes": filas}
+                for grupo, filas in snapshot.comparar_cohortes(por=por, filtro=filtro).items()
+            ]
+        else:
+            grupos = snapshot.resumen(por=por, filtro=filtro)
+        return Response({"actualizado": snapshot.hasta, "notas": len(snapshot), "por": por, "grupos": grupos})
+
+
+class AdminImportarView(APIView):
+    permission_classes = [IsAdminOrPreceptor]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request, tipo: str):
+        # Alta masiva desde CSV/XLSX (campo "archivo"); ver api/importacion.py
+        if tipo not in importacion.IMPORTADORES:
+            return Response({"detail": "Tipo inválido"}, status=status.HTTP_404_NOT_FOUND)
+        archivo = request.FILES.get("archivo")
+        if archivo is None:
+            return Response({"detail": "archivo es requerido"}, status=status.HTTP_400_BAD_REQUEST)
+        lote = request.data.get("lote", importacion.LOTE)
+        if not str(lote).isdigit() or int(lote) < 1:
+            return Response({"detail": "lote inválido"}, status=status.HTTP_400_BAD_REQUEST)
+        simular = request.data.get("simular") in ("1", "true")
+        try:
+            informe = importacion.importar(
+                tipo, importacion.leer_filas(archivo, archivo.name), lote=int(lote), simular=simular
+            )
+        except ImproperlyConfigured as e:
+            return Response({"detail": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        codigo = status.HTTP_201_CREATED if informe["creadas"] else status.HTTP_200_OK
+        return Response(informe, status=codigo)
+
+
 # Admin/Preceptor: listado de alumnos con su materia y nota
 class PreceptorAlumnosNotasView(APIView):
     permission_classes = [IsAdminOrPreceptor]
+    ordenes = {
+        "alumno": ["alumno__apellido", "alumno__nombre", "materia__nombre"],
+        "materia": ["materia__nombre", "alumno__apellido", "alumno__nombre"],
+        "-nota": ["-nota"],
+    }
 
     def get(self, request):
         # Listar todas las notas con alumno y materia relacionados
-        qs = (
-            Nota.objects  # type: ignore[attr-defined]
-            .select_related("alumno", "materia", "profesor")
-            .order_by("alumno__apellido", "alumno__nombre", "materia__nombre")
+        qs = _filtrar_notas(
+            request,
+            Nota.objects.select_related(  # type: ignore[attr-defined]
+                "alumno", "alumno__carrera_principal", "materia", "materia__carrera", "profesor"
+            ),
         )
-        data = [
-            {
-                "alumno": AlumnoSerializer(n.alumno).data,
-                "materia": MateriaSerializer(n.materia).data,
-                "nota": NotaLiteSerializer(n).data,
-            }
-            for n in qs
-        ]
-        return Response(data)
+        return _listado(
+            request, qs, _param_orden(request, self.ordenes),
+            lambda filas: [
+                {
+                    "alumno": AlumnoSerializer(n.alumno).data,
+                    "materia": MateriaSerializer(n.materia).data,
+                    "nota": NotaLiteSerializer(n).data,
+                }
+                for n in filas
+            ],
+        )
+
+
+class _Eco:
+    # Pseudo-buffer para csv.writer: devuelve la línea en lugar de guardarla
+    def write(self, value):
+        return value
+
+
+class PreceptorAlumnosNotasExportView(APIView):
+    permission_classes = [IsAdminOrPreceptor]
+    columnas = [
+        ("alumno_id", "alumno_id"),
+        ("alumno_dni", "alumno__dni"),
+        ("alumno_apellido", "alumno__apellido"),
+        ("alumno_nombre", "alumno__nombre"),
+        ("carrera", "materia__carrera__nombre"),
+        ("materia_id", "materia_id"),
+        ("materia", "materia__nombre"),
+        ("nota", "nota"),
+        ("observaciones", "observaciones"),
+        ("fecha_modificacion", "fecha_modificacion"),
+    ]
+    chunk_size = 2000
+
+    def get(self, request):
+        # Exporta la planilla de notas en streaming (NDJSON o CSV) con columnas planas.
+        # Se leen tuplas por bloques con iterator(), así la memoria no crece con la cantidad de notas.
+        formato = request.query_params.get("formato", "ndjson")
+        if formato not in ("ndjson", "csv"):
+            return Response({"detail": "formato debe ser ndjson o csv"}, status=status.HTTP_400_BAD_REQUEST)
+
+        qs = _filtrar_notas(request, Nota.objects.all())  # type: ignore[attr-defined]
+        filas = (
+            qs.order_by("alumno__apellido", "alumno__nombre", "materia__nombre", "pk")
+            .values_list(*[campo for _, campo in self.columnas])
+            .iterator(chunk_size=self.chunk_size)
+        )
+        nombres = [nombre for nombre, _ in self.columnas]
+
+        if formato == "csv":
+            writer = csv.writer(_Eco())
+
+            def generar_csv():
+                yield writer.writerow(nombres)
+                for fila in filas:
+                    yield writer.writerow(fila)
+
+            response = StreamingHttpResponse(generar_csv(), content_type="text/csv; charset=utf-8")
+            response["Content-Disposition"] = 'attachment; filename="notas.csv"'
+            return response
+
+        def generar_ndjson():
+            for fila in filas:
+                yield json.dumps(dict(zip(nombres, fila)), cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+
+        return StreamingHttpResponse(generar_ndjson(), content_type="application/x-ndjson; charset=utf-8")
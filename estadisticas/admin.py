@@ -0,0 +1,22 @@
+from django.contrib import admin
+from .models import EstadisticasGenerales, EstadisticasMateria
+
+
+@admin.register(EstadisticasGenerales)
+class EstadisticasGeneralesAdmin(admin.ModelAdmin):
+    list_display = ('alumnos', 'carreras', 'materias', 'notas', 'notas_aprobadas',
+                    'registros_pendientes', 'inscripciones_activas', 'actualizado_en')
+    readonly_fields = list_display
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(EstadisticasMateria)
+class EstadisticasMateriaAdmin(admin.ModelAdmin):
+    list_display = ('materia', 'inscriptos_activos', 'notas', 'promedio', 'porcentaje_aprobadas', 'actualizado_en')
+    list_select_related = ('materia',)
+    readonly_fields = [f.name for f in EstadisticasMateria._meta.fields] + ['histograma']
+
+    def has_add_permission(self, request):
+        return False
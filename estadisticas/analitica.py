@@ -0,0 +1,308 @@
+"""
+Analítica de notas sobre un snapshot columnar con NumPy (dependencia opcional).
+
+`actualizar_snapshot()` exporta las notas (id, alumno, materia, carrera, nota,
+fechas) a un archivo .npy por columna en settings.ANALITICA_DIR. La primera vez
+exporta todo; después trae sólo las notas con fecha_modificacion posterior a la
+última exportación (con un margen para transacciones que confirmaron tarde) y
+las mezcla por id. Las bajas no cambian fecha_modificacion: si la cantidad de
+filas no coincide con la base, se descartan los ids que ya no existen.
+
+`cargar_snapshot()` abre las columnas con mmap, así que los reportes (resumen
+por grupo, percentiles, histograma y comparación de cohortes) corren
+vectorizados sobre los arrays sin consultar la base. Las notas se guardan en
+centésimos (int16) para que los umbrales sean exactos.
+
+Si un Materia cambia de carrera, la carrera de sus notas viejas queda
+desactualizada hasta una exportación completa (`completo=True`).
+"""
+import json
+import os
+import shutil
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depende del entorno
+    np = None
+
+# nombre -> dtype de NumPy de cada columna
+COLUMNAS = {
+    "id": "int64",
+    "alumno": "int32",
+    "materia": "int32",
+    "carrera": "int32",
+    "nota": "int16",  # centésimos: 6.00 -> 600
+    "creada": "int64",  # segundos desde epoch (UTC)
+    "modificada": "int64",
+}
+META = "meta.json"
+VERSION = 1
+# Transacciones que guardaron antes de la última exportación pero confirmaron después
+MARGEN = timedelta(minutes=5)
+LOTE = 50_000
+PERCENTILES = (10, 25, 50, 75, 90)
+APROBACION = 600
+AGRUPACIONES = ("materia", "carrera", "alumno", "cohorte")
+
+
+def _requiere_numpy():
+    if np is None:
+        raise ImproperlyConfigured("La analítica de notas requiere NumPy (pip install numpy)")
+
+
+def _directorio(directorio=None):
+    return Path(directorio or getattr(settings, "ANALITICA_DIR", Path(settings.BASE_DIR) / "analitica"))
+
+
+def _epoch(fecha):
+    return int(fecha.timestamp())
+
+
+# Exportación
+
+def _exportar(queryset):
+    """Columnas NumPy de las notas del queryset, leídas en lotes de LOTE filas"""
+    partes = {nombre: [] for nombre in COLUMNAS}
+    filas = queryset.order_by().values_list(
+        "id", "alumno_id", "materia_id", "materia__carrera_id", "nota", "fecha_creacion", "fecha_modificacion"
+    ).iterator(chunk_size=LOTE)
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) == LOTE:
+            _agregar_lote(partes, lote)
+            lote = []
+    if lote:
+        _agregar_lote(partes, lote)
+    return {
+        nombre: np.concatenate(valores) if valores else np.empty(0, dtype=COLUMNAS[nombre])
+        for nombre, valores in partes.items()
+    }
+
+
+def _agregar_lote(partes, lote):
+    ids, alumnos, materias, carreras, notas, creadas, modificadas = zip(*lote)
+    n = len(lote)
+    partes["id"].append(np.fromiter(ids, dtype=COLUMNAS["id"], count=n))
+    partes["alumno"].append(np.fromiter(alumnos, dtype=COLUMNAS["alumno"], count=n))
+    partes["materia"].append(np.fromiter(materias, dtype=COLUMNAS["materia"], count=n))
+    partes["carrera"].append(np.fromiter(carreras, dtype=COLUMNAS["carrera"], count=n))
+    partes["nota"].append(np.fromiter((round(nota * 100) for nota in notas), dtype=COLUMNAS["nota"], count=n))
+    partes["creada"].append(np.fromiter(map(_epoch, creadas), dtype=COLUMNAS["creada"], count=n))
+    partes["modificada"].append(np.fromiter(map(_epoch, modificadas), dtype=COLUMNAS["modificada"], count=n))
+
+
+def _leer_meta(directorio):
+    archivo = directorio / META
+    if not archivo.exists():
+        return None
+    meta = json.loads(archivo.read_text(encoding="utf-8"))
+    carpeta = directorio / meta.get("carpeta", "")
+    if meta.get("version") != VERSION or any(not (carpeta / f"{c}.npy").exists() for c in COLUMNAS):
+        return None
+    return meta
+
+
+def _abrir(directorio, meta):
+    carpeta = directorio / meta["carpeta"]
+    return {nombre: np.load(carpeta / f"{nombre}.npy", mmap_mode="r") for nombre in COLUMNAS}
+
+
+def _guardar(directorio, columnas, meta):
+    """
+    Escribe las columnas en una carpeta nueva y recién después apunta meta.json a ella
+    (os.replace es atómico): un lector nunca mezcla columnas de dos exportaciones.
+    """
+    anterior = _leer_meta(directorio)
+    generacion = (anterior or {}).get("generacion", 0) + 1
+    carpeta = f"g{generacion:06d}"
+    (directorio / carpeta).mkdir(parents=True, exist_ok=True)
+    for nombre, valores in columnas.items():
+        np.save(directorio / carpeta / f"{nombre}.npy", np.ascontiguousarray(valores, dtype=COLUMNAS[nombre]))
+    temporal = directorio / f".{META}.tmp"
+    temporal.write_text(json.dumps({**meta, "generacion": generacion, "carpeta": carpeta}), encoding="utf-8")
+    os.replace(temporal, directorio / META)
+    # Las exportaciones viejas se borran; un lector que todavía las tenga con mmap conserva sus datos
+    # (en Windows el borrado falla mientras estén abiertas y se reintenta en la próxima actualización)
+    for viejo in directorio.glob("g*"):
+        if viejo.is_dir() and viejo.name != carpeta:
+            shutil.rmtree(viejo, ignore_errors=True)
+
+
+def _mezclar(actuales, nuevas):
+    """Reemplaza por id las filas que ya estaban y agrega las demás; el resultado queda ordenado por id"""
+    ids = actuales["id"]
+    posiciones = np.searchsorted(ids, nuevas["id"])
+    existe = posiciones < len(ids)
+    existe[existe] = ids[posiciones[existe]] == nuevas["id"][existe]
+    resultado = {}
+    for nombre in COLUMNAS:
+        columna = np.array(actuales[nombre])
+        columna[posiciones[existe]] = nuevas[nombre][existe]
+        resultado[nombre] = np.concatenate([columna, nuevas[nombre][~existe]])
+    orden = np.argsort(resultado["id"], kind="stable")
+    return {nombre: valores[orden] for nombre, valores in resultado.items()}
+
+
+def actualizar_snapshot(directorio=None, completo=False):
+    """
+    Exporta las notas nuevas o modificadas desde la última vez (todas con completo=True
+    o si no hay snapshot). Devuelve {"filas", "exportadas", "descartadas", "completo"}.
+    """
+    from notas.models import Nota
+
+    _requiere_numpy()
+    directorio = _directorio(directorio)
+    meta = None if completo else _leer_meta(directorio)
+    inicio = datetime.now(dt_timezone.utc)
+
+    if meta is None:
+        columnas = _exportar(Nota.objects.all())
+        orden = np.argsort(columnas["id"], kind="stable")
+        columnas = {nombre: valores[orden] for nombre, valores in columnas.items()}
+        exportadas, descartadas = len(columnas["id"]), 0
+    else:
+        desde = datetime.fromtimestamp(meta["hasta"], dt_timezone.utc) - MARGEN
+        nuevas = _exportar(Nota.objects.filter(fecha_modificacion__gte=desde))
+        columnas = _mezclar(_abrir(directorio, meta), nuevas)
+        exportadas, descartadas = len(nuevas["id"]), 0
+        if len(columnas["id"]) != Nota.objects.count():
+            vigentes = np.fromiter(Nota.objects.order_by().values_list("id", flat=True).iterator(chunk_size=LOTE),
+                                   dtype=COLUMNAS["id"])
+            quedan = np.isin(columnas["id"], vigentes)
+            descartadas = int((~quedan).sum())
+            columnas = {nombre: valores[quedan] for nombre, valores in columnas.items()}
+
+    _guardar(directorio, columnas, {"version": VERSION, "hasta": _epoch(inicio), "filas": len(columnas["id"])})
+    return {"filas": len(columnas["id"]), "exportadas": exportadas, "descartadas": descartadas, "completo": meta is None}
+
+
+def cargar_snapshot(directorio=None):
+    """Abre el snapshot en modo sólo lectura (mmap); None si todavía no se exportó"""
+    _requiere_numpy()
+    directorio = _directorio(directorio)
+    meta = _leer_meta(directorio)
+    if meta is None:
+        return None
+    return SnapshotNotas(_abrir(directorio, meta), datetime.fromtimestamp(meta["hasta"], dt_timezone.utc))
+
+
+# Reportes
+
+def _agrupar(claves):
+    """(grupos, índice de grupo por fila, cantidad por grupo) de claves enteras no negativas"""
+    maximo = int(claves.max())
+    if maximo > 4 * len(claves) + 1_000_000:
+        # Claves muy dispersas: np.unique ordena, pero no reserva un array del tamaño del máximo
+        grupos, inversa, cantidades = np.unique(claves, return_inverse=True, return_counts=True)
+        return grupos, inversa.reshape(-1).astype(np.int64), cantidades
+    # Ids densos: bincount agrupa en O(n) sin ordenar
+    cantidades = np.bincount(claves, minlength=maximo + 1)
+    grupos = np.flatnonzero(cantidades)
+    posicion = np.zeros(maximo + 1, dtype=np.int64)
+    posicion[grupos] = np.arange(len(grupos))
+    return grupos, posicion[claves], cantidades[grupos]
+
+
+def _agregar(claves, notas, percentiles):
+    """Estadísticas por valor distinto de `claves`, todo con operaciones vectorizadas"""
+    grupos, inversa, cantidades = _agrupar(claves)
+    sumas = np.bincount(inversa, weights=notas.astype(np.float64), minlength=len(grupos))
+    aprobadas = np.bincount(inversa, weights=(notas >= APROBACION).astype(np.float64), minlength=len(grupos))
+    rangos = np.clip(notas // 100, 1, 10).astype(np.int64) - 1
+    histograma = np.bincount(inversa * 10 + rangos, minlength=len(grupos) * 10).reshape(len(grupos), 10)
+
+    # Percentiles por grupo: un solo sort de la clave grupo * 1024 + nota (las notas van de 100 a 1000)
+    # deja cada grupo en un tramo contiguo y ordenado; después se interpola dentro del tramo
+    ordenadas = (np.sort(inversa * 1024 + notas) & 1023).astype(np.float64)
+    inicios = np.concatenate([[0], np.cumsum(cantidades)[:-1]])
+    valores_p = {}
+    for p in percentiles:
+        posicion = inicios + (cantidades - 1) * (p / 100)
+        abajo = np.floor(posicion).astype(np.int64)
+        arriba = np.minimum(abajo + 1, inicios + cantidades - 1)
+        fraccion = posicion - abajo
+        valores_p[p] = (ordenadas[abajo] * (1 - fraccion) + ordenadas[arriba] * fraccion) / 100
+
+    # Redondeo vectorizado y .tolist() antes de armar los dicts: el bucle sólo toca escalares de Python
+    promedios = np.round(sumas / cantidades / 100, 2).tolist()
+    porcentajes = np.round(100 * aprobadas / cantidades, 1).tolist()
+    valores_p = {str(p): np.round(v, 2).tolist() for p, v in valores_p.items()}
+    cantidades, aprobadas = cantidades.tolist(), aprobadas.astype(np.int64).tolist()
+    return [
+        (grupo, {
+            "notas": cantidades[i],
+            "promedio": promedios[i],
+            "aprobadas": aprobadas[i],
+            "porcentaje_aprobadas": porcentajes[i],
+            "percentiles": {p: v[i] for p, v in valores_p.items()},
+            "histograma": fila,
+        })
+        for i, (grupo, fila) in enumerate(zip(grupos.tolist(), histograma.tolist()))
+    ]
+
+
+class SnapshotNotas:
+    def __init__(self, columnas, hasta):
+        self.columnas = columnas
+        self.hasta = hasta
+
+    def __len__(self):
+        return len(self.columnas["id"])
+
+    def cohortes(self):
+        """Año de la primera nota de cada alumno, por fila"""
+        alumnos = np.asarray(self.columnas["alumno"], dtype=np.int64)
+        if not len(alumnos):
+            return np.empty(0, dtype=np.int64)
+        grupos, inversa, _ = _agrupar(alumnos)
+        primera = np.full(len(grupos), np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(primera, inversa, self.columnas["creada"])
+        anios = primera.astype("datetime64[s]").astype("datetime64[Y]").astype(np.int64) + 1970
+        return anios[inversa]
+
+    def _claves(self, por):
+        if por not in AGRUPACIONES:
+            raise ValueError(f"Agrupación desconocida: {por!r} (usar {', '.join(AGRUPACIONES)})")
+        return self.cohortes() if por == "cohorte" else np.asarray(self.columnas[por], dtype=np.int64)
+
+    def _mascara(self, filtro):
+        mascara = np.ones(len(self), dtype=bool)
+        for columna, valor in (filtro or {}).items():
+            mascara &= self.columnas[columna] == valor
+        return mascara
+
+    def resumen(self, por="materia", filtro=None, percentiles=PERCENTILES):
+        """
+        Una fila por grupo con cantidad, promedio, aprobadas, % de aprobación, percentiles
+        e histograma por nota entera (igual que EstadisticasMateria). `filtro` es
+        {"materia"|"carrera"|"alumno": id} para restringir las filas.
+        """
+        mascara = self._mascara(filtro)
+        notas = np.asarray(self.columnas["nota"])[mascara]
+        if not len(notas):
+            return []
+        return [{por: grupo, **datos} for grupo, datos in _agregar(self._claves(por)[mascara], notas, percentiles)]
+
+    def comparar_cohortes(self, por="carrera", filtro=None, percentiles=(50,)):
+        """{id del grupo: [resumen de cada cohorte]} para comparar los años de ingreso dentro de cada grupo"""
+        if por == "cohorte":
+            raise ValueError("Las cohortes se comparan dentro de una materia, carrera o alumno")
+        mascara = self._mascara(filtro)
+        notas = np.asarray(self.columnas["nota"])[mascara]
+        if not len(notas):
+            return {}
+        # Clave compuesta grupo * años + (año - primer año): una sola pasada agrupa por los dos
+        anios = self.cohortes()[mascara]
+        primero = int(anios.min())
+        rango = int(anios.max()) - primero + 1
+        compuesta = self._claves(por)[mascara] * rango + (anios - primero)
+        resultado = {}
+        for clave, datos in _agregar(compuesta, notas, percentiles):
+            resultado.setdefault(clave // rango, []).append({"cohorte": clave % rango + primero, **datos})
+        return resultado
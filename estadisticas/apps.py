@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class EstadisticasConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'estadisticas'
+
+    def ready(self):
+        # Registra las señales que mantienen los contadores al día
+        from . import signals  # noqa: F401
@@ -0,0 +1,65 @@
+import json
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from estadisticas import analitica
+
+
+class Command(BaseCommand):
+    help = (
+        "Actualiza el snapshot columnar de notas (NumPy) y muestra distribución, percentiles y "
+        "aprobación por materia, carrera, alumno o cohorte sin consultar la base"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--actualizar", action="store_true", help="Exporta las notas nuevas o modificadas")
+        parser.add_argument("--completo", action="store_true", help="Vuelve a exportar todas las notas")
+        parser.add_argument("--por", choices=analitica.AGRUPACIONES, default="materia")
+        parser.add_argument("--materia", type=int, help="Sólo las notas de esta materia")
+        parser.add_argument("--carrera", type=int, help="Sólo las notas de esta carrera")
+        parser.add_argument("--cohortes", action="store_true", help="Compara cohortes dentro de cada grupo")
+        parser.add_argument("--json", action="store_true", help="Salida en JSON")
+        parser.add_argument("--directorio", help="Carpeta del snapshot (por defecto settings.ANALITICA_DIR)")
+
+    def handle(self, *args, **options):
+        if options["cohortes"] and options["por"] == "cohorte":
+            raise CommandError("--cohortes compara cohortes dentro de una materia, carrera o alumno")
+        try:
+            if options["actualizar"] or options["completo"]:
+                inicio = time.perf_counter()
+                info = analitica.actualizar_snapshot(options["directorio"], completo=options["completo"])
+                self.stdout.write(self.style.SUCCESS(
+                    f"Snapshot {'completo' if info['completo'] else 'incremental'}: {info['exportadas']} exportadas, "
+                    f"{info['descartadas']} descartadas, {info['filas']} filas "
+                    f"({(time.perf_counter() - inicio) * 1000:.0f} ms)"
+                ))
+            snapshot = analitica.cargar_snapshot(options["directorio"])
+        except ImproperlyConfigured as e:
+            raise CommandError(str(e))
+        if snapshot is None:
+            raise CommandError("No hay snapshot; ejecutar con --actualizar")
+
+        filtro = {c: options[c] for c in ("materia", "carrera") if options[c] is not None}
+        inicio = time.perf_counter()
+        if options["cohortes"]:
+            resultado = snapshot.comparar_cohortes(por=options["por"], filtro=filtro)
+        else:
+            resultado = snapshot.resumen(por=options["por"], filtro=filtro)
+        ms = (time.perf_counter() - inicio) * 1000
+
+        if options["json"]:
+            self.stdout.write(json.dumps(resultado, ensure_ascii=False))
+            return
+        self.stdout.write(f"{len(snapshot)} notas al {snapshot.hasta:%Y-%m-%d %H:%M} UTC; reporte en {ms:.1f} ms")
+        filas = (
+            [{options["por"]: grupo, **fila} for grupo, cohortes in resultado.items() for fila in cohortes]
+            if options["cohortes"] else resultado
+        )
+        for fila in filas:
+            cohorte = f" cohorte {fila['cohorte']}" if options["cohortes"] else ""
+            self.stdout.write(
+                f"{options['por']} {fila[options['por']]}{cohorte}: {fila['notas']} notas, promedio {fila['promedio']}, "
+                f"{fila['porcentaje_aprobadas']}% aprobadas, percentiles {fila['percentiles']}"
+            )
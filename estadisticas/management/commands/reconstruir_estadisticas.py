@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from estadisticas.utils import reconstruir, reconstruir_materias
+
+
+class Command(BaseCommand):
+    help = "Recalcula desde cero los contadores de EstadisticasGenerales y las estadísticas por materia"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--materia", type=int, action="append", dest="materias",
+            help="Recalcula sólo las estadísticas de esta materia (se puede repetir)",
+        )
+
+    def handle(self, *args, **options):
+        if options["materias"]:
+            filas = reconstruir_materias(options["materias"])
+            self.stdout.write(self.style.SUCCESS(f"Estadísticas reconstruidas para {filas} materia(s)"))
+            return
+
+        estadisticas = reconstruir()
+        filas = reconstruir_materias()
+        self.stdout.write(self.style.SUCCESS(
+            f"Estadísticas reconstruidas: {estadisticas.alumnos} alumnos, {estadisticas.carreras} carreras, "
+            f"{estadisticas.materias} materias, {estadisticas.notas} notas "
+            f"({estadisticas.notas_aprobadas} aprobadas), {estadisticas.registros_pendientes} registros pendientes, "
+            f"{estadisticas.inscripciones_activas} inscripciones activas; {filas} materias con estadísticas"
+        ))
@@ -0,0 +1,81 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import models
+
+
+class EstadisticasGenerales(models.Model):
+    """
+    Contadores globales del sistema en una única fila (pk=1).
+    Se mantienen con deltas desde estadisticas.signals, aplicados al confirmar
+    cada transacción, y se pueden reconstruir con
+    `python manage.py reconstruir_estadisticas`.
+    """
+    alumnos = models.IntegerField(default=0)
+    carreras = models.IntegerField(default=0)
+    materias = models.IntegerField(default=0)
+    notas = models.IntegerField(default=0)
+    notas_aprobadas = models.IntegerField(default=0)
+    registros_pendientes = models.IntegerField(default=0)
+    inscripciones_activas = models.IntegerField(default=0)
+    # Versión del catálogo (carreras, materias y docentes asignados) para ETag/Last-Modified
+    catalogo_version = models.PositiveBigIntegerField(default=0)
+    catalogo_actualizado_en = models.DateTimeField(null=True, blank=True)
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Estadísticas Generales"
+        verbose_name_plural = "Estadísticas Generales"
+
+    def __str__(self):
+        return f"Estadísticas al {self.actualizado_en:%Y-%m-%d %H:%M}"
+
+
+class EstadisticasMateria(models.Model):
+    """
+    Resumen de notas e inscripciones de una materia. Se mantiene con deltas
+    desde estadisticas.signals (y desde las cargas masivas vía
+    aplicar_deltas_materia) y se reconstruye con
+    `python manage.py reconstruir_estadisticas`.
+    """
+    materia = models.OneToOneField(
+        "materias.Materia", on_delete=models.CASCADE, primary_key=True, related_name="estadisticas"
+    )
+    notas = models.IntegerField(default=0)
+    suma_notas = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    aprobadas = models.IntegerField(default=0)
+    inscriptos_activos = models.IntegerField(default=0)
+    # Histograma por nota entera: histograma_n cuenta las notas en [n, n+1); histograma_10 sólo el 10.00
+    histograma_1 = models.IntegerField(default=0)
+    histograma_2 = models.IntegerField(default=0)
+    histograma_3 = models.IntegerField(default=0)
+    histograma_4 = models.IntegerField(default=0)
+    histograma_5 = models.IntegerField(default=0)
+    histograma_6 = models.IntegerField(default=0)
+    histograma_7 = models.IntegerField(default=0)
+    histograma_8 = models.IntegerField(default=0)
+    histograma_9 = models.IntegerField(default=0)
+    histograma_10 = models.IntegerField(default=0)
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Estadísticas de Materia"
+        verbose_name_plural = "Estadísticas de Materias"
+
+    def __str__(self):
+        return f"Estadísticas de {self.materia}"
+
+    @property
+    def promedio(self):
+        if not self.notas:
+            return None
+        return (Decimal(self.suma_notas) / self.notas).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+    @property
+    def porcentaje_aprobadas(self):
+        if not self.notas:
+            return None
+        return round(100 * self.aprobadas / self.notas, 1)
+
+    @property
+    def histograma(self):
+        return [getattr(self, f"histograma_{n}") for n in range(1, 11)]
@@ -0,0 +1,187 @@
+"""
+Señales que mantienen EstadisticasGenerales y EstadisticasMateria con deltas
+en cada alta, baja o cambio de estado, en lugar de contar las tablas en cada
+consulta, y que versionan el catálogo para las respuestas condicionales (ETag).
+"""
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from alumnos.models import Alumno, InscripcionAlumno
+from carreras.models import Carrera
+from materias.models import Materia
+from notas.models import Nota, NOTA_APROBACION
+from usuarios.models import RegistroUsuario
+
+from personal.models import Personal, AsignacionDocente
+
+from .models import EstadisticasMateria
+from .utils import aplicar_deltas, aplicar_deltas_materia, deltas_nota, marcar_catalogo_modificado, sumar_deltas
+
+# Modelos que sólo cuentan altas y bajas
+CONTADORES_SIMPLES = {
+    Alumno: "alumnos",
+    Carrera: "carreras",
+    Materia: "materias",
+}
+
+
+def _alta(sender, instance, created, **kwargs):
+    if created:
+        aplicar_deltas(**{CONTADORES_SIMPLES[sender]: 1})
+
+
+def _baja(sender, instance, **kwargs):
+    aplicar_deltas(**{CONTADORES_SIMPLES[sender]: -1})
+
+
+for _modelo in CONTADORES_SIMPLES:
+    post_save.connect(_alta, sender=_modelo, dispatch_uid=f"estadisticas_alta_{_modelo.__name__}")
+    post_delete.connect(_baja, sender=_modelo, dispatch_uid=f"estadisticas_baja_{_modelo.__name__}")
+
+
+# Cualquier cambio en el catálogo invalida los ETag de los listados públicos
+def _catalogo_modificado(sender, instance, **kwargs):
+    marcar_catalogo_modificado()
+
+
+for _modelo in (Carrera, Materia, AsignacionDocente, Personal):
+    post_save.connect(_catalogo_modificado, sender=_modelo, dispatch_uid=f"catalogo_save_{_modelo.__name__}")
+    post_delete.connect(_catalogo_modificado, sender=_modelo, dispatch_uid=f"catalogo_delete_{_modelo.__name__}")
+
+
+# Campos cuyo valor anterior necesitan los deltas. Se recuerdan al cargar la instancia
+# (y después de cada save) para no agregar un SELECT a cada save
+CAMPOS_ANTERIORES = {
+    Nota: ("nota", "materia_id"),
+    RegistroUsuario: ("estado",),
+    InscripcionAlumno: ("activa",),
+}
+
+
+def _recordar(sender, instance, **kwargs):
+    # __dict__ y no getattr: un campo diferido (only/defer) no debe disparar una consulta
+    instance._valores_guardados = {
+        campo: instance.__dict__[campo] for campo in CAMPOS_ANTERIORES[sender] if campo in instance.__dict__
+    }
+
+
+def _valor_anterior(instance, campo):
+    # Valor guardado en la base antes de este save (None si es un alta)
+    if instance._state.adding or instance.pk is None:
+        return None
+    guardados = getattr(instance, "_valores_guardados", {})
+    if campo in guardados:
+        return guardados[campo]
+    # Campo diferido al cargar la instancia: se consulta
+    return (
+        type(instance).objects.filter(pk=instance.pk).order_by()
+        .values_list(campo, flat=True).first()
+    )
+
+
+for _modelo in CAMPOS_ANTERIORES:
+    post_init.connect(_recordar, sender=_modelo, dispatch_uid=f"estadisticas_recordar_{_modelo.__name__}")
+
+
+def _es_aprobada(valor):
+    return valor is not None and valor >= NOTA_APROBACION
+
+
+# Materia: fila de EstadisticasMateria en cero al crearla
+
+@receiver(post_save, sender=Materia, dispatch_uid="estadisticas_materia_alta")
+def _materia_post_save(sender, instance, created, **kwargs):
+    if created:
+        EstadisticasMateria.objects.get_or_create(materia_id=instance.pk)
+
+
+def _baja_de_materia(origen):
+    # `origin` de post_delete: la instancia o el queryset cuyo delete() originó el borrado.
+    # Sin estado por hilo: si el borrado falla o se revierte no queda nada que limpiar
+    if isinstance(origen, QuerySet):
+        return origen.model is Materia
+    return isinstance(origen, Materia)
+
+
+def _deltas_materia(materia_id, origen=None, **deltas):
+    # Las bajas en cascada de una materia no deben recrear la fila de estadísticas que
+    # el mismo borrado elimina (Carrera y Nota protegen a Materia: sólo se borra con su propio delete())
+    if not _baja_de_materia(origen):
+        aplicar_deltas_materia(materia_id, **deltas)
+
+
+# Nota: total y aprobadas, y el resumen de su materia
+
+@receiver(pre_save, sender=Nota, dispatch_uid="estadisticas_nota_pre")
+def _nota_pre_save(sender, instance, **kwargs):
+    instance._nota_anterior = _valor_anterior(instance, "nota")
+    instance._materia_anterior = _valor_anterior(instance, "materia_id")
+
+
+@receiver(post_save, sender=Nota, dispatch_uid="estadisticas_nota_post")
+def _nota_post_save(sender, instance, created, **kwargs):
+    anterior = None if created else getattr(instance, "_nota_anterior", None)
+    materia_anterior = None if created else getattr(instance, "_materia_anterior", None)
+    aplicar_deltas(
+        notas=1 if created else 0,
+        notas_aprobadas=int(_es_aprobada(instance.nota)) - int(_es_aprobada(anterior)),
+    )
+    if materia_anterior == instance.materia_id:
+        _deltas_materia(instance.materia_id, **sumar_deltas(deltas_nota(instance.nota), deltas_nota(anterior, -1)))
+    else:
+        if materia_anterior is not None:
+            _deltas_materia(materia_anterior, **deltas_nota(anterior, -1))
+        _deltas_materia(instance.materia_id, **deltas_nota(instance.nota))
+
+
+@receiver(post_delete, sender=Nota, dispatch_uid="estadisticas_nota_baja")
+def _nota_post_delete(sender, instance, origin=None, **kwargs):
+    aplicar_deltas(notas=-1, notas_aprobadas=-int(_es_aprobada(instance.nota)))
+    _deltas_materia(instance.materia_id, origin, **deltas_nota(instance.nota, -1))
+
+
+# RegistroUsuario: solicitudes pendientes
+
+@receiver(pre_save, sender=RegistroUsuario, dispatch_uid="estadisticas_registro_pre")
+def _registro_pre_save(sender, instance, **kwargs):
+    instance._estado_anterior = _valor_anterior(instance, "estado")
+
+
+@receiver(post_save, sender=RegistroUsuario, dispatch_uid="estadisticas_registro_post")
+def _registro_post_save(sender, instance, created, **kwargs):
+    anterior = None if created else getattr(instance, "_estado_anterior", None)
+    aplicar_deltas(
+        registros_pendientes=int(instance.estado == "PENDIENTE") - int(anterior == "PENDIENTE"),
+    )
+
+
+@receiver(post_delete, sender=RegistroUsuario, dispatch_uid="estadisticas_registro_baja")
+def _registro_post_delete(sender, instance, **kwargs):
+    aplicar_deltas(registros_pendientes=-int(instance.estado == "PENDIENTE"))
+
+
+# InscripcionAlumno: inscripciones activas, en total y por materia
+
+@receiver(pre_save, sender=InscripcionAlumno, dispatch_uid="estadisticas_inscripcion_pre")
+def _inscripcion_pre_save(sender, instance, **kwargs):
+    instance._activa_anterior = _valor_anterior(instance, "activa")
+
+
+@receiver(post_save, sender=InscripcionAlumno, dispatch_uid="estadisticas_inscripcion_post")
+def _inscripcion_post_save(sender, instance, created, **kwargs):
+    anterior = None if created else getattr(instance, "_activa_anterior", None)
+    delta = int(bool(instance.activa)) - int(bool(anterior))
+    aplicar_deltas(inscripciones_activas=delta)
+    _deltas_materia(instance.materia_id, inscriptos_activos=delta)
+
+
+@receiver(post_delete, sender=InscripcionAlumno, dispatch_uid="estadisticas_inscripcion_baja")
+def _inscripcion_post_delete(sender, instance, origin=None, **kwargs):
+    aplicar_deltas(inscripciones_activas=-int(bool(instance.activa)))
+    _deltas_materia(instance.materia_id, origin, inscriptos_activos=-int(bool(instance.activa)))
+
+
+# Después de los receivers de arriba: el próximo save de la misma instancia parte de estos valores
+for _modelo in CAMPOS_ANTERIORES:
+    post_save.connect(_recordar, sender=_modelo, dispatch_uid=f"estadisticas_recordar_save_{_modelo.__name__}")
@@ -0,0 +1,215 @@
+"""
+Utilidades para leer y mantener los contadores de EstadisticasGenerales y
+los resúmenes por materia de EstadisticasMateria
+"""
+from decimal import Decimal
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .models import EstadisticasGenerales, EstadisticasMateria
+
+FILA_ID = 1
+
+
+def reconstruir():
+    """
+    Recalcula todos los contadores desde cero y guarda la fila única.
+    Es la única operación que recorre las tablas completas.
+    """
+    from alumnos.models import Alumno, InscripcionAlumno
+    from carreras.models import Carrera
+    from materias.models import Materia
+    from notas.models import Nota, NOTA_APROBACION
+    from usuarios.models import RegistroUsuario
+
+    valores = {
+        "alumnos": Alumno.objects.count(),
+        "carreras": Carrera.objects.count(),
+        "materias": Materia.objects.count(),
+        "notas": Nota.objects.count(),
+        "notas_aprobadas": Nota.objects.filter(nota__gte=NOTA_APROBACION).count(),
+        "registros_pendientes": RegistroUsuario.objects.filter(estado="PENDIENTE").count(),
+        "inscripciones_activas": InscripcionAlumno.objects.filter(activa=True).count(),
+        # Un recálculo invalida cualquier ETag previo del catálogo
+        "catalogo_actualizado_en": timezone.now(),
+    }
+    with transaction.atomic():
+        estadisticas, _ = EstadisticasGenerales.objects.update_or_create(pk=FILA_ID, defaults=valores)
+    return estadisticas
+
+
+def obtener():
+    """Devuelve la fila de contadores; la construye si todavía no existe"""
+    estadisticas = EstadisticasGenerales.objects.filter(pk=FILA_ID).first()
+    if estadisticas is None:
+        estadisticas = reconstruir()
+    return estadisticas
+
+
+def aplicar_deltas(**deltas):
+    """
+    Suma los deltas a los contadores con un único UPDATE atómico, ej:
+    aplicar_deltas(notas=3, notas_aprobadas=2).
+    Las cargas masivas (bulk_create/update) no disparan señales y deben llamarla directamente.
+
+    Dentro de una transacción el UPDATE se hace recién al confirmarla (on_commit): la fila
+    única de contadores no queda bloqueada durante la transacción del llamador, que si no
+    serializaría todas las escrituras, y un rollback descarta los deltas junto con los datos.
+    Si el proceso se corta entre el commit y el UPDATE, reconstruir() repara los contadores.
+    """
+    cambios = {campo: valor for campo, valor in deltas.items() if valor}
+    if cambios:
+        transaction.on_commit(partial(_sumar, cambios))
+
+
+def _sumar(cambios):
+    with transaction.atomic():
+        actualizadas = EstadisticasGenerales.objects.filter(pk=FILA_ID).update(
+            actualizado_en=timezone.now(), **{campo: F(campo) + valor for campo, valor in cambios.items()}
+        )
+        if not actualizadas:
+            # Primera vez: el recálculo ya incluye el cambio que disparó el delta
+            reconstruir()
+
+
+def marcar_catalogo_modificado():
+    """
+    Incrementa la versión del catálogo. La llaman las señales de Carrera, Materia,
+    AsignacionDocente y Personal; los UPDATE masivos sobre esas tablas deben llamarla a mano.
+    Como aplicar_deltas, se aplica al confirmar la transacción: un ETag nuevo nunca
+    anuncia datos que todavía no se ven.
+    """
+    transaction.on_commit(_nueva_version_catalogo)
+
+
+def _nueva_version_catalogo():
+    with transaction.atomic():
+        actualizadas = EstadisticasGenerales.objects.filter(pk=FILA_ID).update(
+            catalogo_version=F("catalogo_version") + 1, catalogo_actualizado_en=timezone.now()
+        )
+        if not actualizadas:
+            reconstruir()
+
+
+def _estadisticas_de(request):
+    # etag_func y last_modified_func se llaman en el mismo request: una sola lectura
+    estadisticas = getattr(request, "_estadisticas_catalogo", None)
+    if estadisticas is None:
+        estadisticas = obtener()
+        request._estadisticas_catalogo = estadisticas
+    return estadisticas
+
+
+def etag_catalogo(request, *args, **kwargs):
+    # Firma compatible con django.views.decorators.http.condition
+    estadisticas = _estadisticas_de(request)
+    marca = estadisticas.catalogo_actualizado_en.timestamp() if estadisticas.catalogo_actualizado_en else 0
+    return f"catalogo-{estadisticas.catalogo_version}-{marca:.6f}"
+
+
+def ultima_modificacion_catalogo(request, *args, **kwargs):
+    return _estadisticas_de(request).catalogo_actualizado_en
+
+
+# Estadísticas por materia
+
+CAMPOS_MATERIA = ["notas", "suma_notas", "aprobadas", "inscriptos_activos"] + [
+    f"histograma_{n}" for n in range(1, 11)
+]
+
+
+def _rango_histograma(nota):
+    return min(max(int(nota), 1), 10)
+
+
+def deltas_nota(nota, signo=1):
+    """Deltas de EstadisticasMateria que produce agregar (signo=1) o quitar (signo=-1) una nota"""
+    from notas.models import NOTA_APROBACION
+
+    if nota is None:
+        return {}
+    return {
+        "notas": signo,
+        "suma_notas": signo * Decimal(nota),
+        "aprobadas": signo * int(nota >= NOTA_APROBACION),
+        f"histograma_{_rango_histograma(nota)}": signo,
+    }
+
+
+def sumar_deltas(*grupos):
+    total = {}
+    for deltas in grupos:
+        for campo, valor in deltas.items():
+            total[campo] = total.get(campo, 0) + valor
+    return total
+
+
+def reconstruir_materias(materia_ids=None):
+    """
+    Recalcula EstadisticasMateria de las materias indicadas (todas si es None) con
+    una consulta agrupada sobre notas y otra sobre inscripciones. Devuelve cuántas filas escribió.
+    """
+    from alumnos.models import InscripcionAlumno
+    from materias.models import Materia
+    from notas.models import Nota, NOTA_APROBACION
+
+    materias = Materia.objects.order_by()
+    notas = Nota.objects.order_by()
+    inscripciones = InscripcionAlumno.objects.filter(activa=True).order_by()
+    if materia_ids is not None:
+        materias = materias.filter(pk__in=materia_ids)
+        notas = notas.filter(materia_id__in=materia_ids)
+        inscripciones = inscripciones.filter(materia_id__in=materia_ids)
+
+    histograma = {
+        f"histograma_{n}": Count("id", filter=Q(nota__gte=n, nota__lt=n + 1) if n < 10 else Q(nota__gte=n))
+        for n in range(1, 11)
+    }
+    por_materia = {
+        fila.pop("materia_id"): fila
+        for fila in notas.values("materia_id").annotate(
+            notas=Count("id"),
+            suma_notas=Sum("nota"),
+            aprobadas=Count("id", filter=Q(nota__gte=NOTA_APROBACION)),
+            **histograma,
+        )
+    }
+    inscriptos = dict(inscripciones.values("materia_id").annotate(n=Count("id")).values_list("materia_id", "n"))
+
+    filas = []
+    for materia_id in materias.values_list("pk", flat=True):
+        resumen = por_materia.get(materia_id, {})
+        resumen["suma_notas"] = resumen.get("suma_notas") or 0
+        filas.append(EstadisticasMateria(
+            materia_id=materia_id, inscriptos_activos=inscriptos.get(materia_id, 0), **resumen
+        ))
+    with transaction.atomic():
+        EstadisticasMateria.objects.bulk_create(
+            filas,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=["materia"],
+            update_fields=CAMPOS_MATERIA + ["actualizado_en"],
+        )
+    return len(filas)
+
+
+def aplicar_deltas_materia(materia_id, **deltas):
+    """
+    Suma los deltas al resumen de una materia con un único UPDATE, ej:
+    aplicar_deltas_materia(materia.id, **deltas_nota(nota.nota)).
+    Igual que aplicar_deltas, los bulk_create/update de notas e inscripciones deben llamarla a mano.
+    """
+    cambios = {campo: F(campo) + valor for campo, valor in deltas.items() if valor}
+    if not cambios:
+        return
+    # Un UPDATE solo ya es atómico: sin SAVEPOINT en el camino habitual
+    actualizadas = EstadisticasMateria.objects.filter(materia_id=materia_id).update(
+        actualizado_en=timezone.now(), **cambios
+    )
+    if not actualizadas:
+        # Sin fila todavía (materia creada con bulk_create): el recálculo ya incluye este cambio
+        reconstruir_materias([materia_id])
@@ -0,0 +1,132 @@
+"""
+Perfil de base de datos según variables de entorno (DB_MOTOR y las DB_*).
+
+- DB_MOTOR=sqlite (por defecto): el archivo db.sqlite3 con WAL, transacciones
+  IMMEDIATE (toman el lock de escritura al empezar, así dos escritores esperan
+  el `timeout` en vez de fallar con "database is locked" al pasar de lectura a
+  escritura) y conexiones persistentes. Los PRAGMA van en `init_command` y
+  corren una vez por conexión, no en cada request. Incluye el alias de sólo
+  lectura (DB_LECTURA).
+- DB_MOTOR=postgres: PostgreSQL con psycopg. Con DB_POOL_MAX usa el pool de
+  psycopg (requiere `psycopg[pool]`); si no, conexiones persistentes
+  (DB_CONN_MAX_AGE) con health checks. DB_LECTURA_HOST agrega una réplica
+  como alias de lectura.
+
+`python manage.py benchmark_db` mide el perfil activo.
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+SQLITE = "sqlite"
+POSTGRES = "postgres"
+
+PRAGMAS_SQLITE = "PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL"
+
+
+def _entero(entorno, nombre, defecto):
+    valor = entorno.get(nombre, "")
+    return int(valor) if valor.strip() else defecto
+
+
+def _sqlite(base_dir, entorno, alias_lectura):
+    archivo = base_dir / entorno.get("DB_NOMBRE", "db.sqlite3")
+    conn_max_age = _entero(entorno, "DB_CONN_MAX_AGE", 60)
+    return {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": archivo,
+            "OPTIONS": {
+                "timeout": 60,
+                "transaction_mode": "IMMEDIATE",
+                "init_command": PRAGMAS_SQLITE,
+            },
+            "CONN_MAX_AGE": conn_max_age,
+            "CONN_HEALTH_CHECKS": conn_max_age != 0,
+        },
+        # El mismo archivo en sólo lectura para los GET de la API (gestion_educativa/routers.py).
+        # Con WAL lee sin esperar a las escrituras; no puede cambiar el journal_mode, lo hereda del archivo.
+        alias_lectura: {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": archivo.as_uri() + "?mode=ro",
+            "OPTIONS": {
+                "timeout": 60,
+            },
+            "CONN_MAX_AGE": conn_max_age,
+            "CONN_HEALTH_CHECKS": conn_max_age != 0,
+            "TEST": {
+                "MIRROR": "default",
+            },
+        },
+    }
+
+
+def _postgres(entorno, alias_lectura):
+    pool_max = _entero(entorno, "DB_POOL_MAX", 0)
+    base = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": entorno.get("DB_NOMBRE", "gestion_academica"),
+        "USER": entorno.get("DB_USUARIO", "postgres"),
+        "PASSWORD": entorno.get("DB_CLAVE", ""),
+        "HOST": entorno.get("DB_HOST", "localhost"),
+        "PORT": entorno.get("DB_PUERTO", "5432"),
+        "OPTIONS": {},
+    }
+    if pool_max:
+        # El pool reemplaza a las conexiones persistentes: Django exige CONN_MAX_AGE = 0
+        base["OPTIONS"]["pool"] = {"min_size": _entero(entorno, "DB_POOL_MIN", 2), "max_size": pool_max}
+        base["CONN_MAX_AGE"] = 0
+    else:
+        base["CONN_MAX_AGE"] = _entero(entorno, "DB_CONN_MAX_AGE", 60)
+        base["CONN_HEALTH_CHECKS"] = True
+
+    databases = {"default": base}
+    if entorno.get("DB_LECTURA_HOST"):
+        databases[alias_lectura] = {
+            **base,
+            "OPTIONS": dict(base["OPTIONS"]),
+            "HOST": entorno["DB_LECTURA_HOST"],
+            "PORT": entorno.get("DB_LECTURA_PUERTO", base["PORT"]),
+            "TEST": {"MIRROR": "default"},
+        }
+    return databases
+
+
+def databases_desde_entorno(base_dir, alias_lectura, entorno=None):
+    entorno = os.environ if entorno is None else entorno
+    motor = entorno.get("DB_MOTOR", SQLITE).lower()
+    if motor == SQLITE:
+        return _sqlite(base_dir, entorno, alias_lectura)
+    if motor in (POSTGRES, "postgresql"):
+        return _postgres(entorno, alias_lectura)
+    raise ValueError(f"DB_MOTOR desconocido: {motor!r} (usar {SQLITE!r} o {POSTGRES!r})")
+
+
+@contextmanager
+def base_de_prueba():
+    """
+    Crea las bases de prueba del test runner (test_<nombre>) y el entorno de tests
+    (ALLOWED_HOSTS con "testserver") para los comandos de carga y benchmark, y las
+    destruye al salir: los datos sintéticos nunca tocan la base configurada. Con
+    SQLite la base de prueba es un archivo temporal (no en memoria) para que la
+    compartan los hilos, cada uno con su conexión.
+    """
+    from django.db import connections
+    from django.test.utils import (
+        setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+    )
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        for alias in connections:
+            ajustes = connections[alias].settings_dict
+            if ajustes["ENGINE"].endswith("sqlite3") and not ajustes["TEST"].get("MIRROR"):
+                ajustes["TEST"]["NAME"] = str(Path(carpeta) / f"{alias}.sqlite3")
+        setup_test_environment()
+        config = setup_databases(verbosity=0, interactive=False, serialized_aliases=set())
+        try:
+            yield
+        finally:
+            connections.close_all()
+            teardown_databases(config, verbosity=0)
+            teardown_test_environment()
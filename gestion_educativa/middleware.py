@@ -0,0 +1,183 @@
+"""
+Instrumentación de SQL por request (settings.SQL_INSTRUMENTACION).
+
+Envuelve la ejecución de consultas de todas las conexiones mientras dura el
+request y registra cantidad, tiempo total, sentencias repetidas y las más
+lentas. El resumen sale en el header Server-Timing; con
+SQL_INSTRUMENTACION_DETALLE también se agrega como bloque "_sql" a las
+respuestas JSON de tipo objeto (sólo con DEBUG o para usuarios staff). Las
+sentencias que superan SQL_LENTO_MS se escriben en un log rotativo con el
+nombre de la vista. El log lleva sólo la plantilla SQL y la cantidad de
+parámetros: los valores (DNI, emails, hashes de contraseña, claves de sesión)
+no salen del proceso.
+
+Las consultas que hace una StreamingHttpResponse al iterarse quedan fuera,
+porque ocurren después de que el middleware devolvió la respuesta.
+
+LecturaReplicaMiddleware manda las lecturas de los métodos seguros a la
+conexión de sólo lectura (ver gestion_educativa/routers.py).
+"""
+import json
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from gestion_educativa.routers import alias_lectura, fijar_lectura, restaurar_lectura, solo_lectura
+
+logger_lento = logging.getLogger("gestion_educativa.sql_lento")
+
+LENTAS_EN_DETALLE = 5
+
+
+def _configurar_log_lento():
+    archivo = Path(getattr(settings, "SQL_LENTO_ARCHIVO", Path(settings.BASE_DIR) / "logs" / "sql_lento.log"))
+    if any(getattr(h, "baseFilename", None) == str(archivo.resolve()) for h in logger_lento.handlers):
+        return
+    archivo.parent.mkdir(parents=True, exist_ok=True)
+    handler = RotatingFileHandler(
+        archivo,
+        maxBytes=getattr(settings, "SQL_LENTO_MAX_BYTES", 5 * 1024 * 1024),
+        backupCount=getattr(settings, "SQL_LENTO_BACKUPS", 3),
+        encoding="utf-8",
+    )
+    handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    logger_lento.addHandler(handler)
+    logger_lento.setLevel(logging.INFO)
+    logger_lento.propagate = False
+
+
+def _nombre_vista(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "-"
+    func = getattr(match.func, "view_class", match.func)
+    return f"{func.__module__}.{func.__qualname__}"
+
+
+class _Registro:
+    """Consultas de un request: se llena desde el execute_wrapper"""
+
+    def __init__(self):
+        self.consultas = []  # (sql, params, segundos, alias)
+
+    def envolver(self, alias):
+        def wrapper(execute, sql, params, many, context):
+            inicio = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                self.consultas.append((sql, params, time.perf_counter() - inicio, alias))
+        return wrapper
+
+    def resumen(self):
+        total = sum(c[2] for c in self.consultas)
+        repetidas = Counter((sql, repr(params)) for sql, params, _, _ in self.consultas)
+        similares = Counter(sql for sql, _, _, _ in self.consultas)
+        lentas = sorted(self.consultas, key=lambda c: c[2], reverse=True)[:LENTAS_EN_DETALLE]
+        return {
+            "consultas": len(self.consultas),
+            "tiempo_ms": round(total * 1000, 2),
+            # Misma sentencia con los mismos parámetros: candidata a cachearse o a moverse fuera de un bucle
+            "repetidas": sum(n - 1 for n in repetidas.values() if n > 1),
+            # Misma sentencia con distintos parámetros: patrón N+1
+            "similares": sum(n - 1 for n in similares.values() if n > 1),
+            "mas_lentas": [
+                {"sql": sql, "ms": round(segundos * 1000, 2), "db": alias}
+                for sql, _, segundos, alias in lentas
+            ],
+        }
+
+
+class InstrumentacionSQLMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, "SQL_INSTRUMENTACION", False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.umbral = getattr(settings, "SQL_LENTO_MS", 100) / 1000
+        self.detalle = getattr(settings, "SQL_INSTRUMENTACION_DETALLE", False)
+        _configurar_log_lento()
+
+    def __call__(self, request):
+        registro = _Registro()
+        with ExitStack() as stack:
+            for conexion in connections.all():
+                stack.enter_context(conexion.execute_wrapper(registro.envolver(conexion.alias)))
+            response = self.get_response(request)
+
+        for sql, params, segundos, alias in registro.consultas:
+            if segundos >= self.umbral:
+                logger_lento.info(
+                    "%.1fms %s %s %s [%s] %s (%d parámetros)",
+                    segundos * 1000, _nombre_vista(request), request.method, request.path, alias, sql,
+                    len(params or ()),
+                )
+
+        resumen = registro.resumen()
+        mas_lenta = resumen["mas_lentas"][0]["ms"] if resumen["mas_lentas"] else 0
+        response["Server-Timing"] = (
+            f'db;dur={resumen["tiempo_ms"]};desc="{resumen["consultas"]} consultas", '
+            f'db-max;dur={mas_lenta};desc="consulta mas lenta", '
+            f'db-rep;desc="{resumen["repetidas"]} repetidas, {resumen["similares"]} similares"'
+        )
+        if self.detalle and self._puede_ver_detalle(request):
+            self._agregar_detalle(response, resumen)
+        return response
+
+    @staticmethod
+    def _puede_ver_detalle(request):
+        user = getattr(request, "user", None)
+        return settings.DEBUG or bool(user is not None and user.is_authenticated and user.is_staff)
+
+    @staticmethod
+    def _agregar_detalle(response, resumen):
+        if response.streaming or "application/json" not in response.get("Content-Type", ""):
+            return
+        try:
+            data = json.loads(response.content)
+        except ValueError:
+            return
+        if not isinstance(data, dict):
+            return
+        data["_sql"] = resumen
+        response.content = json.dumps(data)
+        if response.has_header("Content-Length"):
+            response["Content-Length"] = str(len(response.content))
+
+
+class LecturaReplicaMiddleware:
+    METODOS_SEGUROS = ("GET", "HEAD", "OPTIONS")
+
+    def __init__(self, get_response):
+        if alias_lectura() is None:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.vistas = tuple(getattr(settings, "DB_LECTURA_VISTAS", ("api.",)))
+
+    def __call__(self, request):
+        token = fijar_lectura(False)
+        try:
+            response = self.get_response(request)
+        finally:
+            restaurar_lectura(token)
+        if getattr(request, "_db_lectura", False) and response.streaming:
+            response.streaming_content = self._iterar_en_lectura(response.streaming_content)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method in self.METODOS_SEGUROS and view_func.__module__.startswith(self.vistas):
+            request._db_lectura = True
+            fijar_lectura(True)
+        return None
+
+    @staticmethod
+    def _iterar_en_lectura(contenido):
+        # Los exports consultan mientras se envía la respuesta, después de __call__
+        with solo_lectura():
+            yield from contenido
@@ -0,0 +1,72 @@
+"""
+Ruteo de lecturas a la conexión de sólo lectura (settings.DB_LECTURA).
+
+Las escrituras van siempre a `default`. Las lecturas van al alias de lectura
+sólo con el modo lectura activo: dentro de `solo_lectura()` o mientras
+LecturaReplicaMiddleware atiende un GET/HEAD/OPTIONS de las vistas de
+settings.DB_LECTURA_VISTAS (incluida la iteración de los exports en
+streaming). Si hay una
+transacción abierta en `default`, las lecturas se quedan ahí para ver lo que
+esa transacción escribió. Sesiones, usuarios y registros (APPS_EN_DEFAULT) se
+leen siempre de `default`: con una réplica real, el retraso de replicación no
+debe dejar afuera a quien acaba de iniciar sesión o ser aprobado.
+
+Hoy el alias de lectura es el mismo archivo SQLite abierto con `mode=ro`
+(con WAL lee sin bloquear a los escritores); puede apuntar a una réplica real
+cambiando sólo DATABASES.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_en_lectura = ContextVar("db_solo_lectura", default=False)
+
+APPS_EN_DEFAULT = frozenset({"sessions", "auth", "usuarios"})
+
+
+def alias_lectura():
+    alias = getattr(settings, "DB_LECTURA", None)
+    return alias if alias in settings.DATABASES else None
+
+
+def fijar_lectura(activa):
+    """Activa o desactiva el ruteo a lectura; devuelve el token para restaurar_lectura()"""
+    return _en_lectura.set(activa)
+
+
+def restaurar_lectura(token):
+    _en_lectura.reset(token)
+
+
+@contextmanager
+def solo_lectura():
+    token = fijar_lectura(True)
+    try:
+        yield
+    finally:
+        restaurar_lectura(token)
+
+
+class LecturaEscrituraRouter:
+    def db_for_read(self, model, **hints):
+        alias = alias_lectura()
+        if model._meta.app_label in APPS_EN_DEFAULT:
+            return DEFAULT_DB_ALIAS
+        if alias and _en_lectura.get() and not connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return alias
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Los dos alias son la misma base: un objeto leído de uno se puede relacionar con uno del otro
+        bases = {DEFAULT_DB_ALIAS, alias_lectura()}
+        if obj1._state.db in bases and obj2._state.db in bases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -11,8 +11,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
-from django.db.backends.signals import connection_created
-from django.dispatch import receiver
+
+from gestion_educativa.basedatos import databases_desde_entorno
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -53,11 +53,14 @@ INSTALLED_APPS = [
     'notas',
     'personas',
     'usuarios',
+    'estadisticas',
 ]
 CRISPY_TEMPLATE_PACK = 'bootstrap5'
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Sólo activo con SQL_INSTRUMENTACION = True
+    'gestion_educativa.middleware.InstrumentacionSQLMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -65,6 +68,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Lecturas de los GET de la API a la conexión de sólo lectura (DB_LECTURA)
+    'gestion_educativa.middleware.LecturaReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'gestion_educativa.urls'
@@ -92,16 +97,13 @@ WSGI_APPLICATION = 'gestion_educativa.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-        'OPTIONS': {
-            'timeout': 60,
-        },
-        'CONN_MAX_AGE': 0,
-    }
-}
+# Perfil según DB_MOTOR y las variables DB_* (ver gestion_educativa/basedatos.py)
+DB_LECTURA = 'lectura'
+DATABASES = databases_desde_entorno(BASE_DIR, DB_LECTURA)
+
+DATABASE_ROUTERS = ['gestion_educativa.routers.LecturaEscrituraRouter']
+# Módulos cuyas vistas leen de DB_LECTURA en los métodos seguros
+DB_LECTURA_VISTAS = ['api.']
 
 
 # Password validation
@@ -143,10 +145,10 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
- # Autenticación por DNI además del backend por defecto
+ # Autenticación por DNI. DNIBackend extiende ModelBackend y también resuelve por username,
+ # así que no hace falta el backend por defecto (evitaba una segunda búsqueda en cada login fallido)
 AUTHENTICATION_BACKENDS = [
     'usuarios.backends.DNIBackend',
-    'django.contrib.auth.backends.ModelBackend',
 ]
 
 # CORS/CSRF para SPA (Vite por defecto corre en 5173)
@@ -191,12 +193,23 @@ REST_FRAMEWORK = {
     ],
 }
 
-@receiver(connection_created)
-def _enable_sqlite_wal(sender, connection, **kwargs):
-    if connection.vendor == 'sqlite':
-        try:
-            cur = connection.cursor()
-            cur.execute('PRAGMA journal_mode=WAL;')
-            cur.execute('PRAGMA synchronous=NORMAL;')
-        except Exception:
-            pass
+# Inscripciones a materias en modo cola: alumnos/inscribir sólo encola la solicitud y
+# responde con un ticket; `python manage.py procesar_inscripciones` asigna los cupos por lotes.
+INSCRIPCIONES_EN_COLA = False
+INSCRIPCIONES_POLITICA = 'orden'  # 'orden' (llegada) o 'sorteo' (aleatorio dentro de cada ventana)
+INSCRIPCIONES_VENTANA_SORTEO = 60  # segundos
+# Sin cupo, el alumno queda en lista de espera y recibe el próximo cupo que se libere
+INSCRIPCIONES_LISTA_ESPERA = True
+
+# Instrumentación de SQL por request (gestion_educativa.middleware): header Server-Timing
+# y log rotativo de consultas lentas. SQL_INSTRUMENTACION_DETALLE agrega el bloque "_sql"
+# a las respuestas JSON (sólo con DEBUG o para staff).
+SQL_INSTRUMENTACION = False
+SQL_INSTRUMENTACION_DETALLE = False
+SQL_LENTO_MS = 100
+SQL_LENTO_ARCHIVO = BASE_DIR / 'logs' / 'sql_lento.log'
+SQL_LENTO_MAX_BYTES = 5 * 1024 * 1024
+SQL_LENTO_BACKUPS = 3
+
+# Snapshot columnar de notas para la analítica con NumPy (estadisticas/analitica.py)
+ANALITICA_DIR = BASE_DIR / 'analitica'
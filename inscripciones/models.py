@@ -16,6 +16,7 @@ class InscripcionCarrera(models.Model):
     class Meta:
         unique_together = ("alumno", "carrera")  # evita inscripciones duplicadas
         ordering = ["-fecha_inscripcion"]
+        indexes = [models.Index(fields=["fecha_inscripcion"], name="insc_carrera_fecha_idx")]
 
     def __str__(self):
         return f"{self.alumno} → {self.carrera}"
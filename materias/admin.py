@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Materia
+from .models import HorarioMateria, Materia
 from personal.models import AsignacionDocente
 
 class AsignacionDocenteInline(admin.TabularInline):
@@ -8,13 +8,19 @@ class AsignacionDocenteInline(admin.TabularInline):
     autocomplete_fields = ['docente']
     fields = ['docente']
 
+class HorarioMateriaInline(admin.TabularInline):
+    # Se generan a partir del texto del horario; acá se corrigen los que no se pudieron interpretar
+    model = HorarioMateria
+    extra = 0
+    fields = ['dia', 'inicio', 'fin']
+
 @admin.register(Materia)
 class MateriaAdmin(admin.ModelAdmin):
     list_display = ['nombre', 'carrera', 'cupo', 'horario', 'docentes_asignados']
     list_filter = ['carrera']
     search_fields = ['nombre', 'carrera__nombre']
     ordering = ['carrera__nombre', 'nombre']
-    inlines = [AsignacionDocenteInline]
+    inlines = [HorarioMateriaInline, AsignacionDocenteInline]
     
     def docentes_asignados(self, obj):
         return ", ".join([str(asignacion.docente) for asignacion in obj.docentes.all()])
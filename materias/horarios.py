@@ -0,0 +1,200 @@
+"""
+Horarios estructurados de las materias y detección de superposiciones.
+
+Materia.horario sigue siendo el texto que se muestra; al guardarlo se interpreta
+con parsear_horario() y se regeneran sus franjas (día, inicio, fin) en
+HorarioMateria. `python manage.py migrar_horarios` hace lo mismo con las
+materias ya cargadas.
+
+Agenda guarda las franjas de un alumno por día, ordenadas por inicio y sin
+superponerse entre sí (si los datos viejos traen superposiciones, se fusionan
+al cargarlas). Como entonces los fines también quedan ordenados, una franja
+nueva choca con la agenda sólo si choca con la última que empieza antes de su
+fin, y esa se encuentra con una búsqueda binaria: O(log n) por franja. Las
+franjas del alumno se traen con una sola consulta de (día, inicio, fin), sin
+cargar sus materias.
+"""
+import re
+import unicodedata
+from bisect import bisect_left, bisect_right
+from datetime import time
+
+DIAS = [
+    (0, "Lunes"),
+    (1, "Martes"),
+    (2, "Miércoles"),
+    (3, "Jueves"),
+    (4, "Viernes"),
+    (5, "Sábado"),
+    (6, "Domingo"),
+]
+
+# Nombres y abreviaturas habituales (sin tildes) -> número de día
+_NOMBRES_DIA = {
+    "lunes": 0, "lun": 0, "lu": 0,
+    "martes": 1, "mar": 1, "ma": 1,
+    "miercoles": 2, "mier": 2, "mie": 2, "mi": 2,
+    "jueves": 3, "jue": 3, "ju": 3,
+    "viernes": 4, "vie": 4, "vi": 4,
+    "sabado": 5, "sab": 5, "sa": 5,
+    "domingo": 6, "dom": 6, "do": 6,
+}
+_DIA = re.compile(r"\b(" + "|".join(sorted(_NOMBRES_DIA, key=len, reverse=True)) + r")\b\.?")
+# "8-10", "08:00 a 10:30", "18.30 hs - 20 hs", "14h a 16h"
+_RANGO = re.compile(
+    r"\b(\d{1,2})(?:[:.h](\d{2}))?\s*(?:hs?\.?)?\s*(?:-|–|\ba\b|\bal\b|\bhasta\b)\s*"
+    r"(\d{1,2})(?:[:.h](\d{2}))?(?:\s*hs?\b\.?)?"
+)
+# Lo único que puede haber entre dos días para que sea un rango ("lunes a viernes", "lu-vi")
+_ENTRE_RANGO_DIAS = re.compile(r"^\s*(?:-|–|a|al|hasta)\s*$")
+# Lo que puede separar dos rangos horarios del mismo día ("8-10 y 14-16", "8-10, de 14 a 16")
+_ENTRE_RANGOS = re.compile(r"^\s*(?:[,;/]|\by\b|\be\b)?\s*(?:\bde\b)?\s*$")
+
+
+def _normalizar(texto):
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(c for c in texto if not unicodedata.combining(c))
+
+
+def _hora(horas, minutos):
+    horas, minutos = int(horas), int(minutos or 0)
+    if horas > 23 or minutos > 59:
+        return None
+    return time(horas, minutos)
+
+
+def _dias(tramo):
+    """Días mencionados en un tramo de texto, expandiendo rangos como "lunes a viernes" """
+    encontrados = list(_DIA.finditer(tramo))
+    dias = []
+    for i, encontrado in enumerate(encontrados):
+        dia = _NOMBRES_DIA[encontrado.group(1)]
+        anterior = encontrados[i - 1] if i else None
+        if anterior and _ENTRE_RANGO_DIAS.match(tramo[anterior.end():encontrado.start()]):
+            desde = _NOMBRES_DIA[anterior.group(1)]
+            dias.extend(range(desde + 1, dia + 1))
+        else:
+            dias.append(dia)
+    return dias
+
+
+def _con_marca_horaria(rango):
+    # "18:00", "10.30", "14hs": sin esto, "N - M" sólo es un horario si le sigue a un día
+    return bool(rango.group(2) or rango.group(4) or "h" in rango.group(0))
+
+
+def parsear_horario(texto):
+    """
+    Interpreta el texto libre de Materia.horario y devuelve las franjas
+    [(día, inicio, fin)] ordenadas, ej. "Lunes y Miércoles 18:00 a 20:00" ->
+    [(0, 18:00, 20:00), (2, 18:00, 20:00)]. Cada rango horario se aplica a los
+    días nombrados antes que él (o a los del rango anterior, como en
+    "Martes 8-10 y 14-16"). Un "N - M" sin minutos ni "hs" que no sigue a un día
+    ni a otro rango se ignora, ej. el "2 - 3" de "Lunes 10 a 12, aula 2 - 3".
+    Devuelve [] si no hay días y rangos reconocibles, ej. "08:00" o "a definir".
+    """
+    texto = _normalizar(texto or "")
+    franjas = set()
+    dias = []
+    desde = 0
+    for rango in _RANGO.finditer(texto):
+        tramo = texto[desde:rango.start()]
+        desde = rango.end()
+        dias_tramo = _dias(tramo)
+        if not dias_tramo and not _con_marca_horaria(rango) and not _ENTRE_RANGOS.match(tramo):
+            continue
+        dias = dias_tramo or dias
+        inicio, fin = _hora(*rango.group(1, 2)), _hora(*rango.group(3, 4))
+        if inicio is None or fin is None or fin <= inicio:
+            continue
+        franjas.update((dia, inicio, fin) for dia in dias)
+    return sorted(franjas)
+
+
+class Agenda:
+    """Franjas ocupadas de un alumno; ver el docstring del módulo"""
+
+    def __init__(self):
+        # día -> (inicios, [(inicio, fin, etiqueta)]) en paralelo y ordenados por inicio
+        self._dias = {}
+
+    def choque(self, franjas):
+        """Etiqueta (nombre de materia) de la primera franja ocupada que se superpone, o None"""
+        for dia, inicio, fin in franjas:
+            inicios, ocupadas = self._dias.get(dia, ((), ()))
+            i = bisect_left(inicios, fin) - 1
+            if i >= 0 and ocupadas[i][1] > inicio:
+                return ocupadas[i][2]
+        return None
+
+    def agregar(self, franjas, etiqueta):
+        for dia, inicio, fin in franjas:
+            inicios, ocupadas = self._dias.setdefault(dia, ([], []))
+            # Se fusiona con las franjas que se superponen para mantener la invariante
+            desde = bisect_left(inicios, inicio)
+            if desde and ocupadas[desde - 1][1] > inicio:
+                desde -= 1
+            hasta = bisect_right(inicios, fin)
+            while hasta > desde and ocupadas[hasta - 1][0] >= fin:
+                hasta -= 1
+            if hasta > desde:
+                etiqueta_fusion = ocupadas[desde][2]
+                inicio = min(inicio, ocupadas[desde][0])
+                fin = max(fin, ocupadas[hasta - 1][1])
+            else:
+                etiqueta_fusion = etiqueta
+            inicios[desde:hasta] = [inicio]
+            ocupadas[desde:hasta] = [(inicio, fin, etiqueta_fusion)]
+
+    def __len__(self):
+        return sum(len(inicios) for inicios, _ in self._dias.values())
+
+
+def agenda_alumno(alumno_id, materia_ids):
+    """
+    Con una sola consulta devuelve (agenda, franjas_pedidas): la Agenda con las franjas
+    de las materias en las que el alumno está inscripto (activa) y {materia_id: [franjas]}
+    de las materias pedidas.
+    """
+    from alumnos.models import InscripcionAlumno
+    from django.db.models import Exists, OuterRef, Q
+
+    from .models import HorarioMateria
+
+    materia_ids = {int(m) for m in materia_ids}
+    inscripciones = InscripcionAlumno.objects.filter(alumno_id=alumno_id, activa=True)
+    filas = (
+        # Dos IN que resuelven los índices (materias pedidas e inscripciones del alumno), sin recorrer la tabla
+        HorarioMateria.objects.filter(
+            Q(materia_id__in=materia_ids) | Q(materia_id__in=inscripciones.values("materia_id"))
+        )
+        .annotate(inscripta=Exists(inscripciones.filter(materia_id=OuterRef("materia_id"))))
+        .order_by("dia", "inicio")
+        .values_list("materia_id", "materia__nombre", "dia", "inicio", "fin", "inscripta")
+    )
+    agenda = Agenda()
+    pedidas = {}
+    for materia_id, nombre, dia, inicio, fin, es_inscripta in filas:
+        if es_inscripta:
+            agenda.agregar([(dia, inicio, fin)], nombre)
+        if materia_id in materia_ids:
+            pedidas.setdefault(materia_id, []).append((dia, inicio, fin))
+    return agenda, pedidas
+
+
+def agendas_alumnos(alumno_ids, dias):
+    """{alumno_id: Agenda} con las franjas de los días indicados, en una sola consulta (modo cola)"""
+    from alumnos.models import InscripcionAlumno
+
+    agendas = {alumno_id: Agenda() for alumno_id in alumno_ids}
+    filas = (
+        InscripcionAlumno.objects.filter(alumno_id__in=alumno_ids, activa=True, materia__horarios__dia__in=dias)
+        .order_by()
+        .values_list(
+            "alumno_id", "materia__nombre", "materia__horarios__dia",
+            "materia__horarios__inicio", "materia__horarios__fin",
+        )
+    )
+    for alumno_id, nombre, dia, inicio, fin in filas:
+        agendas[alumno_id].agregar([(dia, inicio, fin)], nombre)
+    return agendas
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from materias.horarios import parsear_horario
+from materias.models import HorarioMateria, Materia
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera las franjas estructuradas (HorarioMateria) interpretando el texto del horario "
+        "de las materias existentes e informa los que no se pudieron interpretar"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reemplazar", action="store_true",
+            help="Regenera también las materias que ya tienen franjas (por defecto se saltean)",
+        )
+
+    def handle(self, *args, **options):
+        materias = Materia.objects.order_by("id").exclude(horario="")
+        if not options["reemplazar"]:
+            materias = materias.filter(horarios__isnull=True)
+        franjas = []
+        migradas = []
+        sin_interpretar = []
+        for materia_id, nombre, horario in materias.values_list("id", "nombre", "horario"):
+            parseadas = parsear_horario(horario)
+            if not parseadas:
+                sin_interpretar.append((materia_id, nombre, horario))
+                continue
+            migradas.append(materia_id)
+            franjas.extend(
+                HorarioMateria(materia_id=materia_id, dia=dia, inicio=inicio, fin=fin)
+                for dia, inicio, fin in parseadas
+            )
+        with transaction.atomic():
+            if options["reemplazar"]:
+                HorarioMateria.objects.filter(materia_id__in=migradas).delete()
+            HorarioMateria.objects.bulk_create(franjas, batch_size=1000)
+
+        for materia_id, nombre, horario in sin_interpretar:
+            self.stdout.write(f"Sin interpretar: materia {materia_id} {nombre!r}: {horario!r}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(franjas)} franjas creadas para {len(migradas)} materia(s); "
+            f"{len(sin_interpretar)} horario(s) sin interpretar (cargar sus franjas desde el admin)"
+        ))
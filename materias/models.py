@@ -1,6 +1,8 @@
-from django.db import models
+from django.db import models, transaction
 from carreras.models import Carrera
 
+from .horarios import DIAS, parsear_horario
+
 class Materia(models.Model):
     nombre = models.CharField(max_length=120)
     horario = models.CharField(max_length=120, blank=True)
@@ -13,3 +15,55 @@ class Materia(models.Model):
 
     def __str__(self):
         return f"{self.nombre} ({self.carrera})"
+
+    def save(self, *args, **kwargs):
+        # Si cambia el texto del horario se regeneran sus franjas estructuradas (HorarioMateria);
+        # si se amplía el cupo, los nuevos lugares van a la lista de espera
+        update_fields = kwargs.get("update_fields")
+        revisar_horario = update_fields is None or "horario" in update_fields
+        revisar_cupo = update_fields is None or "cupo" in update_fields
+        horario_anterior = cupo_anterior = None
+        if (revisar_horario or revisar_cupo) and not self._state.adding:
+            horario_anterior, cupo_anterior = (
+                Materia.objects.filter(pk=self.pk).values_list("horario", "cupo").first() or (None, None)
+            )
+        super().save(*args, **kwargs)
+        if revisar_horario and (self.horario or "") != (horario_anterior or ""):
+            self.sincronizar_horarios()
+        if revisar_cupo and cupo_anterior is not None and (self.cupo or 0) > cupo_anterior:
+            self.promover_lista_espera()
+
+    def promover_lista_espera(self):
+        """Asigna los cupos libres a la lista de espera y actualiza self.cupo con lo que quedó"""
+        from alumnos.asignacion import promover_lista_espera
+
+        with transaction.atomic():
+            if promover_lista_espera(self.pk):
+                self.cupo = Materia.objects.filter(pk=self.pk).values_list("cupo", flat=True).get()
+
+    def sincronizar_horarios(self):
+        """Reemplaza las franjas de la materia por las que resultan de interpretar `horario`"""
+        HorarioMateria.objects.filter(materia=self).delete()
+        HorarioMateria.objects.bulk_create([
+            HorarioMateria(materia=self, dia=dia, inicio=inicio, fin=fin)
+            for dia, inicio, fin in parsear_horario(self.horario)
+        ])
+
+
+class HorarioMateria(models.Model):
+    """Franja semanal de cursada de una materia; la usan los chequeos de superposición al inscribir"""
+    materia = models.ForeignKey(Materia, on_delete=models.CASCADE, related_name="horarios")
+    dia = models.PositiveSmallIntegerField(choices=DIAS)
+    inicio = models.TimeField()
+    fin = models.TimeField()
+
+    class Meta:
+        ordering = ["materia", "dia", "inicio"]
+        constraints = [
+            models.CheckConstraint(condition=models.Q(fin__gt=models.F("inicio")), name="horario_fin_posterior_inicio"),
+        ]
+        verbose_name = "Horario de Materia"
+        verbose_name_plural = "Horarios de Materias"
+
+    def __str__(self):
+        return f"{self.get_dia_display()} {self.inicio:%H:%M}-{self.fin:%H:%M}"  # type: ignore[attr-defined]
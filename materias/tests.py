@@ -1,3 +1,146 @@
-from django.test import TestCase
+from datetime import time
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from alumnos import asignacion
+from alumnos.models import Alumno, InscripcionAlumno, SolicitudInscripcion
+from carreras.models import Carrera
+
+from .horarios import Agenda, parsear_horario
+from .models import HorarioMateria, Materia
+
+
+class ParsearHorarioTests(SimpleTestCase):
+    def test_formatos(self):
+        casos = {
+            "Lunes y Miércoles 18:00 a 20:00": [(0, time(18), time(20)), (2, time(18), time(20))],
+            "Lun-Mie 8-10": [(0, time(8), time(10)), (1, time(8), time(10)), (2, time(8), time(10))],
+            "Martes 8-10 y 14-16": [(1, time(8), time(10)), (1, time(14), time(16))],
+            "Mar 14hs a 16hs; Jue 10.30-12.30": [(1, time(14), time(16)), (3, time(10, 30), time(12, 30))],
+            "Sábado de 9 a 13 hs": [(5, time(9), time(13))],
+            "Lunes 8-10, 14-16": [(0, time(8), time(10)), (0, time(14), time(16))],
+            # Números que no son horas: sólo cuentan los rangos con día delante o con marca horaria
+            "Lunes 10 a 12, aula 2 - 3": [(0, time(10), time(12))],
+            "Jueves 18 a 20 (comisión 1 - 2)": [(3, time(18), time(20))],
+            "Lunes 10 a 12, aula 2 - 3; de 14:00 a 16:00": [(0, time(10), time(12)), (0, time(14), time(16))],
+        }
+        for texto, esperado in casos.items():
+            with self.subTest(texto=texto):
+                self.assertEqual(parsear_horario(texto), esperado)
+
+    def test_sin_interpretar(self):
+        for texto in ("", "08:00", "a definir", "Lunes 10-8", "Lunes 25-26"):
+            with self.subTest(texto=texto):
+                self.assertEqual(parsear_horario(texto), [])
+
+
+class AgendaTests(SimpleTestCase):
+    def test_choques_y_fusion(self):
+        agenda = Agenda()
+        agenda.agregar([(0, time(8), time(10)), (0, time(12), time(14))], "A")
+        self.assertIsNone(agenda.choque([(0, time(10), time(12))]))  # franjas contiguas no chocan
+        self.assertIsNone(agenda.choque([(1, time(8), time(10))]))
+        self.assertEqual(agenda.choque([(0, time(13), time(15))]), "A")
+        self.assertEqual(agenda.choque([(0, time(7), time(8, 30))]), "A")
+        # Datos viejos superpuestos se fusionan: la búsqueda binaria sigue encontrando el choque
+        agenda.agregar([(0, time(9), time(13))], "B")
+        self.assertEqual(len(agenda), 1)
+        self.assertEqual(agenda.choque([(0, time(13, 30), time(15))]), "A")
+
+
+class HorariosInscripcionTests(TestCase):
+    """Las franjas se derivan del texto del horario y ningún camino de inscripción acepta choques"""
+
+    @classmethod
+    def setUpTestData(cls):
+        carrera = Carrera.objects.create(nombre="Sistemas", duracion_anios=3)
+        cls.algebra = Materia.objects.create(nombre="Algebra", carrera=carrera, horario="Lunes y Miércoles 8 a 10")
+        cls.fisica = Materia.objects.create(nombre="Fisica", carrera=carrera, horario="Miércoles 9:30-11:30")
+        cls.quimica = Materia.objects.create(nombre="Quimica", carrera=carrera, horario="Lunes 10-12")
+        cls.alumno = Alumno.objects.create(nombre="Ana", apellido="Uno", dni="40000001", email="ana@example.com")
+
+    def test_save_regenera_franjas(self):
+        self.assertEqual(self.algebra.horarios.count(), 2)
+        self.algebra.horario = "Viernes 18-20"
+        self.algebra.save()
+        self.assertEqual(list(self.algebra.horarios.values_list("dia", flat=True)), [4])
+        self.algebra.horario = "a definir"
+        self.algebra.save()
+        self.assertFalse(self.algebra.horarios.exists())
+
+    def test_inscribir_rechaza_superposicion(self):
+        asignacion.inscribir(self.alumno, self.algebra.id)
+        with self.assertRaisesMessage(asignacion.HorarioSuperpuesto, "Algebra"):
+            asignacion.inscribir(self.alumno, self.fisica.id)
+        asignacion.inscribir(self.alumno, self.quimica.id)
+        self.client.force_login(self._usuario())
+        response = self.client.post("/api/alumnos/inscribir", {"materia_id": self.fisica.id})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("superpone", response.json()["detail"])
+
+    def _con_inscripcion_simultanea(self, materia):
+        # Otro pedido del alumno se confirma mientras este toma el cupo: antes el chequeo de
+        # horarios corría fuera de la transacción y ya había pasado
+        tomar_cupo = asignacion.tomar_cupo
+
+        def tomar(materia_id, **kwargs):
+            if not InscripcionAlumno.objects.filter(alumno=self.alumno, materia=materia).exists():
+                InscripcionAlumno.objects.create(alumno=self.alumno, materia=materia)
+            return tomar_cupo(materia_id, **kwargs)
+
+        return mock.patch.object(asignacion, "tomar_cupo", side_effect=tomar)
+
+    def test_inscribir_verifica_horario_dentro_de_la_transaccion(self):
+        with self._con_inscripcion_simultanea(self.algebra), \
+                self.assertRaisesMessage(asignacion.HorarioSuperpuesto, "Algebra"):
+            asignacion.inscribir(self.alumno, self.fisica.id)
+        self.fisica.refresh_from_db()
+        self.assertEqual(self.fisica.cupo, 30)
+        self.assertFalse(InscripcionAlumno.objects.filter(alumno=self.alumno, materia=self.fisica).exists())
+
+    def test_inscribir_varias_verifica_horario_dentro_de_la_transaccion(self):
+        with self._con_inscripcion_simultanea(self.algebra):
+            resultados = asignacion.inscribir_varias(self.alumno, [self.fisica.id, self.quimica.id])
+        # Fisica choca y devuelve su cupo; Quimica (lunes 10-12) es contigua a Algebra
+        self.assertEqual([r["estado"] for r in resultados], ["superpuesta", "inscripta"])
+        self.fisica.refresh_from_db()
+        self.quimica.refresh_from_db()
+        self.assertEqual((self.fisica.cupo, self.quimica.cupo), (30, 29))
+
+    def test_inscribir_varias_detecta_choques_dentro_del_pedido(self):
+        resultados = asignacion.inscribir_varias(self.alumno, [self.fisica.id, self.algebra.id, self.quimica.id])
+        self.assertEqual([r["estado"] for r in resultados], ["inscripta", "superpuesta", "inscripta"])
+        self.assertEqual(
+            set(InscripcionAlumno.objects.filter(alumno=self.alumno).values_list("materia_id", flat=True)),
+            {self.fisica.id, self.quimica.id},
+        )
+
+    @override_settings(INSCRIPCIONES_EN_COLA=True)
+    def test_modo_cola_rechaza_superposicion(self):
+        asignacion.inscribir(self.alumno, self.algebra.id)
+        solicitud, _ = asignacion.encolar(self.alumno, self.fisica.id)
+        asignacion.procesar_materia(self.fisica.id)
+        solicitud.refresh_from_db()
+        self.assertEqual(solicitud.estado, "RECHAZADA")
+        self.assertIn("Algebra", solicitud.motivo)
+        self.assertFalse(SolicitudInscripcion.objects.filter(estado="ASIGNADA").exists())
+
+    def test_migrar_horarios(self):
+        HorarioMateria.objects.all().delete()
+        Materia.objects.filter(pk=self.quimica.pk).update(horario="a definir")
+        salida = StringIO()
+        call_command("migrar_horarios", stdout=salida)
+        self.assertEqual(HorarioMateria.objects.count(), 3)
+        self.assertIn("1 horario(s) sin interpretar", salida.getvalue())
+        call_command("migrar_horarios", stdout=StringIO())
+        self.assertEqual(HorarioMateria.objects.count(), 3)
+
+    def _usuario(self):
+        from django.contrib.auth.models import User
+
+        user = User.objects.create_user(username=self.alumno.dni, password="alumno1234")
+        Alumno.objects.filter(pk=self.alumno.pk).update(user=user)
+        return user
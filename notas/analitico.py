@@ -0,0 +1,61 @@
+"""
+Resumen académico (analítico) de un alumno calculado en la base: total de
+notas, aprobadas, desaprobadas y promedio, en total y por carrera, con una
+sola consulta agrupada por carrera. Lo usan notas.views.mis_notas y el
+endpoint alumnos/me/resumen/ de la API.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db.models import Count, Q, Sum
+
+from .models import Nota, NOTA_APROBACION
+
+
+def _promedio(suma, total):
+    if not total:
+        return None
+    return (Decimal(suma) / total).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+def _resumen(total, aprobadas, suma):
+    return {
+        "total_notas": total,
+        "notas_aprobadas": aprobadas,
+        "notas_desaprobadas": total - aprobadas,
+        "promedio": _promedio(suma, total),
+    }
+
+
+def resumen_academico(alumno):
+    """
+    Devuelve {"total_notas", "notas_aprobadas", "notas_desaprobadas", "promedio",
+    "por_carrera": [{"carrera_id", "carrera", ...mismos campos}]}. El promedio es
+    un Decimal con dos decimales, o None si el alumno no tiene notas.
+    """
+    filas = list(
+        Nota.objects.filter(alumno=alumno)  # type: ignore[attr-defined]
+        .order_by()
+        .values("materia__carrera_id", "materia__carrera__nombre")
+        .annotate(
+            total=Count("id"),
+            aprobadas=Count("id", filter=Q(nota__gte=NOTA_APROBACION)),
+            suma=Sum("nota"),
+        )
+        .order_by("materia__carrera__nombre")
+    )
+    por_carrera = [
+        {
+            "carrera_id": fila["materia__carrera_id"],
+            "carrera": fila["materia__carrera__nombre"],
+            **_resumen(fila["total"], fila["aprobadas"], fila["suma"]),
+        }
+        for fila in filas
+    ]
+    # Los totales salen de sumar los grupos: no hace falta otra consulta
+    resumen = _resumen(
+        sum(c["total_notas"] for c in por_carrera),
+        sum(c["notas_aprobadas"] for c in por_carrera),
+        sum((fila["suma"] for fila in filas), Decimal(0)),
+    )
+    resumen["por_carrera"] = por_carrera
+    return resumen
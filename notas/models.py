@@ -6,6 +6,10 @@ from materias.models import Materia
 from personal.models import Personal
 from decimal import Decimal
 
+NOTA_MINIMA = Decimal("1.00")
+NOTA_MAXIMA = Decimal("10.00")
+NOTA_APROBACION = Decimal("6.00")
+
 class Nota(models.Model):
     alumno = models.ForeignKey(Alumno, on_delete=models.CASCADE, related_name="notas")
     materia = models.ForeignKey(Materia, on_delete=models.PROTECT, related_name="notas")
@@ -38,7 +42,7 @@ class Nota(models.Model):
         super().clean()
         
         # Validar que la nota esté en el rango correcto
-        if self.nota is not None and (self.nota < Decimal("1.00") or self.nota > Decimal("10.00")):
+        if self.nota is not None and (self.nota < NOTA_MINIMA or self.nota > NOTA_MAXIMA):
             raise ValidationError("La nota debe estar entre 1.00 y 10.00")
         
         # Validar que el profesor esté asignado a la materia
@@ -64,4 +68,4 @@ class Nota(models.Model):
     @property
     def esta_aprobado(self):
         """Retorna True si la nota es aprobatoria (>= 6.00)"""
-        return bool(self.nota is not None and self.nota >= Decimal("6.00"))
+        return bool(self.nota is not None and self.nota >= NOTA_APROBACION)
@@ -1,3 +1,61 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
+
+from alumnos.models import Alumno
+from carreras.models import Carrera
+from materias.models import Materia
+from personal.models import AsignacionDocente, Personal
+
+from .analitico import resumen_academico
+from .models import Nota
+
+
+class ResumenAcademicoTests(TestCase):
+    """El analítico del alumno sale de una sola consulta agrupada"""
+
+    @classmethod
+    def setUpTestData(cls):
+        docente = Personal.objects.create(
+            nombre="Ana", apellido="Docente", dni="30000000", email="ana@example.com", cargo="DOCENTE"
+        )
+        cls.user = User.objects.create_user(username="40000000", password="alumno1234")
+        cls.alumno = Alumno.objects.create(
+            nombre="Juan", apellido="Alumno", dni="40000000", email="juan@example.com", user=cls.user
+        )
+        notas = {"Sistemas": ["8.00", "5.50", "6.00"], "Quimica": ["9.25"]}
+        for nombre, valores in notas.items():
+            carrera = Carrera.objects.create(nombre=nombre, duracion_anios=3)
+            for i, valor in enumerate(valores):
+                materia = Materia.objects.create(nombre=f"{nombre} {i}", carrera=carrera)
+                AsignacionDocente.objects.create(docente=docente, materia=materia)
+                Nota.objects.create(alumno=cls.alumno, materia=materia, profesor=docente, nota=Decimal(valor))
+
+    def test_totales_y_por_carrera(self):
+        with self.assertNumQueries(1):
+            resumen = resumen_academico(self.alumno)
+        self.assertEqual(
+            (resumen["total_notas"], resumen["notas_aprobadas"], resumen["notas_desaprobadas"]), (4, 3, 1)
+        )
+        self.assertEqual(resumen["promedio"], Decimal("7.19"))
+        self.assertEqual(
+            [(c["carrera"], c["total_notas"], c["notas_aprobadas"], c["promedio"]) for c in resumen["por_carrera"]],
+            [("Quimica", 1, 1, Decimal("9.25")), ("Sistemas", 3, 2, Decimal("6.50"))],
+        )
+
+    def test_sin_notas(self):
+        otro = Alumno.objects.create(nombre="Eva", apellido="Nueva", dni="40000001", email="eva@example.com")
+        resumen = resumen_academico(otro)
+        self.assertEqual((resumen["total_notas"], resumen["promedio"], resumen["por_carrera"]), (0, None, []))
+
+    def test_vista_y_endpoint(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("notas:mis_notas"))
+        self.assertContains(response, "<strong>Promedio:</strong> 7.19")
 
-# Create your tests here.
+        response = self.client.get("/api/alumnos/me/resumen/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["promedio"], "7.19")
+        self.assertEqual(response.json()["por_carrera"][1]["promedio"], "6.50")
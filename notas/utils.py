@@ -3,8 +3,7 @@ Utilidades para el manejo de permisos y lógica de negocio de notas
 """
 from django.contrib.auth.models import User
 from django.core.exceptions import PermissionDenied
-from personal.models import Personal
-from alumnos.models import Alumno
+from usuarios.perfiles import resolver_perfil
 
 
 def get_user_profile(user):
@@ -12,22 +11,7 @@ def get_user_profile(user):
     Obtiene el perfil del usuario (Personal o Alumno)
     Retorna: (tipo, objeto) donde tipo es 'personal' o 'alumno'
     """
-    if not user.is_authenticated:
-        return None, None
-    
-    try:
-        personal = user.personal
-        return 'personal', personal
-    except Personal.DoesNotExist:
-        pass
-    
-    try:
-        alumno = user.alumno
-        return 'alumno', alumno
-    except Alumno.DoesNotExist:
-        pass
-    
-    return None, None
+    return resolver_perfil(user)
 
 
 def user_can_create_notas(user):
@@ -12,6 +12,7 @@ from .utils import (
     get_materias_for_profesor, get_notas_for_user
 )
 from .forms import FiltroNotasForm, BusquedaRapidaNotaForm
+from .analitico import resumen_academico
 from alumnos.models import Alumno
 from materias.models import Materia
 
@@ -248,22 +249,13 @@ def mis_notas(request):
         messages.error(request, "Esta vista es solo para alumnos.")
         return redirect('notas:lista_notas')
     
-    notas = perfil.notas.all().order_by('materia__nombre')
-    
-    # Calcular estadísticas
-    total_notas = notas.count()
-    notas_aprobadas = sum(1 for nota in notas if nota.esta_aprobado)
-    promedio = sum(float(nota.nota) for nota in notas) / total_notas if total_notas > 0 else 0
+    notas = perfil.notas.select_related('materia__carrera', 'profesor').order_by('materia__nombre')
     
+    # Estadísticas calculadas en la base con una sola consulta agrupada
     context = {
         'notas': notas,
         'alumno': perfil,
-        'estadisticas': {
-            'total_notas': total_notas,
-            'notas_aprobadas': notas_aprobadas,
-            'notas_desaprobadas': total_notas - notas_aprobadas,
-            'promedio': round(promedio, 2),
-        }
+        'estadisticas': resumen_academico(perfil),
     }
     
     return render(request, 'notas/mis_notas.html', context)
@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.contrib import messages
 from django.contrib.auth.models import User
 from django.contrib.auth.admin import UserAdmin
+from . import aprobacion
 from .models import RegistroUsuario
 
 @admin.register(RegistroUsuario)
@@ -13,26 +14,17 @@ class RegistroUsuarioAdmin(admin.ModelAdmin):
     actions = ['aprobar_registros', 'rechazar_registros']
 
     def aprobar_registros(self, request, queryset):
-        aprobados = 0
-        for reg in queryset:
-            try:
-                estado_prev = reg.estado
-                reg.aprobar(request.user)
-                if estado_prev != reg.estado and reg.estado == "APROBADO":
-                    aprobados += 1
-            except Exception as e:
-                self.message_user(request, f"Error aprobando {reg}: {e}", level=messages.ERROR)
-        if aprobados:
-            self.message_user(request, f"{aprobados} registro(s) aprobados correctamente.", level=messages.SUCCESS)
+        # Por lotes: usuarios, perfiles e inscripciones con bulk_create. Sin pool de procesos en el
+        # worker web (la selección es una página del admin); las cohortes grandes van por el comando
+        informe = aprobacion.aprobar_registros(queryset, request.user, procesos=1)
+        for error in informe["errores"]:
+            self.message_user(request, f"Error aprobando {error['dni']}: {error['detalle']}", level=messages.ERROR)
+        if informe["aprobados"]:
+            self.message_user(request, f"{informe['aprobados']} registro(s) aprobados correctamente.", level=messages.SUCCESS)
     aprobar_registros.short_description = "Aprobar registros seleccionados"
 
     def rechazar_registros(self, request, queryset):
-        rechazados = 0
-        for reg in queryset:
-            estado_prev = reg.estado
-            reg.rechazar(request.user)
-            if estado_prev != reg.estado and reg.estado == "RECHAZADO":
-                rechazados += 1
+        rechazados = aprobacion.rechazar_registros(queryset, request.user)
         if rechazados:
             self.message_user(request, f"{rechazados} registro(s) rechazados.", level=messages.WARNING)
     rechazar_registros.short_description = "Rechazar registros seleccionados"
@@ -64,30 +56,21 @@ class CustomUserAdmin(UserAdmin):
         Activa el usuario y, si tiene RegistroUsuario en estado PENDIENTE,
         ejecuta el flujo de aprobación (crea Alumno/Personal y marca APROBADO).
         """
-        aprobados = 0
-        sin_registro = 0
-        ya_aprobados = 0
-        for user in queryset:
-            reg = self.get_registro(user)
-            if reg is None:
-                # Si no hay registro, al menos activar el usuario
-                if not user.is_active:
-                    user.is_active = True
-                    user.save()
-                    aprobados += 1
-                else:
-                    ya_aprobados += 1
-                sin_registro += 1
-                continue
-
-            if reg.estado == "PENDIENTE":
-                try:
-                    reg.aprobar(request.user)
-                    aprobados += 1
-                except Exception as e:
-                    self.message_user(request, f"Error aprobando {user.username}: {e}", level=messages.ERROR)
-            else:
-                ya_aprobados += 1
+        sin_registro_qs = queryset.filter(registro__isnull=True)
+        sin_registro = sin_registro_qs.count()
+        ya_aprobados = (
+            sin_registro_qs.filter(is_active=True).count()
+            + queryset.filter(registro__isnull=False).exclude(registro__estado="PENDIENTE").count()
+        )
+        # Si no hay registro, al menos activar el usuario (un solo UPDATE)
+        aprobados = sin_registro_qs.filter(is_active=False).update(is_active=True)
+        # Con registro PENDIENTE: aprobación por lotes
+        informe = aprobacion.aprobar_registros(
+            RegistroUsuario.objects.filter(user__in=queryset, estado="PENDIENTE"), request.user, procesos=1
+        )
+        aprobados += informe["aprobados"]
+        for error in informe["errores"]:
+            self.message_user(request, f"Error aprobando {error['dni']}: {error['detalle']}", level=messages.ERROR)
 
         if aprobados:
             self.message_user(request, f"{aprobados} usuario(s) aprobados/activados.", level=messages.SUCCESS)
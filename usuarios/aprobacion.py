@@ -0,0 +1,258 @@
+"""
+Aprobación y rechazo de registros por lotes.
+
+RegistroUsuario.aprobar resuelve un registro por vez (activar el usuario, crear
+el perfil y la inscripción a la carrera con get_or_create), con varias
+consultas por registro. aprobar_registros hace lo mismo para muchos con un
+número fijo de consultas por lote:
+
+- Los usuarios, perfiles (Alumno/Personal) existentes y el Personal del admin
+  se precargan una vez; los choques de DNI/email se detectan en memoria y esos
+  registros quedan PENDIENTE con el motivo en el informe.
+- Las contraseñas de los usuarios que hay que crear (registros sin User; la
+  inicial es el DNI, como en AdminUsuariosAprobarView) se hashean en un pool
+  de procesos (ver usuarios.hasheo), fuera de la transacción.
+- Usuarios, perfiles e InscripcionCarrera se crean con bulk_create y los
+  registros se marcan con un bulk_update, en una transacción por lote.
+
+bulk_create/update no disparan las señales de estadisticas: los contadores y la
+versión del catálogo se actualizan acá.
+"""
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from alumnos.models import Alumno
+from estadisticas.utils import aplicar_deltas, marcar_catalogo_modificado
+from inscripciones.models import InscripcionCarrera
+from personal.models import Personal
+
+from .hasheo import hashear_passwords, pool_hasheo
+from .models import RegistroUsuario
+
+LOTE = 500
+
+
+def _pendientes(registros):
+    # Acepta un queryset de RegistroUsuario o una lista de ids
+    ids = registros.values("pk") if hasattr(registros, "values") else list(registros)
+    return RegistroUsuario.objects.filter(pk__in=ids, estado="PENDIENTE").order_by("pk")
+
+
+def _responsable(admin_user):
+    if not getattr(admin_user, "is_authenticated", False):
+        return None
+    return Personal.objects.filter(user=admin_user).first()
+
+
+def _datos_persona(registro):
+    return {
+        "nombre": registro.nombre,
+        "apellido": registro.apellido,
+        "dni": registro.dni,
+        "email": registro.email,
+        "telefono": registro.telefono,
+        "direccion": registro.direccion,
+    }
+
+
+class _PlanPerfiles:
+    """
+    Qué hacer con el perfil (Alumno o Personal) de cada registro, resuelto con una sola
+    consulta: reutilizar el del usuario, vincular uno cargado sin usuario (ej. importado)
+    con el mismo DNI, o crearlo. Los choques de DNI/email quedan en `errores`.
+    """
+
+    def __init__(self, modelo, registros, errores):
+        self.modelo = modelo
+        self.existentes = {}  # registro_id -> perfil_id
+        self.vincular = {}  # perfil_id -> registro
+        self.crear = []
+        if not registros:
+            return
+        filas = modelo.objects.filter(
+            Q(user_id__in=[r.user_id for r in registros if r.user_id])
+            | Q(dni__in=[r.dni for r in registros])
+            | Q(email__in=[r.email for r in registros])
+        ).values_list("pk", "user_id", "dni", "email")
+        por_user, por_dni, emails = {}, {}, set()
+        for pk, user_id, dni, email in filas:
+            if user_id:
+                por_user[user_id] = pk
+            por_dni[dni] = (pk, user_id)
+            emails.add(email.casefold())
+
+        nombre = modelo._meta.verbose_name
+        for registro in registros:
+            email = (registro.email or "").casefold()
+            if registro.user_id in por_user:
+                self.existentes[registro.pk] = por_user[registro.user_id]
+            elif registro.dni in por_dni:
+                pk, user_id = por_dni[registro.dni]
+                if user_id is None and pk not in self.vincular:
+                    self.vincular[pk] = registro
+                else:
+                    errores[registro.pk] = f"Ya existe un {nombre} con DNI {registro.dni}"
+            elif email in emails:
+                errores[registro.pk] = f"Ya existe un {nombre} con email {registro.email}"
+            else:
+                # También evita dos registros del lote con el mismo email
+                emails.add(email)
+                self.crear.append(registro)
+
+    def aplicar(self, extra):
+        """Vincula y crea los perfiles; devuelve {registro_id: perfil_id} y cuántos se crearon"""
+        if self.vincular:
+            self.modelo.objects.bulk_update(
+                [self.modelo(pk=pk, user_id=r.user_id) for pk, r in self.vincular.items()], ["user"]
+            )
+        creados = self.modelo.objects.bulk_create([
+            self.modelo(user_id=r.user_id, **_datos_persona(r), **extra(r)) for r in self.crear
+        ])
+        perfiles = dict(self.existentes)
+        perfiles.update((r.pk, pk) for pk, r in self.vincular.items())
+        perfiles.update((r.pk, p.pk) for r, p in zip(self.crear, creados))
+        return perfiles, len(creados)
+
+
+def _aprobar_lote(registros, admin_user, responsable, pool, informe):
+    errores = {}
+    # Registros sin User: se usa el que ya tenga su DNI como username o se crea uno nuevo
+    sin_user = [r for r in registros if r.user_id is None]
+    if sin_user:
+        por_username = {
+            username: (pk, tiene_registro)
+            for username, pk, tiene_registro in User.objects.filter(username__in=[r.dni for r in sin_user])
+            .annotate(tiene_registro=Exists(RegistroUsuario.objects.filter(user=OuterRef("pk"))))
+            .values_list("username", "pk", "tiene_registro")
+        }
+        for registro in sin_user:
+            pk, tiene_registro = por_username.get(registro.dni, (None, False))
+            if tiene_registro:
+                errores[registro.pk] = f"El usuario {registro.dni} ya pertenece a otro registro"
+            registro.user_id = pk
+
+    for registro in registros:
+        if registro.pk in errores:
+            continue
+        if registro.rol_solicitado not in ("ALUMNO", "PERSONAL"):
+            errores[registro.pk] = f"Rol desconocido: {registro.rol_solicitado}"
+    candidatos = [r for r in registros if r.pk not in errores]
+    plan_alumnos = _PlanPerfiles(Alumno, [r for r in candidatos if r.rol_solicitado == "ALUMNO"], errores)
+    plan_personal = _PlanPerfiles(Personal, [r for r in candidatos if r.rol_solicitado == "PERSONAL"], errores)
+    informe["errores"].extend(
+        {"registro": r.pk, "dni": r.dni, "detalle": errores[r.pk]} for r in registros if r.pk in errores
+    )
+    validos = [r for r in registros if r.pk not in errores]
+    if not validos:
+        return
+
+    # Usuarios nuevos: el hash (lo caro) va al pool de procesos y antes de abrir la transacción,
+    # para no retener el lock de escritura (y la fila de contadores) mientras se calcula
+    nuevos = [r for r in validos if r.user_id is None]
+    hashes = hashear_passwords([r.dni for r in nuevos], pool) if nuevos else []
+
+    try:
+        with transaction.atomic():
+            alumnos_creados, personal_creado = _escribir_lote(
+                validos, nuevos, hashes, plan_alumnos, plan_personal, admin_user, responsable
+            )
+    except IntegrityError:
+        # Otro proceso aprobó alguno de estos registros (o usó sus DNI/emails) mientras se hasheaba
+        informe["errores"].extend(
+            {"registro": r.pk, "dni": r.dni, "detalle": "Modificado por otra aprobación simultánea, reintentar"}
+            for r in validos
+        )
+        return
+
+    informe["aprobados"] += len(validos)
+    informe["alumnos_creados"] += alumnos_creados
+    informe["personal_creado"] += personal_creado
+
+
+def _escribir_lote(validos, nuevos, hashes, plan_alumnos, plan_personal, admin_user, responsable):
+    # Lo precargado se leyó fuera de la transacción: los registros tienen que seguir pendientes
+    if RegistroUsuario.objects.filter(pk__in=[r.pk for r in validos], estado="PENDIENTE").count() != len(validos):
+        raise IntegrityError("registros modificados durante la aprobación")
+    if nuevos:
+        creados = User.objects.bulk_create([
+            User(
+                username=r.dni, email=r.email or "", first_name=r.nombre or "", last_name=r.apellido or "",
+                password=hash_, is_active=True, is_staff=(r.rol_solicitado == "PERSONAL"),
+            )
+            for r, hash_ in zip(nuevos, hashes)
+        ])
+        for registro, user in zip(nuevos, creados):
+            registro.user_id = user.pk
+    # Mismo criterio que AdminUsuariosAprobarView: activo, y staff sólo el personal
+    for rol, staff in (("PERSONAL", True), ("ALUMNO", False)):
+        ids = [r.user_id for r in validos if r.rol_solicitado == rol]
+        if ids:
+            User.objects.filter(pk__in=ids).update(is_active=True, is_staff=staff)
+
+    alumnos, alumnos_creados = plan_alumnos.aplicar(lambda r: {"carrera_principal_id": r.carrera_solicitada_id})
+    _, personal_creado = plan_personal.aplicar(lambda r: {"cargo": r.cargo_solicitado or "ADMIN"})
+    InscripcionCarrera.objects.bulk_create(
+        [
+            InscripcionCarrera(alumno_id=alumnos[r.pk], carrera_id=r.carrera_solicitada_id, responsable=responsable)
+            for r in validos
+            if r.rol_solicitado == "ALUMNO" and r.carrera_solicitada_id
+        ],
+        ignore_conflicts=True,
+    )
+
+    ahora = timezone.now()
+    for registro in validos:
+        registro.estado = "APROBADO"
+        registro.aprobado_por = admin_user if getattr(admin_user, "pk", None) else None
+        registro.aprobado_en = ahora
+    RegistroUsuario.objects.bulk_update(validos, ["user", "estado", "aprobado_por", "aprobado_en"])
+
+    aplicar_deltas(alumnos=alumnos_creados, registros_pendientes=-len(validos))
+    if plan_personal.crear or plan_personal.vincular:
+        marcar_catalogo_modificado()
+    return alumnos_creados, personal_creado
+
+
+def aprobar_registros(registros, admin_user, lote=LOTE, procesos=None):
+    """
+    Aprueba los registros PENDIENTE de `registros` (queryset o lista de ids); los demás se
+    ignoran. Devuelve {"aprobados", "alumnos_creados", "personal_creado",
+    "errores": [{"registro", "dni", "detalle"}]}. Los registros con error quedan PENDIENTE.
+    `procesos` es el tamaño del pool de hash (por defecto, un proceso por núcleo).
+    """
+    informe = {"aprobados": 0, "alumnos_creados": 0, "personal_creado": 0, "errores": []}
+    pendientes = list(_pendientes(registros))
+    if not pendientes:
+        return informe
+    responsable = _responsable(admin_user)
+    pool = pool_hasheo(procesos) if any(r.user_id is None for r in pendientes) else None
+    try:
+        for inicio in range(0, len(pendientes), lote):
+            _aprobar_lote(pendientes[inicio:inicio + lote], admin_user, responsable, pool, informe)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return informe
+
+
+def rechazar_registros(registros, admin_user, observaciones=""):
+    """
+    Versión por lotes de RegistroUsuario.rechazar: marca RECHAZADO los registros PENDIENTE y
+    deja inactivos sus usuarios con dos UPDATE. Devuelve la cantidad de rechazados.
+    """
+    with transaction.atomic():
+        pendientes = _pendientes(registros)
+        user_ids = list(pendientes.exclude(user=None).values_list("user_id", flat=True))
+        cambios = {
+            "estado": "RECHAZADO",
+            "aprobado_por": admin_user if getattr(admin_user, "pk", None) else None,
+            "aprobado_en": timezone.now(),
+        }
+        if observaciones:
+            cambios["observaciones_admin"] = observaciones
+        rechazados = pendientes.update(**cambios)
+        User.objects.filter(pk__in=user_ids).update(is_active=False)
+        aplicar_deltas(registros_pendientes=-rechazados)
+    return rechazados
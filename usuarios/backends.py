@@ -1,7 +1,40 @@
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth.models import User
+from django.db.models import Case, IntegerField, Q, Value, When
 from alumnos.models import Alumno
 from personal.models import Personal
+from usuarios.models import RegistroUsuario
+
+
+def buscar_usuario_por_identificador(identificador):
+    """
+    Resuelve un username o DNI (de Alumno, Personal o RegistroUsuario) a su User en una
+    sola consulta. Cada rama usa un índice único (username / dni) y, si hubiera más de
+    una coincidencia, se respeta la prioridad histórica: username, Alumno, Personal, registro.
+    """
+    if not identificador:
+        return None
+    return (
+        User.objects.select_related("alumno", "alumno__carrera_principal", "personal")
+        .filter(
+            Q(username=identificador)
+            | Q(pk__in=Alumno.objects.filter(dni=identificador).values("user_id"))
+            | Q(pk__in=Personal.objects.filter(dni=identificador).values("user_id"))
+            | Q(pk__in=RegistroUsuario.objects.filter(dni=identificador).values("user_id"))
+        )
+        .annotate(
+            prioridad=Case(
+                When(username=identificador, then=Value(0)),
+                When(alumno__dni=identificador, then=Value(1)),
+                When(personal__dni=identificador, then=Value(2)),
+                default=Value(3),
+                output_field=IntegerField(),
+            )
+        )
+        .order_by("prioridad")
+        .first()
+    )
+
 
 class DNIBackend(ModelBackend):
     """
@@ -10,21 +43,26 @@ class DNIBackend(ModelBackend):
     def authenticate(self, request, username=None, password=None, **kwargs):
         if username is None:
             username = kwargs.get(User.USERNAME_FIELD)
-        user = None
-        # Primero por username directo (recomendado que sea el DNI para nuevos usuarios)
-        try:
-            user = User.objects.get(username=username)
-        except User.DoesNotExist:
-            # Intentar por Alumno/Personal.dni
-            try:
-                alumno = Alumno.objects.get(dni=username)
-                user = alumno.user
-            except Alumno.DoesNotExist:
-                try:
-                    personal = Personal.objects.get(dni=username)
-                    user = personal.user
-                except Personal.DoesNotExist:
-                    user = None
-        if user and user.check_password(password) and self.user_can_authenticate(user):
+        if username is None or password is None:
+            return None
+        user = buscar_usuario_por_identificador(username)
+        if user is None:
+            # Igual que ModelBackend: correr el hasher para no revelar por tiempo si el usuario existe
+            User().set_password(password)
+            return None
+        password_ok = user.check_password(password)
+        if request is not None:
+            # LoginView lo usa para explicar el rechazo (cuenta pendiente) sin repetir búsqueda ni hash
+            request._login_identidad = (user, password_ok)
+        if password_ok and self.user_can_authenticate(user):
             return user
         return None
+
+    def get_user(self, user_id):
+        # Se llama una vez por request desde la sesión: traer Alumno/Personal en la misma
+        # consulta evita que permisos, utils y vistas consulten cada perfil por separado
+        try:
+            user = User._default_manager.select_related("alumno", "alumno__carrera_principal", "personal").get(pk=user_id)
+        except User.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
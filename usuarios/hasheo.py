@@ -0,0 +1,44 @@
+"""
+Hash de contraseñas en paralelo para las aprobaciones por lotes.
+
+make_password con el hasher por defecto (PBKDF2) es deliberadamente lento y
+ocupa un núcleo entero; con miles de usuarios nuevos se reparte entre un pool
+de procesos. Los workers reciben la instancia del hasher ya resuelta en este
+proceso, así que no necesitan configurar Django (sirve también con el método
+"spawn" de Windows y macOS).
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# Por debajo de esta cantidad no compensa repartir entre procesos
+MINIMO_PARALELO = 16
+
+
+def _hashear(password, hasher):
+    from django.contrib.auth.hashers import make_password
+
+    return make_password(password, hasher=hasher)
+
+
+def pool_hasheo(procesos=None):
+    """
+    ProcessPoolExecutor para hashear_passwords, o None si no vale la pena (un solo núcleo).
+    Se crea una vez y se reutiliza en todos los lotes de una aprobación.
+    """
+    procesos = procesos or os.cpu_count() or 1
+    if procesos <= 1:
+        return None
+    return ProcessPoolExecutor(max_workers=procesos)
+
+
+def hashear_passwords(passwords, pool=None):
+    """Hashes de `passwords` (en el mismo orden) con el hasher por defecto de settings"""
+    from django.contrib.auth.hashers import get_hasher
+
+    hasher = get_hasher()
+    passwords = list(passwords)
+    if pool is None or len(passwords) < MINIMO_PARALELO:
+        return [_hashear(password, hasher) for password in passwords]
+    # Bloques chicos: cada hash tarda décimas de segundo y así la carga se reparte pareja
+    bloque = max(1, len(passwords) // 64)
+    return list(pool.map(_hashear, passwords, [hasher] * len(passwords), chunksize=bloque))
@@ -0,0 +1,58 @@
+import json
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from usuarios import aprobacion
+from usuarios.models import RegistroUsuario
+
+
+class Command(BaseCommand):
+    help = (
+        "Aprueba registros de usuario PENDIENTE por lotes: crea usuarios, perfiles e inscripciones "
+        "a la carrera con bulk_create y hashea las contraseñas iniciales en un pool de procesos"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ids", type=int, nargs="+", help="ids de RegistroUsuario a aprobar")
+        parser.add_argument("--todos", action="store_true", help="Aprueba todos los pendientes (ver --rol y --carrera)")
+        parser.add_argument("--rol", choices=["ALUMNO", "PERSONAL"])
+        parser.add_argument("--carrera", type=int, help="id de la carrera solicitada")
+        parser.add_argument("--admin", help="username que queda como aprobador (y responsable de las inscripciones)")
+        parser.add_argument("--procesos", type=int, help="Procesos para el hash (por defecto, uno por núcleo)")
+        parser.add_argument("--lote", type=int, default=aprobacion.LOTE, help="Registros por transacción")
+        parser.add_argument("--json", action="store_true", help="Salida en JSON")
+
+    def handle(self, *args, **options):
+        if bool(options["ids"]) == options["todos"]:
+            raise CommandError("Indicar --ids o --todos (uno de los dos)")
+        admin_user = None
+        if options["admin"]:
+            admin_user = User.objects.filter(username=options["admin"]).first()
+            if admin_user is None:
+                raise CommandError(f"No existe el usuario {options['admin']}")
+        registros = RegistroUsuario.objects.filter(estado="PENDIENTE")
+        if options["ids"]:
+            registros = registros.filter(pk__in=options["ids"])
+        if options["rol"]:
+            registros = registros.filter(rol_solicitado=options["rol"])
+        if options["carrera"]:
+            registros = registros.filter(carrera_solicitada_id=options["carrera"])
+
+        inicio = time.perf_counter()
+        informe = aprobacion.aprobar_registros(
+            registros, admin_user, lote=options["lote"], procesos=options["procesos"]
+        )
+        segundos = time.perf_counter() - inicio
+
+        if options["json"]:
+            self.stdout.write(json.dumps(informe, ensure_ascii=False))
+            return
+        for error in informe["errores"]:
+            self.stdout.write(f"Registro {error['registro']} ({error['dni']}): {error['detalle']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{informe['aprobados']} registro(s) aprobados, {informe['alumnos_creados']} alumno(s) y "
+            f"{informe['personal_creado']} personal creados, {len(informe['errores'])} con errores "
+            f"({segundos:.1f} s)"
+        ))
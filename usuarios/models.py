@@ -52,6 +52,8 @@ class RegistroUsuario(models.Model):
 
     class Meta:
         ordering = ["-creado_en"]
+        # Listado de pendientes: filtra por estado y pagina por -creado_en
+        indexes = [models.Index(fields=["estado", "creado_en"], name="registro_estado_creado_idx")]
         verbose_name = "Registro de Usuario"
         verbose_name_plural = "Registros de Usuarios"
 
@@ -0,0 +1,39 @@
+"""
+Resolución de los perfiles (Alumno y Personal) del usuario autenticado.
+
+DNIBackend.get_user ya trae ambos perfiles con select_related en la misma
+consulta del usuario, así que acá sólo se lee la caché de la relación y el
+resultado queda memorizado en el propio objeto user durante el request.
+"""
+from django.core.exceptions import ObjectDoesNotExist
+
+
+def obtener_perfiles(user):
+    """Retorna (alumno, personal); cada uno es None si el usuario no lo tiene"""
+    if not getattr(user, "is_authenticated", False):
+        return None, None
+    perfiles = getattr(user, "_perfiles_resueltos", None)
+    if perfiles is None:
+        perfiles = (_relacion(user, "alumno"), _relacion(user, "personal"))
+        user._perfiles_resueltos = perfiles
+    return perfiles
+
+
+def resolver_perfil(user):
+    """
+    Retorna (tipo, perfil) donde tipo es 'personal' o 'alumno', o (None, None).
+    Personal tiene prioridad sobre Alumno.
+    """
+    alumno, personal = obtener_perfiles(user)
+    if personal is not None:
+        return 'personal', personal
+    if alumno is not None:
+        return 'alumno', alumno
+    return None, None
+
+
+def _relacion(user, nombre):
+    try:
+        return getattr(user, nombre)
+    except ObjectDoesNotExist:
+        return None